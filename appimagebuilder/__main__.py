@@ -11,14 +11,17 @@
 #  The above copyright notice and this permission notice shall be included in
 #  all copies or substantial portions of the Software.
 import logging
+import pathlib
 import subprocess
 from importlib.metadata import version
 
 from appimagebuilder import recipe
 from appimagebuilder.cli.argparse import ArgumentsParser
-from appimagebuilder.modules.generate.command_generate import CommandGenerate
+from appimagebuilder.build_plan import BuildPlan
+from appimagebuilder.build_profile import BuildProfile
 from appimagebuilder.invoker import Invoker
-from appimagebuilder.orchestrator import Orchestrator
+from appimagebuilder.step_cache import StepCache
+from appimagebuilder.utils import shell
 
 
 def __main__():
@@ -31,11 +34,25 @@ def __main__():
         print("appimage-builder:", version("appimage-builder"))
         exit(0)
 
+    # the modules of each mode are imported on use, they are expensive to load
     if args.generate:
+        from appimagebuilder.modules.generate.command_generate import CommandGenerate
+
         generator = CommandGenerate()
         generator.generate()
         exit(0)
 
+    _build(args)
+
+
+def _build(args):
+    if args.max_processes:
+        shell.set_concurrency_limit(args.max_processes)
+
+    if args.archs:
+        _build_archs(args)
+        return
+
     recipe_loader = recipe.Loader()
     raw_recipe_data = recipe_loader.load(args.recipe)
     recipe_roamer = recipe.Roamer(raw_recipe_data)
@@ -43,11 +60,55 @@ def __main__():
     schema = recipe.Schema()
     schema.validate(recipe_roamer)
 
+    from appimagebuilder.orchestrator import Orchestrator
+
     orchestrator = Orchestrator()
     commands = orchestrator.process(recipe_roamer, args)
+    if args.plan:
+        print(BuildPlan(commands, _create_cache(args)).format())
+        return
+
+    _execute(commands, args)
+
+
+def _build_archs(args):
+    from appimagebuilder.multi_arch_build import MultiArchBuild, target_arch
+
+    multi_arch_build = MultiArchBuild(args)
+    builds = multi_arch_build.prepare()
+    if args.plan:
+        for build in builds:
+            # the recipe values are resolved as the plan is formatted
+            with target_arch(build.arch):
+                print(f"{build.arch}:")
+                print(BuildPlan(build.commands, _create_cache(build.args)).format())
+        return
+
+    multi_arch_build.execute(builds)
+
+
+def _create_cache(args):
+    if args.no_cache:
+        return None
+
+    build_dir = pathlib.Path(args.build_dir).absolute()
+    return StepCache(build_dir / "cache", pathlib.Path(args.appdir).absolute())
+
+
+def _execute(commands, args):
+    build_dir = pathlib.Path(args.build_dir).absolute()
+    cache = _create_cache(args)
 
-    invoker = Invoker()
-    invoker.execute(commands)
+    # the profile is kept out of the AppDir to not ship it in the bundle
+    profile = BuildProfile()
+    invoker = Invoker(cache=cache, profile=profile)
+    try:
+        invoker.execute(commands)
+    finally:
+        profile.log_summary()
+        profile.write_json(build_dir / "profile.json")
+        if args.profile_trace:
+            profile.write_chrome_trace(build_dir / "profile.trace.json")
 
 
 def _setup_logging_config(args):
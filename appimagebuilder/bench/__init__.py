@@ -0,0 +1,17 @@
+#  Copyright  2021 Alexis Lopez Zubieta
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a
+#  copy of this software and associated documentation files (the "Software"),
+#  to deal in the Software without restriction, including without limitation the
+#  rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+#  sell copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+
+from .baseline import Baseline, Regression
+from .recipe_benchmark import RecipeBenchmark
+from .recipe_load_benchmark import RecipeLoadBenchmark
+from .synthetic_app_dir import SyntheticAppDir, make_elf
+from .synthetic_benchmark import SyntheticBenchmark
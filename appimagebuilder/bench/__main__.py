@@ -0,0 +1,210 @@
+#  Copyright  2021 Alexis Lopez Zubieta
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a
+#  copy of this software and associated documentation files (the "Software"),
+#  to deal in the Software without restriction, including without limitation the
+#  rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+#  sell copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+import argparse
+import json
+import logging
+import pathlib
+import sys
+
+from appimagebuilder.bench.baseline import Baseline
+from appimagebuilder.bench.recipe_benchmark import RecipeBenchmark
+from appimagebuilder.bench.recipe_load_benchmark import RecipeLoadBenchmark
+from appimagebuilder.bench.synthetic_benchmark import SyntheticBenchmark
+
+
+def __main__():
+    args = _parse_args()
+    logging.basicConfig(level=getattr(logging, args.loglevel.upper()))
+    logger = logging.getLogger("bench")
+
+    stages = args.stages.split(",") if args.stages else None
+    benchmarks = []
+    # the recipes are benchmarked by default, unless only synthetic ones are asked
+    synthetic = args.synthetic or args.synthetic_recipes
+    for name, recipe_path in _find_recipes(
+        args.recipes or ([] if synthetic else ["recipes"])
+    ):
+        benchmark = RecipeBenchmark(
+            name, recipe_path, pathlib.Path(args.fixtures) / name
+        )
+        if benchmark.has_fixtures():
+            benchmarks.append(benchmark)
+        else:
+            logger.info(f"{name}: skipped, no fixtures in {benchmark.fixtures_dir}")
+    for files in args.synthetic or []:
+        benchmark = SyntheticBenchmark(
+            files, depth=args.depth, fan_out=args.fan_out, seed=args.seed
+        )
+        benchmarks.append(benchmark)
+    for includes in args.synthetic_recipes or []:
+        benchmarks.append(RecipeLoadBenchmark(includes))
+
+    baseline = Baseline.load(args.baseline)
+    results = {}
+    regressions = []
+    failed = False
+    for benchmark in benchmarks:
+        name = benchmark.name
+        try:
+            results[name] = benchmark.run(stages, args.repeat)
+        except Exception as err:
+            logger.error(f"{name}: benchmark failed: {err}")
+            failed = True
+            continue
+
+        for stage, duration in results[name].items():
+            logger.info(f"{name} {stage}: {duration:.3f}s")
+        regressions.extend(
+            baseline.compare(name, results[name], args.threshold, args.min_delta)
+        )
+
+    # e.g.: recipes without fixtures or tools missing for every stage
+    if not any(results.values()):
+        logger.error("No benchmark ran, check the fixtures and the required tools")
+        failed = True
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"version": 1, "recipes": results}, f, indent=2)
+
+    if args.update_baseline:
+        for name, recipe_results in results.items():
+            baseline.update(name, recipe_results)
+        baseline.write(args.baseline)
+        logger.info(f"Baseline written to: {args.baseline}")
+    elif regressions:
+        for regression in regressions:
+            logger.error(f"Performance regression: {regression}")
+        failed = True
+
+    sys.exit(1 if failed else 0)
+
+
+def _find_recipes(paths: [str]) -> [(str, pathlib.Path)]:
+    """Name every recipe after its dir, adding the file name if it's not the default one"""
+    recipes = []
+    for path in map(pathlib.Path, paths):
+        files = [path]
+        if path.is_dir():
+            files = sorted(path.glob("*.yml")) or sorted(path.glob("*/*.yml"))
+        for file in files:
+            name = file.parent.name
+            if file.name != "AppImageBuilder.yml":
+                name += f"/{file.stem}"
+            recipes.append((name, file))
+    return recipes
+
+
+def _parse_args():
+    parser = argparse.ArgumentParser(
+        prog="python -m appimagebuilder.bench",
+        description="Time the build stages of the recipes using local fixtures",
+    )
+    parser.add_argument(
+        "recipes",
+        nargs="*",
+        help="Recipe files, recipe dirs or dirs containing a recipe dir each (default: recipes)",
+    )
+    parser.add_argument(
+        "--fixtures",
+        default="bench-fixtures",
+        help="Directory holding the fixtures of each recipe, in a sub-dir named as the recipe",
+    )
+    parser.add_argument(
+        "--synthetic",
+        type=lambda value: [int(size) for size in value.split(",")],
+        help="Comma separated list of files counts of generated AppDirs to benchmark, i.e.: 1000,10000,100000",
+    )
+    parser.add_argument(
+        "--synthetic-recipes",
+        dest="synthetic_recipes",
+        type=lambda value: [int(size) for size in value.split(",")],
+        help="Comma separated list of include entries counts of generated recipes to benchmark, i.e.: 1000,10000",
+    )
+    parser.add_argument(
+        "--depth",
+        type=int,
+        default=3,
+        help="Levels of the libraries dependency graph of the generated AppDirs (default: 3)",
+    )
+    parser.add_argument(
+        "--fan-out",
+        dest="fan_out",
+        type=int,
+        default=2,
+        help="Libraries linked by each generated executable or library (default: 2)",
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=0,
+        help="Seed used to generate the AppDirs (default: 0)",
+    )
+    parser.add_argument(
+        "--baseline",
+        default="bench-baseline.json",
+        help="Stage timings to compare with",
+    )
+    parser.add_argument(
+        "--update-baseline",
+        dest="update_baseline",
+        action="store_true",
+        help="Store the results as baseline instead of comparing with it",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.2,
+        help="Slowdown ratio over the baseline considered a regression (default: 0.2)",
+    )
+    parser.add_argument(
+        "--min-delta",
+        dest="min_delta",
+        type=float,
+        default=0.05,
+        help="Slowdowns under this number of seconds are ignored (default: 0.05)",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=3,
+        help="Number of runs of each stage, the best time is kept (default: 3)",
+    )
+    parser.add_argument(
+        "--stages",
+        help=f"Comma separated list of stages to run (default: all). Recipe stages: "
+        f"{','.join(RecipeBenchmark.STAGES)}. Synthetic AppDir stages: "
+        f"{','.join(SyntheticBenchmark.STAGES)}. Synthetic recipe stages: "
+        f"{','.join(RecipeLoadBenchmark.STAGES)}",
+    )
+    parser.add_argument("--output", help="Write the results to a JSON file")
+    parser.add_argument(
+        "--log-level",
+        dest="loglevel",
+        default="INFO",
+        help="logging level (default: INFO)",
+    )
+    args = parser.parse_args()
+    if args.stages:
+        known = (
+            RecipeBenchmark.STAGES
+            + SyntheticBenchmark.STAGES
+            + RecipeLoadBenchmark.STAGES
+        )
+        unknown = set(args.stages.split(",")) - set(known)
+        if unknown:
+            parser.error(f"unknown stages: {', '.join(sorted(unknown))}")
+    return args
+
+
+if __name__ == "__main__":
+    __main__()
@@ -0,0 +1,74 @@
+#  Copyright  2021 Alexis Lopez Zubieta
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a
+#  copy of this software and associated documentation files (the "Software"),
+#  to deal in the Software without restriction, including without limitation the
+#  rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+#  sell copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+import json
+import pathlib
+
+
+class Regression:
+    def __init__(self, recipe: str, stage: str, baseline: float, current: float):
+        self.recipe = recipe
+        self.stage = stage
+        self.baseline = baseline
+        self.current = current
+
+    def __str__(self):
+        increase = (self.current / self.baseline - 1) * 100 if self.baseline else 0
+        return (
+            f"{self.recipe} {self.stage}: {self.current:.3f}s "
+            f"(baseline {self.baseline:.3f}s, +{increase:.0f}%)"
+        )
+
+
+class Baseline:
+    """
+    Stage timings, in seconds, of each recipe taken as reference
+
+    A stage regresses when it is slower than its baseline by more than the given
+    ratio and by more than <min_delta> seconds, so noise on fast stages is ignored.
+    """
+
+    def __init__(self, timings: {str: {str: float}} = None):
+        self.timings = timings or {}
+
+    @staticmethod
+    def load(path: pathlib.Path):
+        path = pathlib.Path(path)
+        if not path.exists():
+            return Baseline()
+
+        with open(path) as f:
+            return Baseline(json.load(f)["recipes"])
+
+    def write(self, path: pathlib.Path):
+        with open(path, "w") as f:
+            json.dump({"version": 1, "recipes": self.timings}, f, indent=2)
+
+    def update(self, recipe: str, results: {str: float}):
+        self.timings.setdefault(recipe, {}).update(results)
+
+    def compare(
+        self,
+        recipe: str,
+        results: {str: float},
+        threshold: float = 0.2,
+        min_delta: float = 0.05,
+    ) -> [Regression]:
+        regressions = []
+        reference = self.timings.get(recipe, {})
+        for stage, current in results.items():
+            if stage not in reference:
+                continue
+
+            baseline = reference[stage]
+            if current > baseline * (1 + threshold) and current - baseline > min_delta:
+                regressions.append(Regression(recipe, stage, baseline, current))
+        return regressions
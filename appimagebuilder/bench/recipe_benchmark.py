@@ -0,0 +1,133 @@
+#  Copyright  2021 Alexis Lopez Zubieta
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a
+#  copy of this software and associated documentation files (the "Software"),
+#  to deal in the Software without restriction, including without limitation the
+#  rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+#  sell copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+import argparse
+import pathlib
+import shutil
+import tempfile
+
+from appimagebuilder import recipe
+from appimagebuilder.bench.stage_benchmark import StageBenchmark, StageSkipped
+from appimagebuilder.commands.setup_runtime import SetupRuntimeCommand
+from appimagebuilder.commands.setup_symlinks import SetupSymlinksCommand
+from appimagebuilder.modules.deploy.files.dependencies_resolver.elf_resolver import (
+    ElfResolver,
+)
+from appimagebuilder.orchestrator import Orchestrator
+from appimagebuilder.utils import shell
+from appimagebuilder.utils.finder import Finder
+
+
+class RecipeBenchmark(StageBenchmark):
+    """
+    Time the build stages of a recipe without network access
+
+    The stages run over a copy of the recipe fixtures, a directory that can hold:
+      - AppDir: the AppDir contents as left by the deploy steps
+      - archives: package archives (.deb, .pkg.tar.*) extracted into the AppDir
+      - AppRun: the AppRun release assets, as they are cached in the build dir
+    """
+
+    STAGES = ["extract", "scan", "resolve", "runtime", "squashfs"]
+
+    def __init__(self, name: str, recipe_path: pathlib.Path, fixtures_dir):
+        super().__init__(name)
+        self.recipe_path = pathlib.Path(recipe_path)
+        self.fixtures_dir = pathlib.Path(fixtures_dir)
+        self._recipe = None
+
+    def has_fixtures(self) -> bool:
+        return (self.fixtures_dir / "AppDir").is_dir() or (
+            self.fixtures_dir / "archives"
+        ).is_dir()
+
+    def _run_once(self, stages: [str]) -> {str: float}:
+        if not self._recipe:
+            self._recipe = self._load_recipe()
+
+        with tempfile.TemporaryDirectory(prefix="appimage-builder-bench-") as tmp:
+            workspace = _Workspace(self, self._recipe, pathlib.Path(tmp))
+            return self._time_stages(workspace, stages)
+
+    def _load_recipe(self) -> recipe.Roamer:
+        loader = recipe.Loader()
+        recipe_roamer = recipe.Roamer(loader.load(self.recipe_path))
+        recipe.Schema().validate(recipe_roamer)
+        return recipe_roamer
+
+
+class _Workspace:
+    """Build and AppDir directories for a single benchmark run"""
+
+    def __init__(self, benchmark: RecipeBenchmark, recipe_roamer, path: pathlib.Path):
+        self.fixtures_dir = benchmark.fixtures_dir
+        self.app_dir = path / "AppDir"
+        self.build_dir = path / "build"
+
+        if (self.fixtures_dir / "AppDir").is_dir():
+            shutil.copytree(self.fixtures_dir / "AppDir", self.app_dir, symlinks=True)
+        else:
+            self.app_dir.mkdir()
+
+        if (self.fixtures_dir / "AppRun").is_dir():
+            shutil.copytree(self.fixtures_dir / "AppRun", self.build_dir / "AppRun")
+        self.build_dir.mkdir(exist_ok=True)
+
+        args = argparse.Namespace(
+            recipe=str(benchmark.recipe_path),
+            appdir=str(self.app_dir),
+            build_dir=str(self.build_dir),
+        )
+        self.context = Orchestrator().create_context(recipe_roamer, args)
+        self.elf_files = []
+
+    def run_extract(self):
+        archives = sorted((self.fixtures_dir / "archives").glob("*"))
+        if not archives:
+            raise StageSkipped("no package archives")
+
+        for archive in archives:
+            if archive.name.endswith(".deb"):
+                command = [shell.require_executable("dpkg-deb"), "-x", archive]
+            elif ".pkg.tar." in archive.name:
+                command = [shell.require_executable("bsdtar"), "--exclude", ".*"]
+                command += ["-xf", archive, "-C"]
+            else:
+                continue
+
+            shell.run(command + [self.app_dir], check=True)
+
+    def run_scan(self):
+        finder = Finder(self.app_dir)
+        self.elf_files = list(finder.find("*", [Finder.is_file, Finder.is_elf]))
+
+    def run_resolve(self):
+        if not self.elf_files:
+            raise StageSkipped("no ELF files found, the scan stage must run first")
+
+        ElfResolver().resolve(self.elf_files)
+
+    def run_runtime(self):
+        # without them the AppRun binaries would be downloaded
+        if not (self.build_dir / "AppRun").is_dir():
+            raise StageSkipped("no AppRun binaries")
+
+        recipe_roamer = self.context.recipe
+        finder = Finder(self.app_dir)
+        SetupSymlinksCommand(self.context, recipe_roamer, finder)()
+        SetupRuntimeCommand(self.context, finder)()
+
+    def run_squashfs(self):
+        # imported here to not require gnupg in the other stages
+        from appimagebuilder.modules.prime.appimage_primer import AppImagePrimer
+
+        primer = AppImagePrimer(self.context)
+        primer.make_squashfs(self.app_dir, self.build_dir / "AppDir.squashfs")
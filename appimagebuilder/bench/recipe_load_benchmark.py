@@ -0,0 +1,137 @@
+#  Copyright  2021 Alexis Lopez Zubieta
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a
+#  copy of this software and associated documentation files (the "Software"),
+#  to deal in the Software without restriction, including without limitation the
+#  rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+#  sell copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+import argparse
+import os
+import pathlib
+import tempfile
+
+from appimagebuilder import recipe
+from appimagebuilder.bench.stage_benchmark import StageBenchmark, StageSkipped
+
+
+class RecipeLoadBenchmark(StageBenchmark):
+    """
+    Time the parsing and validation of a generated recipe with <includes> entries
+    in each of the apt and files include and exclude lists, and the reads made
+    by the orchestrator when it creates the build commands
+
+    A tenth of the entries use environment variables, half of them with !ENV and
+    the other half with {{VAR}}.
+    """
+
+    STAGES = ["load", "validate", "access", "orchestrate"]
+
+    def __init__(self, includes: int):
+        super().__init__(f"synthetic-recipe-{includes}")
+        self.includes = includes
+
+    def _run_once(self, stages: [str]) -> {str: float}:
+        with tempfile.TemporaryDirectory(prefix="appimage-builder-bench-") as tmp:
+            recipe_path = pathlib.Path(tmp) / "AppImageBuilder.yml"
+            recipe_path.write_text(self.generate())
+
+            previous_value = os.environ.get("BENCH_VERSION")
+            os.environ["BENCH_VERSION"] = "1.0"
+            try:
+                return self._time_stages(_Workspace(recipe_path), stages)
+            finally:
+                if previous_value is None:
+                    del os.environ["BENCH_VERSION"]
+                else:
+                    os.environ["BENCH_VERSION"] = previous_value
+
+    def generate(self) -> str:
+        lines = [
+            "version: 1",
+            "AppDir:",
+            "  app_info:",
+            "    id: org.example.bench",
+            "    name: bench",
+            "    version: !ENV ${BENCH_VERSION}",
+            "    exec: usr/bin/bench",
+            "  apt:",
+            "    arch: amd64",
+            "    sources:",
+            "      - sourceline: 'deb http://archive.ubuntu.com/ubuntu focal main'",
+        ]
+        lines += self._lists("apt")
+        lines.append("  files:")
+        lines += self._lists("files")
+        lines += [
+            "AppImage:",
+            "  arch: x86_64",
+            "  file_name: bench-{{BENCH_VERSION}}-x86_64.AppImage",
+        ]
+        return "\n".join(lines) + "\n"
+
+    def _lists(self, section: str) -> [str]:
+        lines = []
+        for kind in ("include", "exclude"):
+            lines.append(f"    {kind}:")
+            lines += [
+                f"      - {self._entry(section, idx)}" for idx in range(self.includes)
+            ]
+        return lines
+
+    @staticmethod
+    def _entry(section: str, idx: int) -> str:
+        name = f"package-{idx}" if section == "apt" else f"usr/share/bench/{idx}/**"
+        if idx % 20 == 0:
+            return f"!ENV '{name}-${{BENCH_VERSION}}'"
+        if idx % 20 == 10:
+            return f"'{name}-{{{{BENCH_VERSION}}}}'"
+        return name
+
+
+class _Workspace:
+    def __init__(self, recipe_path: pathlib.Path):
+        self.recipe_path = recipe_path
+        self.recipe = None
+
+    def run_load(self):
+        self.recipe = recipe.Roamer(recipe.Loader().load(self.recipe_path))
+
+    def run_validate(self):
+        if not self.recipe:
+            raise StageSkipped("no recipe, the load stage must run first")
+
+        recipe.Schema().validate(self.recipe)
+
+    def run_access(self):
+        if not self.recipe:
+            raise StageSkipped("no recipe, the load stage must run first")
+
+        app_dir = self.recipe.AppDir
+        for section in (app_dir.apt, app_dir.files):
+            section.include()
+            section.exclude()
+        self.recipe.AppImage.file_name()
+
+    def run_orchestrate(self):
+        if not self.recipe:
+            raise StageSkipped("no recipe, the load stage must run first")
+
+        # imported here, the orchestrator pulls in every build command
+        from appimagebuilder.orchestrator import Orchestrator
+
+        work_dir = self.recipe_path.parent
+        args = argparse.Namespace(
+            recipe=str(self.recipe_path),
+            appdir=str(work_dir / "AppDir"),
+            build_dir=str(work_dir / "build"),
+            skip_script=False,
+            skip_build=False,
+            skip_tests=False,
+            skip_appimage=False,
+            fast_squashfs=False,
+        )
+        Orchestrator().process(self.recipe, args)
@@ -0,0 +1,65 @@
+#  Copyright  2021 Alexis Lopez Zubieta
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a
+#  copy of this software and associated documentation files (the "Software"),
+#  to deal in the Software without restriction, including without limitation the
+#  rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+#  sell copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+import abc
+import logging
+import time
+
+from appimagebuilder.utils import shell
+
+
+class StageSkipped(RuntimeError):
+    pass
+
+
+class StageBenchmark(abc.ABC):
+    """
+    Time a sequence of stages, each one is a `run_<stage>` method of a workspace
+
+    Stages whose fixtures or tools are not available are skipped.
+    """
+
+    STAGES = []
+
+    def __init__(self, name: str):
+        self.name = name
+        self.logger = logging.getLogger(self.__class__.__name__)
+
+    def run(self, stages: [str] = None, repeat: int = 1) -> {str: float}:
+        """
+        Run the stages <repeat> times over fresh workspaces
+
+        :return: the best time, in seconds, of each stage that was not skipped
+        """
+        stages = stages or self.STAGES
+        results = {}
+        for _ in range(repeat):
+            for stage, duration in self._run_once(stages).items():
+                results[stage] = min(duration, results.get(stage, duration))
+        return results
+
+    @abc.abstractmethod
+    def _run_once(self, stages: [str]) -> {str: float}:
+        """Run the stages once over a fresh workspace, returns their times"""
+
+    def _time_stages(self, workspace, stages: [str]) -> {str: float}:
+        results = {}
+        for stage in self.STAGES:
+            if stage not in stages:
+                continue
+
+            try:
+                start = time.perf_counter()
+                getattr(workspace, f"run_{stage}")()
+                results[stage] = time.perf_counter() - start
+            except (StageSkipped, shell.CommandNotFoundError) as err:
+                self.logger.info(f"{self.name}: skipping {stage} stage, {err}")
+        return results
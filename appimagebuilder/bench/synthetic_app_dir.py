@@ -0,0 +1,326 @@
+#  Copyright  2021 Alexis Lopez Zubieta
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a
+#  copy of this software and associated documentation files (the "Software"),
+#  to deal in the Software without restriction, including without limitation the
+#  rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+#  sell copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+import os
+import pathlib
+import random
+import struct
+
+# e_machine, PT_INTERP and an entry point code calling exit(0) for each arch
+ARCHITECTURES = {
+    "x86_64": (
+        0x3E,
+        "/lib64/ld-linux-x86-64.so.2",
+        # mov eax, 60; xor edi, edi; syscall
+        bytes.fromhex("b83c00000031ff0f05"),
+    ),
+    "aarch64": (
+        0xB7,
+        "/lib/ld-linux-aarch64.so.1",
+        # mov x0, #0; mov x8, #93; svc #0
+        bytes.fromhex("000080d2a80b80d2010000d4"),
+    ),
+}
+
+_ET_DYN = 3
+_PT_LOAD, _PT_DYNAMIC, _PT_INTERP, _PT_PHDR = 1, 2, 3, 6
+_SHT_PROGBITS, _SHT_STRTAB, _SHT_HASH, _SHT_DYNAMIC, _SHT_DYNSYM = 1, 3, 5, 6, 11
+_SHF_WRITE, _SHF_ALLOC, _SHF_EXECINSTR = 1, 2, 4
+(
+    _DT_NULL,
+    _DT_NEEDED,
+    _DT_HASH,
+    _DT_STRTAB,
+    _DT_SYMTAB,
+    _DT_STRSZ,
+    _DT_SYMENT,
+    _DT_SONAME,
+    _DT_RUNPATH,
+) = (0, 1, 4, 5, 6, 10, 11, 14, 29)
+
+
+def make_elf(
+    needed: [str] = (),
+    soname: str = None,
+    runpath: str = None,
+    executable: bool = False,
+    arch: str = "x86_64",
+) -> bytes:
+    """
+    Build a minimal ELF64 shared object or position independent executable
+
+    The file has the dynamic section, symbols and section headers read by the
+    dynamic loader, readelf and lief. Executables define `_start`, which exits.
+    """
+    machine, interpreter, code = ARCHITECTURES[arch]
+
+    dynstr = bytearray(b"\0")
+
+    def add_string(value: str) -> int:
+        offset = len(dynstr)
+        dynstr.extend(value.encode() + b"\0")
+        return offset
+
+    dynamic_entries = [(_DT_NEEDED, add_string(name)) for name in needed]
+    if soname:
+        dynamic_entries.append((_DT_SONAME, add_string(soname)))
+    if runpath:
+        dynamic_entries.append((_DT_RUNPATH, add_string(runpath)))
+    start_name = add_string("_start") if executable else 0
+
+    # [name, type, flags, content], the contents referencing offsets are built
+    # once the layout is known
+    sections = []
+    if executable:
+        sections.append(
+            [".interp", _SHT_PROGBITS, _SHF_ALLOC, interpreter.encode() + b"\0"]
+        )
+    sections.append([".dynsym", _SHT_DYNSYM, _SHF_ALLOC, None])
+    sections.append([".dynstr", _SHT_STRTAB, _SHF_ALLOC, bytes(dynstr)])
+    sections.append([".hash", _SHT_HASH, _SHF_ALLOC, None])
+    if executable:
+        sections.append([".text", _SHT_PROGBITS, _SHF_ALLOC | _SHF_EXECINSTR, code])
+    sections.append([".dynamic", _SHT_DYNAMIC, _SHF_ALLOC | _SHF_WRITE, None])
+    names = [section[0] for section in sections]
+
+    symbols_count = 2 if executable else 1
+    # a single bucket chaining every symbol
+    hash_table = struct.pack(
+        f"<{2 + 1 + symbols_count}I",
+        1,
+        symbols_count,
+        symbols_count - 1,
+        *([0] * symbols_count),
+    )
+    sections[names.index(".hash")][3] = hash_table
+    dynamic_size = (len(dynamic_entries) + 6) * 16
+
+    program_headers_count = 4 if executable else 2
+    offset = 64 + program_headers_count * 56
+    offsets = {}
+    for section in sections:
+        name = section[0]
+        size = len(section[3]) if section[3] is not None else 0
+        if name == ".dynsym":
+            size = symbols_count * 24
+        if name == ".dynamic":
+            size = dynamic_size
+        offset = _align(offset, 8)
+        offsets[name] = (offset, size)
+        offset += size
+
+    text_offset = offsets[".text"][0] if executable else 0
+    symbols = bytes(24)
+    if executable:
+        symbols += struct.pack(
+            "<IBBHQQ",
+            start_name,
+            0x12,  # STB_GLOBAL, STT_FUNC
+            0,
+            names.index(".text") + 1,
+            text_offset,
+            len(code),
+        )
+    sections[names.index(".dynsym")][3] = symbols
+
+    dynamic_entries += [
+        (_DT_HASH, offsets[".hash"][0]),
+        (_DT_STRTAB, offsets[".dynstr"][0]),
+        (_DT_SYMTAB, offsets[".dynsym"][0]),
+        (_DT_STRSZ, len(dynstr)),
+        (_DT_SYMENT, 24),
+        (_DT_NULL, 0),
+    ]
+    sections[names.index(".dynamic")][3] = b"".join(
+        struct.pack("<qQ", tag, value) for tag, value in dynamic_entries
+    )
+
+    shstrtab = bytearray(b"\0")
+    name_offsets = {}
+    for name in names + [".shstrtab"]:
+        name_offsets[name] = len(shstrtab)
+        shstrtab.extend(name.encode() + b"\0")
+    offsets[".shstrtab"] = (offset, len(shstrtab))
+    load_size = offset
+    section_headers_offset = _align(offset + len(shstrtab), 8)
+
+    links = {".dynsym": ".dynstr", ".hash": ".dynsym", ".dynamic": ".dynstr"}
+    entry_sizes = {".dynsym": 24, ".hash": 4, ".dynamic": 16}
+    section_headers = bytes(64)
+    for name, sh_type, flags, _ in sections + [[".shstrtab", _SHT_STRTAB, 0, None]]:
+        sh_offset, sh_size = offsets[name]
+        section_headers += struct.pack(
+            "<IIQQQQIIQQ",
+            name_offsets[name],
+            sh_type,
+            flags,
+            sh_offset if flags & _SHF_ALLOC else 0,
+            sh_offset,
+            sh_size,
+            names.index(links[name]) + 1 if name in links else 0,
+            1 if name == ".dynsym" else 0,
+            8,
+            entry_sizes.get(name, 0),
+        )
+
+    program_headers = b""
+    if executable:
+        # the loader finds the load address of the executable using PT_PHDR
+        program_headers += _program_header(
+            _PT_PHDR, 4, 64, program_headers_count * 56, 8
+        )
+        interp_offset, interp_size = offsets[".interp"]
+        program_headers += _program_header(_PT_INTERP, 4, interp_offset, interp_size, 1)
+    program_headers += _program_header(_PT_LOAD, 7, 0, load_size, 0x1000)
+    program_headers += _program_header(_PT_DYNAMIC, 6, *offsets[".dynamic"], 8)
+
+    header = b"\x7fELF" + bytes([2, 1, 1, 0]) + bytes(8)
+    header += struct.pack(
+        "<HHIQQQIHHHHHH",
+        _ET_DYN,
+        machine,
+        1,
+        text_offset,
+        64,
+        section_headers_offset,
+        0,
+        64,
+        56,
+        program_headers_count,
+        64,
+        len(sections) + 2,
+        len(sections) + 1,
+    )
+
+    data = bytearray(header + program_headers)
+    for name, _, _, content in sections:
+        data.extend(bytes(offsets[name][0] - len(data)))
+        data.extend(content)
+    data.extend(shstrtab)
+    data.extend(bytes(section_headers_offset - len(data)))
+    data.extend(section_headers)
+    return bytes(data)
+
+
+def _program_header(p_type, flags, offset, size, align) -> bytes:
+    return struct.pack(
+        "<IIQQQQQQ", p_type, flags, offset, offset, offset, size, size, align
+    )
+
+
+def _align(value: int, alignment: int) -> int:
+    return (value + alignment - 1) & ~(alignment - 1)
+
+
+class SyntheticAppDir:
+    """
+    Fabricate an AppDir with the kind of files found in real ones
+
+    Executables and libraries are minimal ELF files whose DT_NEEDED entries form
+    a graph of <depth> levels of libraries, each one linking <fan_out> libraries
+    from the next level. The libraries are found using DT_RUNPATH, so tools like
+    ldd resolve the whole graph inside the AppDir. Half of the symlinks use
+    absolute targets, as if the AppDir were the root dir. The same seed always
+    produces the same AppDir.
+    """
+
+    def __init__(
+        self,
+        path: pathlib.Path,
+        executables: int = 10,
+        libraries: int = 50,
+        depth: int = 3,
+        fan_out: int = 2,
+        symlinks: int = 10,
+        scripts: int = 10,
+        data_files: int = 100,
+        arch: str = "x86_64",
+        seed: int = 0,
+    ):
+        self.path = pathlib.Path(path)
+        self.executables = executables
+        self.libraries = libraries
+        self.depth = max(depth, 1)
+        self.fan_out = fan_out
+        self.symlinks = symlinks
+        self.scripts = scripts
+        self.data_files = data_files
+        self.arch = arch
+        self.seed = seed
+
+    @staticmethod
+    def with_files_count(path: pathlib.Path, files: int, **kwargs):
+        """AppDir of about <files> files with a typical distribution of their kind"""
+        return SyntheticAppDir(
+            path,
+            executables=max(files * 5 // 100, 1),
+            libraries=max(files * 20 // 100, 1),
+            symlinks=files * 10 // 100,
+            scripts=files * 5 // 100,
+            data_files=files * 60 // 100,
+            **kwargs,
+        )
+
+    def generate(self):
+        rng = random.Random(self.seed)
+        bin_dir = self.path / "usr" / "bin"
+        lib_dir = self.path / "usr" / "lib"
+        bin_dir.mkdir(parents=True, exist_ok=True)
+        lib_dir.mkdir(parents=True, exist_ok=True)
+
+        levels = self._library_levels()
+        for level, names in enumerate(levels):
+            next_level = levels[level + 1] if level + 1 < len(levels) else []
+            for name in names:
+                needed = self._pick(rng, next_level)
+                elf = make_elf(needed, soname=name, runpath="$ORIGIN", arch=self.arch)
+                self._write(lib_dir / name, elf, 0o644)
+
+        for idx in range(self.executables):
+            needed = self._pick(rng, levels[0] if levels else [])
+            elf = make_elf(
+                needed, runpath="$ORIGIN/../lib", executable=True, arch=self.arch
+            )
+            self._write(bin_dir / f"synthetic-{idx}", elf, 0o755)
+
+        interpreters = ["/bin/sh", "/usr/bin/env python3", "/usr/bin/perl"]
+        for idx in range(self.scripts):
+            content = f"#!{interpreters[idx % len(interpreters)]}\necho {idx}\n"
+            self._write(bin_dir / f"script-{idx}", content.encode(), 0o755)
+
+        libraries = [name for names in levels for name in names]
+        for idx in range(self.symlinks):
+            target = rng.choice(libraries) if libraries else "missing.so"
+            if idx % 2:
+                target = f"/usr/lib/{target}"
+            os.symlink(target, lib_dir / f"link-{idx}.so")
+
+        # keep the directories at a realistic size
+        for idx in range(self.data_files):
+            data_dir = self.path / "usr" / "share" / "synthetic" / str(idx // 1000)
+            data_dir.mkdir(parents=True, exist_ok=True)
+            data = rng.randbytes(rng.randrange(64, 4096))
+            self._write(data_dir / f"data-{idx}.dat", data, 0o644)
+
+    def _library_levels(self) -> [[str]]:
+        levels = [[] for _ in range(min(self.depth, self.libraries))]
+        for idx in range(self.libraries):
+            levels[idx * len(levels) // self.libraries].append(f"libsynthetic-{idx}.so")
+        return levels
+
+    def _pick(self, rng: random.Random, libraries: [str]) -> [str]:
+        return rng.sample(libraries, min(self.fan_out, len(libraries)))
+
+    @staticmethod
+    def _write(path: pathlib.Path, data: bytes, mode: int):
+        with open(path, "wb") as f:
+            f.write(data)
+        os.chmod(path, mode)
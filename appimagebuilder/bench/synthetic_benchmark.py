@@ -0,0 +1,73 @@
+#  Copyright  2021 Alexis Lopez Zubieta
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a
+#  copy of this software and associated documentation files (the "Software"),
+#  to deal in the Software without restriction, including without limitation the
+#  rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+#  sell copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+import pathlib
+import tempfile
+
+from appimagebuilder.bench.stage_benchmark import StageBenchmark, StageSkipped
+from appimagebuilder.bench.synthetic_app_dir import SyntheticAppDir
+from appimagebuilder.commands.setup_symlinks import SetupSymlinksCommand
+from appimagebuilder.context import AppInfo, BundleInfo, Context
+from appimagebuilder.modules.deploy.files.dependencies_resolver.elf_resolver import (
+    ElfResolver,
+)
+from appimagebuilder.recipe.roamer import Roamer
+from appimagebuilder.utils.finder import Finder
+
+
+class SyntheticBenchmark(StageBenchmark):
+    """Time the AppDir processing subsystems over a generated AppDir of <files> files"""
+
+    STAGES = ["finder", "scan_files", "resolve", "symlinks"]
+
+    def __init__(self, files: int, **kwargs):
+        super().__init__(f"synthetic-{files}")
+        self.files = files
+        self.generator_args = kwargs
+
+    def _run_once(self, stages: [str]) -> {str: float}:
+        with tempfile.TemporaryDirectory(prefix="appimage-builder-bench-") as tmp:
+            workspace = _Workspace(pathlib.Path(tmp))
+            generator = SyntheticAppDir.with_files_count(
+                workspace.app_dir, self.files, **self.generator_args
+            )
+            generator.generate()
+            return self._time_stages(workspace, stages)
+
+
+class _Workspace:
+    def __init__(self, path: pathlib.Path):
+        self.app_dir = path / "AppDir"
+        self.build_dir = path / "build"
+        self.elf_files = []
+
+    def run_finder(self):
+        finder = Finder(self.app_dir)
+        self.elf_files = list(finder.find("*", [Finder.is_file, Finder.is_elf]))
+
+    def run_scan_files(self):
+        # imported here to not require lief in the other stages
+        from appimagebuilder.modules.setup.apprun_3.app_dir_info import AppDir
+
+        AppDir(self.app_dir).scan_files()
+
+    def run_resolve(self):
+        if not self.elf_files:
+            raise StageSkipped("no ELF files found, the finder stage must run first")
+
+        ElfResolver().resolve(self.elf_files)
+
+    def run_symlinks(self):
+        recipe = Roamer({"version": 1, "AppDir": {}})
+        context = Context(
+            recipe, None, AppInfo(), BundleInfo(), self.app_dir, self.build_dir
+        )
+        SetupSymlinksCommand(context, recipe, Finder(self.app_dir))()
@@ -0,0 +1,66 @@
+#  Copyright  2021 Alexis Lopez Zubieta
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a
+#  copy of this software and associated documentation files (the "Software"),
+#  to deal in the Software without restriction, including without limitation the
+#  rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+#  sell copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+from appimagebuilder.commands.command import Command
+from appimagebuilder.invoker import Invoker
+from appimagebuilder.step_cache import StepCache
+
+
+class BuildPlan:
+    """
+    Describe what a build would do without running it
+
+    Lists the commands in order with the ones they wait for, whether the step
+    cache would skip them and the work they would do.
+    """
+
+    def __init__(self, commands: [Command], cache: StepCache = None):
+        self.commands = commands
+        self.cache = cache
+
+    def format(self) -> str:
+        dependencies = self._direct_dependencies(
+            Invoker.build_dependencies(self.commands)
+        )
+        skipped = self.cache.predict(self.commands) if self.cache else 0
+
+        lines = [f"Build plan, {skipped} of {len(self.commands)} steps are up to date:"]
+        for idx, command in enumerate(self.commands):
+            status = "run"
+            if idx < skipped:
+                status = "cached"
+            elif self.cache and not self.cache.is_cacheable(idx):
+                status = "run, not cacheable"
+
+            after = ", ".join(
+                str(dependency + 1) for dependency in sorted(dependencies[idx])
+            )
+            lines.append(
+                f"{idx + 1:>3}. {command.description} [{status}]"
+                + (f" after {after}" if after else "")
+            )
+            if estimate := command.estimate():
+                lines.append(f"     {estimate}")
+
+        return "\n".join(lines)
+
+    @staticmethod
+    def _direct_dependencies(dependencies: [{int}]) -> [{int}]:
+        """Drop the dependencies already implied by other ones, to keep the plan short"""
+        ancestors = []
+        direct = []
+        for idx, command_dependencies in enumerate(dependencies):
+            implied = set()
+            for dependency in command_dependencies:
+                implied |= ancestors[dependency]
+            direct.append(command_dependencies - implied)
+            ancestors.append(set(command_dependencies) | implied)
+        return direct
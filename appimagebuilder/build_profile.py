@@ -0,0 +1,260 @@
+#  Copyright  2021 Alexis Lopez Zubieta
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a
+#  copy of this software and associated documentation files (the "Software"),
+#  to deal in the Software without restriction, including without limitation the
+#  rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+#  sell copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+import contextlib
+import json
+import logging
+import os
+import pathlib
+import resource
+import sys
+import threading
+import time
+
+from appimagebuilder.commands.command import Command
+from appimagebuilder.utils import shell
+
+# profiles of the commands running on each thread, used by the audit hook
+_thread_state = threading.local()
+_running_profiles = set()
+_hooks_installed = False
+
+
+def _audit_hook(event, args):
+    # counts every process, including the ones not started through utils.shell
+    if event == "subprocess.Popen" and (profile := current_command_profile()):
+        profile.subprocesses += 1
+
+
+def _spawn_listener(record: shell.SpawnRecord):
+    if profile := current_command_profile():
+        profile.subprocesses_time += record.duration
+        profile.spawns.append(record.to_dict())
+
+
+def current_command_profile():
+    """
+    Profile of the command running on the current thread
+
+    Helper threads started by a command don't know which command they work for,
+    their work is attributed to the running command if there is only one.
+    """
+    profile = getattr(_thread_state, "profile", None)
+    if profile is None and len(_running_profiles) == 1:
+        profile = next(iter(_running_profiles), None)
+    return profile
+
+
+class CommandProfile:
+    """Resources used by a single command"""
+
+    def __init__(self, command_id: str, description: str):
+        self.id = command_id
+        self.description = description
+        self.skipped = False
+        self.start = 0.0
+        self.wall_time = 0.0
+        self.cpu_time = 0.0
+        self.children_cpu_time = 0.0
+        self.peak_rss = 0
+        self.subprocesses = 0
+        self.subprocesses_time = 0.0
+        self.spawns = []
+        self.read_bytes = 0
+        self.written_bytes = 0
+        self.thread = 0
+        # ran alongside other commands, the process wide counters aren't its own
+        self.overlapped = False
+
+    def to_dict(self) -> dict:
+        return dict(vars(self))
+
+
+class BuildProfile:
+    """
+    Record the time and resources used by each command of a build
+
+    The cpu time, peak rss and I/O counters are read from the whole process, they
+    are only reported for the commands that ran alone. The ones that ran
+    alongside other commands are marked as overlapped and get only their wall
+    time and the processes they spawned.
+    """
+
+    def __init__(self):
+        self.commands = []
+        self.logger = logging.getLogger("BuildProfile")
+        self._start = time.monotonic()
+        self._lock = threading.Lock()
+        self._measuring = set()
+
+        global _hooks_installed
+        if not _hooks_installed:
+            # audit hooks can't be removed, install them only once
+            sys.addaudithook(_audit_hook)
+            shell.spawn_listeners.append(_spawn_listener)
+            _hooks_installed = True
+
+    def skip(self, command: Command):
+        profile = CommandProfile(command.id(), command.description)
+        profile.skipped = True
+        with self._lock:
+            self.commands.append(profile)
+
+    @contextlib.contextmanager
+    def measure(self, command: Command):
+        profile = CommandProfile(command.id(), command.description)
+        profile.thread = threading.get_ident()
+
+        with self._lock:
+            for other_profile in self._measuring:
+                other_profile.overlapped = True
+            profile.overlapped = bool(self._measuring)
+            self._measuring.add(profile)
+            if not profile.overlapped:
+                self._reset_peak_rss()
+        io_before = self._read_io_counters()
+        usage_before = resource.getrusage(resource.RUSAGE_SELF)
+        children_before = resource.getrusage(resource.RUSAGE_CHILDREN)
+        start = time.monotonic()
+
+        _thread_state.profile = profile
+        _running_profiles.add(profile)
+        try:
+            yield profile
+        finally:
+            _running_profiles.discard(profile)
+            _thread_state.profile = None
+            with self._lock:
+                self._measuring.discard(profile)
+
+            usage = resource.getrusage(resource.RUSAGE_SELF)
+            children = resource.getrusage(resource.RUSAGE_CHILDREN)
+            io = self._read_io_counters()
+
+            profile.start = start - self._start
+            profile.wall_time = time.monotonic() - start
+            profile.cpu_time = (usage.ru_utime + usage.ru_stime) - (
+                usage_before.ru_utime + usage_before.ru_stime
+            )
+            profile.children_cpu_time = (children.ru_utime + children.ru_stime) - (
+                children_before.ru_utime + children_before.ru_stime
+            )
+            profile.peak_rss = self._read_peak_rss() or usage.ru_maxrss * 1024
+            profile.read_bytes = io.get("rchar", 0) - io_before.get("rchar", 0)
+            profile.written_bytes = io.get("wchar", 0) - io_before.get("wchar", 0)
+            with self._lock:
+                if profile.overlapped:
+                    profile.cpu_time = profile.children_cpu_time = None
+                    profile.peak_rss = None
+                    profile.read_bytes = profile.written_bytes = None
+                self.commands.append(profile)
+
+    @staticmethod
+    def _reset_peak_rss():
+        # https://www.kernel.org/doc/html/latest/filesystems/proc.html (clear_refs)
+        try:
+            with open("/proc/self/clear_refs", "w") as f:
+                f.write("5")
+        except OSError:
+            pass
+
+    @staticmethod
+    def _read_peak_rss() -> int:
+        try:
+            with open("/proc/self/status") as f:
+                for line in f:
+                    if line.startswith("VmHWM:"):
+                        return int(line.split()[1]) * 1024
+        except OSError:
+            pass
+        return 0
+
+    @staticmethod
+    def _read_io_counters() -> {str: int}:
+        # includes the I/O of the subprocesses once they are waited for
+        try:
+            with open("/proc/self/io") as f:
+                return {
+                    key: int(value)
+                    for key, value in (line.split(":") for line in f if ":" in line)
+                }
+        except OSError:
+            return {}
+
+    def log_summary(self):
+        header = (
+            f"{'step':<32} {'wall':>8} {'cpu':>8} {'child cpu':>9} {'peak rss':>9} "
+            f"{'procs':>6} {'procs time':>10} {'read':>9} {'written':>9}"
+        )
+        lines = ["Build profile:", header]
+        for profile in sorted(self.commands, key=lambda item: item.start):
+            if profile.skipped:
+                lines.append(f"{profile.description:<32} {'(cached)':>8}")
+                continue
+
+            lines.append(
+                f"{profile.description:<32} {profile.wall_time:>7.2f}s "
+                f"{self._format_time(profile.cpu_time):>8} "
+                f"{self._format_time(profile.children_cpu_time):>9} "
+                f"{self._format_size(profile.peak_rss):>9} {profile.subprocesses:>6} "
+                f"{profile.subprocesses_time:>9.2f}s "
+                f"{self._format_size(profile.read_bytes):>9} "
+                f"{self._format_size(profile.written_bytes):>9}"
+            )
+        if any(profile.overlapped for profile in self.commands):
+            lines.append(
+                "(-) process wide counters of steps that ran alongside other steps"
+            )
+        self.logger.info("\n".join(lines))
+
+    @staticmethod
+    def _format_time(seconds: float) -> str:
+        return "-" if seconds is None else f"{seconds:.2f}s"
+
+    @staticmethod
+    def _format_size(size: int) -> str:
+        return "-" if size is None else f"{size / 2 ** 20:.1f}MiB"
+
+    def write_json(self, path: pathlib.Path):
+        data = {
+            "version": 1,
+            "wall_time": time.monotonic() - self._start,
+            "commands": [profile.to_dict() for profile in self.commands],
+        }
+        self._write(path, data)
+
+    def write_chrome_trace(self, path: pathlib.Path):
+        """Write the profile in the Chrome trace event format (chrome://tracing, Perfetto)"""
+        events = []
+        for profile in self.commands:
+            if profile.skipped:
+                continue
+
+            events.append(
+                {
+                    "name": profile.description,
+                    "cat": profile.id,
+                    "ph": "X",
+                    "ts": int(profile.start * 1e6),
+                    "dur": int(profile.wall_time * 1e6),
+                    "pid": os.getpid(),
+                    "tid": profile.thread,
+                    "args": profile.to_dict(),
+                }
+            )
+        self._write(path, {"traceEvents": events, "displayTimeUnit": "ms"})
+
+    def _write(self, path: pathlib.Path, data):
+        path = pathlib.Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(data, f, indent=2)
+        self.logger.info(f"Build profile written to: {path}")
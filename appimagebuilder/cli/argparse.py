@@ -74,6 +74,47 @@ class ArgumentsParser:
             action="store_true",
             help="Skip AppImage generation",
         )
+        self.parser.add_argument(
+            "--no-cache",
+            dest="no_cache",
+            action="store_true",
+            help="Run every build step even if its results are cached",
+        )
+        self.parser.add_argument(
+            "--profile-trace",
+            dest="profile_trace",
+            action="store_true",
+            help="Also write the build profile in the Chrome trace event format",
+        )
+        self.parser.add_argument(
+            "--max-processes",
+            dest="max_processes",
+            type=int,
+            help="Maximum number of external tools run at once (default: CPUs count)",
+        )
+        self.parser.add_argument(
+            "--plan",
+            dest="plan",
+            action="store_true",
+            help="Validate the recipe and print the build steps, whether they are "
+            "up to date and the work they would do, without running them",
+        )
+        self.parser.add_argument(
+            "--fast-squashfs",
+            dest="fast_squashfs",
+            action="store_true",
+            help="Compress the AppImage payload with zstd level 1, it's faster but "
+            "creates bigger bundles. Meant for development builds",
+        )
+        self.parser.add_argument(
+            "--arch",
+            dest="archs",
+            action="append",
+            help="Build the AppImage of the given architecture, can be repeated to "
+            "build several architectures concurrently. The recipe is loaded with "
+            "TARGET_ARCH set to each one. Every architecture is a full separate "
+            "build, the scripts and the package resolution run once per architecture",
+        )
         self.parser.add_argument(
             "--generate",
             dest="generate",
@@ -9,15 +9,30 @@
 #
 #  The above copyright notice and this permission notice shall be included in
 #  all copies or substantial portions of the Software.
+import importlib
 
-from .command import Command
-from .apt_deploy import AptDeployCommand
-from .create_appimage import CreateAppImageCommand
-from .deploy_record import WriteDeployRecordCommand
-from .file_deploy import FileDeployCommand
-from .pacman_deploy import PacmanDeployCommand
-from .run_script import RunScriptCommand
-from .run_test import RunTestCommand
-from .setup_app_info import SetupAppInfoCommand
-from .setup_runtime import SetupRuntimeCommand
-from .setup_symlinks import SetupSymlinksCommand
+# the commands pull in heavy modules (lief, docker, gnupg...), they are imported
+# on first use so the CLI starts fast when they are not needed
+_EXPORTS = {
+    "Command": ".command",
+    "AptDeployCommand": ".apt_deploy",
+    "CreateAppImageCommand": ".create_appimage",
+    "WriteDeployRecordCommand": ".deploy_record",
+    "FetchAppRunBinariesCommand": ".fetch_apprun",
+    "FileDeployCommand": ".file_deploy",
+    "PacmanDeployCommand": ".pacman_deploy",
+    "RetrievePackagesCommand": ".retrieve_packages",
+    "RunScriptCommand": ".run_script",
+    "RunTestCommand": ".run_test",
+    "SetupAppInfoCommand": ".setup_app_info",
+    "SetupRuntimeCommand": ".setup_runtime",
+    "SetupSymlinksCommand": ".setup_symlinks",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        return getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
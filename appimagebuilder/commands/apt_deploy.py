@@ -9,11 +9,16 @@
 #
 #  The above copyright notice and this permission notice shall be included in
 #  all copies or substantial portions of the Software.
+import json
+import logging
 from pathlib import Path
 
 from appimagebuilder.commands import Command
 from appimagebuilder.context import Context
 from appimagebuilder.modules.deploy.apt import Deploy, Venv
+from appimagebuilder.modules.deploy.apt.package import Package
+from appimagebuilder.modules.deploy.lockfile import Lockfile
+from appimagebuilder.modules.deploy.manifest import DeployManifest
 
 
 class AptDeployCommand(Command):
@@ -26,6 +31,7 @@ class AptDeployCommand(Command):
         sources: [str] = None,
         keys: [str] = None,
         allow_unauthenticated: str = None,
+        lockfile: bool = False,
     ):
         super().__init__(context, "apt deploy")
         self.packages = packages
@@ -34,22 +40,108 @@ class AptDeployCommand(Command):
         self._keys = keys
         self._sources = sources
         self._architectures = architectures
+        self._apt_venv = None
+        self._retrieved_packages = None
+        self._repository_digest = None
+
+        self._lockfile = None
+        if lockfile:
+            self._lockfile = Lockfile(
+                Path(self.context.build_dir) / "apt" / "lock.yml",
+                {
+                    "packages": packages,
+                    "exclude": exclude,
+                    "architectures": architectures,
+                    "sources": sources,
+                    "keys": keys,
+                    "allow_unauthenticated": allow_unauthenticated,
+                },
+            )
 
     def id(self):
         return "apt-deploy"
 
-    def __call__(self, *args, **kwargs):
-        apt_venv = self._setup_apt_venv()
+    def inputs(self) -> {str}:
+        return {"build_dir/apt"}
+
+    def outputs(self) -> {str}:
+        return {"app_dir", "record", "build_dir/apt"}
+
+    def fingerprint(self) -> str:
+        return json.dumps(
+            [
+                self.packages,
+                self._exclude,
+                self._architectures,
+                self._sources,
+                self._keys,
+                self._allow_unauthenticated,
+                bool(self._lockfile),
+                self._repository_state(),
+            ]
+        )
+
+    def _repository_state(self):
+        """
+        Digest of the state the packages are resolved from
+
+        The index is updated here, ahead of the resolution, so new package
+        versions invalidate the cached deploy. Locked deploys don't depend on it.
+        """
+        if not self.packages:
+            return None
+
+        if self._lockfile and (entries := self._lockfile.read()):
+            return json.dumps(entries, sort_keys=True)
+
+        if self._repository_digest is None:
+            self._apt_venv = self._setup_apt_venv()
+            Deploy(self._apt_venv).update()
+            self._repository_digest = self._apt_venv.index_digest()
+        return self._repository_digest
+
+    def estimate(self) -> str:
+        manifest = self._manifest()
+        files = sum(len(package_files) for package_files in manifest.packages.values())
+        return (
+            f"{len(self.packages or [])} packages included, the previous deploy had "
+            f"{len(manifest.packages)} packages and {files} files"
+        )
+
+    def cached_state(self):
+        return self.context.record.get("apt")
 
-        apt_deploy = Deploy(apt_venv)
+    def restore_state(self, state):
+        self.context.record["apt"] = state
 
-        deployed_packages = apt_deploy.deploy(
-            self.packages, self.context.app_dir, self._exclude
+    def retrieve(self):
+        """Resolve and download the packages, the AppDir is not modified"""
+        if self._apt_venv is None:
+            self._apt_venv = self._setup_apt_venv()
+        apt_deploy = Deploy(self._apt_venv)
+
+        if not self.packages:
+            self._retrieved_packages = []
+        elif self._lockfile:
+            self._retrieved_packages = self._retrieve_locked(self._apt_venv, apt_deploy)
+        else:
+            self._retrieved_packages = apt_deploy.resolve(
+                self.packages, self._exclude, self._repository_digest is None
+            )
+
+    def __call__(self, *args, **kwargs):
+        # the packages may have been retrieved already by a RetrievePackagesCommand
+        if self._retrieved_packages is None:
+            self.retrieve()
+
+        apt_deploy = Deploy(self._apt_venv)
+        deployed_packages = apt_deploy.extract(
+            self._retrieved_packages, self.context.app_dir, self._manifest()
         )
 
         self.context.record["apt"] = {
-            "sources": apt_venv.sources,
-            "packages": deployed_packages,
+            "sources": self._apt_venv.sources,
+            "packages": [str(package) for package in deployed_packages],
         }
 
     def _setup_apt_venv(self):
@@ -64,3 +156,47 @@ class AptDeployCommand(Command):
             self._architectures,
             apt_options,
         )
+
+    def _retrieve_locked(self, apt_venv: Venv, apt_deploy: Deploy) -> [Package]:
+        packages = self._read_locked_packages(apt_venv)
+        if packages is None:
+            packages = apt_deploy.resolve(
+                self.packages, self._exclude, self._repository_digest is None
+            )
+            self._write_locked_packages(apt_venv, packages)
+
+        return packages
+
+    def _read_locked_packages(self, apt_venv: Venv):
+        entries = self._lockfile.read()
+        if not entries:
+            return None
+
+        packages = [
+            Package(entry["name"], entry["version"], entry["arch"]) for entry in entries
+        ]
+        if not self._lockfile.verify(entries, apt_venv.resolve_archive_paths(packages)):
+            return None
+
+        logging.info("Using locked packages, skipping apt resolution")
+        return packages
+
+    def _write_locked_packages(self, apt_venv: Venv, packages: [Package]):
+        packages = sorted(packages, key=str)
+        entries = [
+            {
+                "name": package.name,
+                "version": package.version,
+                "arch": package.arch,
+                "sha256": Lockfile.hash_file(path),
+            }
+            for package, path in zip(packages, apt_venv.resolve_archive_paths(packages))
+        ]
+        self._lockfile.write(entries)
+
+    def _manifest(self):
+        return DeployManifest(
+            Path(self.context.build_dir) / "apt" / "manifest.json",
+            self.context.app_dir,
+            self.context.recipe.AppDir.files.exclude() or [],
+        )
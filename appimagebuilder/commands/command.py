@@ -13,7 +13,20 @@ from appimagebuilder.context import Context
 
 
 class Command:
-    """Represent a single action in the AppImage creation process"""
+    """
+    Represent a single action in the AppImage creation process
+
+    Commands declare the resources they read and write (e.g. "app_dir" or
+    "build_dir/apt") so the Invoker can run the ones that don't conflict
+    concurrently. By default a command uses every resource, which makes it
+    run alone and in the recipe order.
+
+    Commands that provide a fingerprint of their inputs can be skipped by the
+    StepCache on rebuilds, their side effects outside of the AppDir and the
+    build dir must be replayable through cached_state() and restore_state().
+    """
+
+    ALL_RESOURCES = "*"
 
     def __init__(self, context: Context, description):
         self.context = context
@@ -22,5 +35,28 @@ class Command:
     def id(self):
         pass
 
+    def inputs(self) -> {str}:
+        """Resources read by the command"""
+        return {Command.ALL_RESOURCES}
+
+    def outputs(self) -> {str}:
+        """Resources modified by the command"""
+        return {Command.ALL_RESOURCES}
+
+    def fingerprint(self) -> str:
+        """Describe everything that affects the command result, None if it can't be cached"""
+        return None
+
+    def estimate(self) -> str:
+        """Describe the amount of work the command will do, shown in the build plan"""
+        return None
+
+    def cached_state(self):
+        """JSON serializable state to be restored when the command is skipped"""
+        return None
+
+    def restore_state(self, state):
+        pass
+
     def __call__(self, *args, **kwargs):
         pass
@@ -16,9 +16,9 @@ from appimagebuilder.recipe.roamer import Roamer
 
 
 class CreateAppImageCommand(Command):
-    def __init__(self, context, recipe: Roamer):
+    def __init__(self, context, recipe: Roamer, fast_squashfs: bool = False):
         super().__init__(context, "AppImage creation")
-        self.primer = AppImagePrimer(context)
+        self.primer = AppImagePrimer(context, fast_squashfs)
 
     def id(self):
         return "prime-bundle"
@@ -12,8 +12,6 @@
 import logging
 import os
 
-from ruamel.yaml import YAML
-
 from appimagebuilder.commands.command import Command
 
 
@@ -24,11 +22,18 @@ class WriteDeployRecordCommand(Command):
     def id(self):
         return "write-deploy-record"
 
+    def fingerprint(self) -> str:
+        # the record is made by the previous steps
+        return ""
+
     def __call__(self, *args, **kwargs):
         path = self.context.app_dir / ".bundle.yml"
         with open(path, "w") as f:
             logging.info(
                 f"Writing deploy record to: {os.path.relpath(path, self.context.app_dir)}"
             )
+            # imported on use, the command is created even for the builds skipping it
+            from ruamel.yaml import YAML
+
             yaml = YAML()
             yaml.dump(self.context.record, f)
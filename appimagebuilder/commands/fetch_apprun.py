@@ -0,0 +1,73 @@
+#  Copyright  2021 Alexis Lopez Zubieta
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a
+#  copy of this software and associated documentation files (the "Software"),
+#  to deal in the Software without restriction, including without limitation the
+#  rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+#  sell copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+import json
+import logging
+
+from appimagebuilder.commands.command import Command
+from appimagebuilder.context import Context
+from appimagebuilder.modules.setup.apprun_binaries_resolver import (
+    AppRunBinariesResolver,
+)
+from appimagebuilder.utils.asset_cache import AssetCacheError
+
+
+class FetchAppRunBinariesCommand(Command):
+    """
+    Download the AppRun binaries for the AppImage architecture ahead of the runtime setup
+
+    The binaries required for other architectures are still fetched by the runtime
+    setup once the AppDir content is known.
+    """
+
+    # AppImage.arch names to the ones used in the AppRun release assets
+    ARCHITECTURES = {
+        "x86_64": "x86_64",
+        "i686": "i386",
+        "aarch64": "aarch64",
+        "armhf": "gnueabihf",
+    }
+
+    def __init__(self, context: Context):
+        super().__init__(context, "AppRun binaries download")
+
+    def id(self):
+        return "apprun-fetch"
+
+    def inputs(self) -> {str}:
+        return set()
+
+    def outputs(self) -> {str}:
+        return {"build_dir/AppRun"}
+
+    def fingerprint(self) -> str:
+        return json.dumps(self._settings())
+
+    def _settings(self):
+        runtime = self.context.recipe.AppDir.runtime
+        return (
+            runtime.version() or "v2.0.0",
+            runtime.debug() or False,
+            self.ARCHITECTURES.get(self.context.bundle_info.runtime_arch),
+        )
+
+    def __call__(self, *args, **kwargs):
+        apprun_version, debug, arch = self._settings()
+        if not arch:
+            return
+
+        resolver = AppRunBinariesResolver(apprun_version, debug, self.context.build_dir)
+        try:
+            resolver.resolve_executable(arch)
+            resolver.resolve_hooks_library(arch)
+        except (AssetCacheError, OSError) as err:
+            # the runtime setup will try again and report the error
+            logging.warning(f"Unable to prefetch the AppRun binaries: {err}")
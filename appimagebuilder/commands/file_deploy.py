@@ -9,6 +9,10 @@
 #
 #  The above copyright notice and this permission notice shall be included in
 #  all copies or substantial portions of the Software.
+import glob
+import json
+import os
+
 from appimagebuilder.commands import Command
 from appimagebuilder.context import Context
 from appimagebuilder.modules.deploy import FileDeploy
@@ -23,6 +27,25 @@ class FileDeployCommand(Command):
     def id(self):
         return "file-deploy"
 
+    def inputs(self) -> {str}:
+        return {"app_dir"}
+
+    def outputs(self) -> {str}:
+        return {"app_dir"}
+
+    def fingerprint(self) -> str:
+        # the included files are tracked by metadata, their dependencies are not
+        files = {}
+        for pattern in self._paths or []:
+            for path in glob.glob(pattern, recursive=True):
+                path_stat = os.stat(path)
+                files[path] = [path_stat.st_size, path_stat.st_mtime_ns]
+
+        return json.dumps([self._paths, self._exclude, files], sort_keys=True)
+
+    def estimate(self) -> str:
+        return f"{len(self._paths or [])} include and {len(self._exclude or [])} exclude patterns"
+
     def __call__(self, *args, **kwargs):
         helper = FileDeploy(str(self.context.app_dir))
         if self._paths:
@@ -9,12 +9,16 @@
 #
 #  The above copyright notice and this permission notice shall be included in
 #  all copies or substantial portions of the Software.
+import json
+import logging
 from pathlib import Path
 
 from appimagebuilder.commands import Command
 from appimagebuilder.context import Context
 from appimagebuilder.modules.deploy.pacman.deploy import Deploy
 from appimagebuilder.modules.deploy.pacman.venv import Venv
+from appimagebuilder.modules.deploy.lockfile import Lockfile
+from appimagebuilder.modules.deploy.manifest import DeployManifest
 
 
 class PacmanDeployCommand(Command):
@@ -26,6 +30,7 @@ class PacmanDeployCommand(Command):
         architecture: str,
         repositories: [str],
         options: dict,
+        lockfile: bool = False,
     ):
         super().__init__(context, "pacman deploy")
 
@@ -34,22 +39,161 @@ class PacmanDeployCommand(Command):
         self._architecture = architecture
         self._repositories = repositories
         self._options = options
+        self._venv = None
+        self._pacman_deploy = None
+        self._package_files = None
+        self._repository_digest = None
+
+        self._lockfile = None
+        if lockfile:
+            self._lockfile = Lockfile(
+                Path(self.context.build_dir) / "pacman" / "lock.yml",
+                {
+                    "packages": packages,
+                    "exclude": exclude,
+                    "architecture": architecture,
+                    "repositories": repositories,
+                    "options": options,
+                },
+            )
 
     def id(self):
         return "pacman-deploy"
 
-    def __call__(self, *args, **kwargs):
-        venv = Venv(
+    def inputs(self) -> {str}:
+        return {"build_dir/pacman"}
+
+    def outputs(self) -> {str}:
+        return {"app_dir", "record", "build_dir/pacman"}
+
+    def fingerprint(self) -> str:
+        return json.dumps(
+            [
+                self._packages,
+                self._exclude,
+                self._architecture,
+                self._repositories,
+                self._options,
+                bool(self._lockfile),
+                self._repository_state(),
+            ]
+        )
+
+    def _repository_state(self):
+        """
+        Digest of the state the packages are resolved from
+
+        The sync databases are updated here, ahead of the resolution, so new
+        package versions invalidate the cached deploy. Locked deploys don't
+        depend on them.
+        """
+        if not self._packages:
+            return None
+
+        if self._lockfile and (entries := self._lockfile.read()):
+            return json.dumps(entries, sort_keys=True)
+
+        if self._repository_digest is None:
+            self._venv = self._create_venv()
+            self._venv.update()
+            self._repository_digest = self._venv.index_digest()
+        return self._repository_digest
+
+    def _create_venv(self):
+        return Venv(
             root=Path(self.context.build_dir) / "pacman",
             repositories=self._repositories,
             architecture=self._architecture,
             user_options=self._options,
         )
 
-        pacman_deploy = Deploy(venv)
-        deployed_packages = pacman_deploy.deploy(
-            self._packages, self.context.app_dir, self._exclude
+    def estimate(self) -> str:
+        manifest = self._manifest()
+        files = sum(len(package_files) for package_files in manifest.packages.values())
+        return (
+            f"{len(self._packages or [])} packages included, the previous deploy had "
+            f"{len(manifest.packages)} packages and {files} files"
+        )
+
+    def cached_state(self):
+        return self.context.record.get("pacman")
+
+    def restore_state(self, state):
+        self.context.record["pacman"] = state
+
+    def retrieve(self):
+        """Resolve and download the packages, the AppDir is not modified"""
+        if self._venv is None:
+            self._venv = self._create_venv()
+
+        self._pacman_deploy = Deploy(self._venv)
+        if not self._packages:
+            self._package_files = []
+        elif self._lockfile:
+            self._package_files = self._retrieve_locked(self._venv)
+        else:
+            self._package_files = self._pacman_deploy.resolve(
+                self._packages, self._exclude, self._repository_digest is None
+            )
+
+    def __call__(self, *args, **kwargs):
+        # the packages may have been retrieved already by a RetrievePackagesCommand
+        if self._package_files is None:
+            self.retrieve()
+
+        deployed_packages = self._pacman_deploy.extract(
+            self._package_files, self.context.app_dir, self._manifest()
         )
         self.context.record["pacman"] = {
             "packages": deployed_packages,
         }
+
+    def _retrieve_locked(self, venv: Venv) -> [str]:
+        package_files = self._read_locked_package_files()
+        if package_files is None:
+            package_files = self._pacman_deploy.resolve(
+                self._packages, self._exclude, self._repository_digest is None
+            )
+            self._write_locked_package_files(
+                package_files, venv.read_packages_data(package_files)
+            )
+
+        return package_files
+
+    def _read_locked_package_files(self):
+        entries = self._lockfile.read()
+        if not entries:
+            return None
+
+        package_files = [Path(entry["file"]) for entry in entries]
+        if not self._lockfile.verify(entries, package_files):
+            return None
+
+        logging.info("Using locked packages, skipping pacman resolution")
+        return [str(file) for file in package_files]
+
+    def _write_locked_package_files(self, package_files, packages_data):
+        entries = []
+        for file, (name, version) in zip(package_files, packages_data):
+            entries.append(
+                {
+                    "name": name,
+                    "version": version,
+                    "arch": self._read_package_file_arch(file),
+                    "file": str(file),
+                    "sha256": Lockfile.hash_file(file),
+                }
+            )
+        self._lockfile.write(entries)
+
+    @staticmethod
+    def _read_package_file_arch(file):
+        # archive names follow the <name>-<version>-<release>-<arch>.pkg.tar.* pattern
+        return Path(file).name.split(".pkg.tar")[0].rsplit("-", 1)[-1]
+
+    def _manifest(self):
+        return DeployManifest(
+            Path(self.context.build_dir) / "pacman" / "manifest.json",
+            self.context.app_dir,
+            self.context.recipe.AppDir.files.exclude() or [],
+        )
@@ -0,0 +1,41 @@
+#  Copyright  2021 Alexis Lopez Zubieta
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a
+#  copy of this software and associated documentation files (the "Software"),
+#  to deal in the Software without restriction, including without limitation the
+#  rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+#  sell copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+from appimagebuilder.commands.command import Command
+from appimagebuilder.context import Context
+
+
+class RetrievePackagesCommand(Command):
+    """
+    Resolve and download the packages of a deploy command ahead of its extraction
+
+    It only touches the package manager dir in the build dir, therefore it can
+    run concurrently with the commands that modify the AppDir.
+    """
+
+    def __init__(self, context: Context, deploy_command: Command):
+        super().__init__(context, f"{deploy_command.description} download")
+        self.deploy_command = deploy_command
+
+    def id(self):
+        return f"{self.deploy_command.id()}-retrieve"
+
+    def inputs(self) -> {str}:
+        return set()
+
+    def outputs(self) -> {str}:
+        return self.deploy_command.inputs()
+
+    def fingerprint(self) -> str:
+        return self.deploy_command.fingerprint()
+
+    def __call__(self, *args, **kwargs):
+        self.deploy_command.retrieve()
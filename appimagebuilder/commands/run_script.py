@@ -9,8 +9,10 @@
 #
 #  The above copyright notice and this permission notice shall be included in
 #  all copies or substantial portions of the Software.
+import json
 import logging
 import os
+import re
 import shutil
 import subprocess
 import tempfile
@@ -18,6 +20,8 @@ import tempfile
 from appimagebuilder.commands.command import Command
 from appimagebuilder.context import Context
 from appimagebuilder.recipe.roamer import Roamer
+from appimagebuilder.utils import shell
+from appimagebuilder.utils.file_utils import tree_digest
 
 
 class RunScriptCommand(Command):
@@ -26,6 +30,16 @@ class RunScriptCommand(Command):
     variables
     """
 
+    # the build outputs and the VCS metadata, large trees the scripts don't read
+    SOURCES_EXCLUDED_PATTERNS = [
+        "*.AppImage",
+        "*.zsync",
+        ".git",
+        ".hg",
+        ".svn",
+        ".bzr",
+    ]
+
     def __init__(
         self, context: Context, script: Roamer, description: str = "script", env=None
     ):
@@ -36,10 +50,43 @@ class RunScriptCommand(Command):
         if not env:
             env = {}
         self.env = env
+        self.exported_env = {}
 
     def id(self):
         return "shell"
 
+    def fingerprint(self) -> str:
+        script = self.script() if isinstance(self.script, Roamer) else self.script
+        if isinstance(script, list):
+            script = "\n".join(script)
+
+        # scripts can use anything in the sources dir and the environment, narrow
+        # it down to the variables referenced by the script
+        referenced_env = {
+            name: os.getenv(name)
+            for name in re.findall(r"\$\{?([A-Za-z_][A-Za-z0-9_]*)", script or "")
+        }
+        source_dir = self.context.recipe_path.parent.absolute()
+        sources_digest = tree_digest(
+            source_dir,
+            excluded_paths=[
+                self.context.app_dir.absolute(),
+                self.context.build_dir.absolute(),
+            ],
+            excluded_patterns=self.SOURCES_EXCLUDED_PATTERNS,
+        )
+        return json.dumps(
+            [script, self.env, referenced_env, sources_digest], sort_keys=True
+        )
+
+    def cached_state(self):
+        return self.exported_env
+
+    def restore_state(self, state):
+        for key, val in state.items():
+            logging.info(f"Exporting env: {key}={val}")
+            os.environ[key] = val
+
     def __call__(self, *args, **kwargs):
         # resolve value
         self.script = self.script()
@@ -71,7 +118,7 @@ class RunScriptCommand(Command):
                 path_env = os.getenv("PATH")
             bash_path = shutil.which("bash", path=path_env)
 
-            _proc = subprocess.Popen(
+            _proc = shell.popen(
                 [bash_path, "-ve"], stdin=subprocess.PIPE, env=run_env
             )
             _proc.communicate(self.script.encode())
@@ -79,13 +126,16 @@ class RunScriptCommand(Command):
             if _proc.returncode != 0:
                 raise RuntimeError(f"Script exited with code: {_proc.returncode}")
 
-            self._load_exported_env(exported_env)
+            self.exported_env = self._load_exported_env(exported_env)
 
     @staticmethod
-    def _load_exported_env(exported_env):
+    def _load_exported_env(exported_env) -> {str: str}:
+        exported = {}
         exported_env.seek(0, 0)
         for line in exported_env.readlines():
             line = line.decode().strip()
             logging.info(f"Exporting env: {line}")
             key, val = line.split("=", 1)
             os.environ[key] = val
+            exported[key] = val
+        return exported
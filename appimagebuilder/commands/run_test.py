@@ -9,6 +9,7 @@
 #
 #  The above copyright notice and this permission notice shall be included in
 #  all copies or substantial portions of the Software.
+import json
 import logging
 import os
 
@@ -29,6 +30,9 @@ class RunTestCommand(Command):
     def id(self):
         return "test"
 
+    def fingerprint(self) -> str:
+        return json.dumps(self.tests_settings(), sort_keys=True, default=str)
+
     def __call__(self, *args, **kwargs):
         try:
             test_cases = self._load_tests(self.tests_settings())
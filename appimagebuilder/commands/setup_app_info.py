@@ -9,6 +9,8 @@
 #
 #  The above copyright notice and this permission notice shall be included in
 #  all copies or substantial portions of the Software.
+import json
+
 from appimagebuilder.modules.setup.desktop_entry_generator import (
     DesktopEntryGenerator,
 )
@@ -24,6 +26,14 @@ class SetupAppInfoCommand(Command):
     def id(self):
         return "app-info-setup"
 
+    def fingerprint(self) -> str:
+        return json.dumps(
+            [vars(self.context.app_info), self.context.bundle_info.runtime_arch],
+            sort_keys=True,
+            # the optional fields missing in the recipe are roam placeholders
+            default=str,
+        )
+
     def __call__(self, *args, **kwargs):
         icon_bundler = IconBundler(self.context.app_dir, self.context.app_info.icon)
         icon_bundler.bundle_icon()
@@ -9,13 +9,12 @@
 #
 #  The above copyright notice and this permission notice shall be included in
 #  all copies or substantial portions of the Software.
+import json
+
 from appimagebuilder.context import Context
-from appimagebuilder.modules.setup.apprun_2.apprun2 import AppRunV2Setup
 from appimagebuilder.commands.command import Command
 from packaging import version
 
-from appimagebuilder.modules.setup.apprun_3.apprun3 import AppRunV3Setup
-
 
 class SetupRuntimeCommand(Command):
     def __init__(self, context: Context, finder):
@@ -26,6 +25,18 @@ class SetupRuntimeCommand(Command):
     def id(self):
         return "runtime-setup"
 
+    def fingerprint(self) -> str:
+        recipe = self.context.recipe
+        return json.dumps(
+            [
+                recipe.AppDir.app_info(),
+                recipe.AppDir.runtime(),
+                self.context.bundle_info.runtime_arch,
+            ],
+            sort_keys=True,
+            default=str,
+        )
+
     def __call__(self, *args, **kwargs):
         apprun_version = self.context.recipe.AppDir.runtime.version() or "v2.0.0"
         apprun_version = version.parse(apprun_version)
@@ -33,9 +44,14 @@ class SetupRuntimeCommand(Command):
         if (
             version.parse("v2.0.0") <= apprun_version < version.parse("v3.0.0")
         ) or apprun_version == version.parse("continuous"):
+            # the AppRun setups are imported on use, they load lief
+            from appimagebuilder.modules.setup.apprun_2.apprun2 import AppRunV2Setup
+
             runtime_setup = AppRunV2Setup(self.context, self._finder)
 
         if not runtime_setup and version.parse("v3.0.0-devel") <= apprun_version < version.parse("v4.0.0"):
+            from appimagebuilder.modules.setup.apprun_3.apprun3 import AppRunV3Setup
+
             runtime_setup = AppRunV3Setup(self.context)
 
         if not runtime_setup:
@@ -9,6 +9,7 @@
 #
 #  The above copyright notice and this permission notice shall be included in
 #  all copies or substantial portions of the Software.
+import json
 import os
 import pathlib
 
@@ -29,6 +30,11 @@ class SetupSymlinksCommand(Command):
     def id(self):
         return "symlinks-setup"
 
+    def fingerprint(self) -> str:
+        return json.dumps(
+            self.context.recipe.AppDir.runtime.preserve() or [], default=str
+        )
+
     def __call__(self, *args, **kwargs):
         for link in self._finder.find("*", [Finder.is_symlink]):
             if Finder.list_does_not_contain_file(self._preserve_files, link):
@@ -9,21 +9,117 @@
 #
 #  The above copyright notice and this permission notice shall be included in
 #  all copies or substantial portions of the Software.
+import contextlib
 import logging
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 
+from appimagebuilder.build_profile import BuildProfile
 from appimagebuilder.commands.command import Command
+from appimagebuilder.step_cache import StepCache
 
 
 class Invoker:
-    """Execute a given set of tasks"""
+    """
+    Execute a given set of tasks
 
-    def __init__(self):
+    Commands run as soon as every previous command they conflict with is done.
+    Two commands conflict when one writes a resource used by the other, in
+    such case they run in the given order.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 4,
+        cache: StepCache = None,
+        profile: BuildProfile = None,
+    ):
         self.logger = logging.getLogger("main")
+        self.max_workers = max_workers
+        self.cache = cache
+        self.profile = profile
 
     def execute(self, commands: [Command] = None):
         if not commands:
             commands = []
 
-        for command in commands:
-            self.logger.info("Running %s", command.description)
+        skipped = self.cache.plan(commands) if self.cache else 0
+        if self.profile:
+            for command in commands[:skipped]:
+                self.profile.skip(command)
+
+        try:
+            self._execute(commands, skipped)
+        finally:
+            if self.cache:
+                self.cache.write()
+
+    def _execute(self, commands: [Command], skipped: int):
+        dependencies = self.build_dependencies(commands)
+        pending = list(range(skipped, len(commands)))
+        finished = set(range(skipped))
+        running = {}
+        error = None
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while pending or running:
+                # stop scheduling new commands after a failure
+                if error is None:
+                    for idx in [i for i in pending if dependencies[i] <= finished]:
+                        pending.remove(idx)
+                        future = executor.submit(self._run, idx, commands[idx])
+                        running[future] = idx
+
+                if not running:
+                    break
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    finished.add(running.pop(future))
+                    if future.exception() and error is None:
+                        error = future.exception()
+
+        if error:
+            raise error
+
+    def _run(self, idx: int, command: Command):
+        self.logger.info("Running %s", command.description)
+        with (
+            self.profile.measure(command) if self.profile else contextlib.nullcontext()
+        ):
             command()
+
+        # the commands depending on this one haven't started yet
+        if self.cache:
+            self.cache.store(idx, command)
+
+    @staticmethod
+    def build_dependencies(commands: [Command]) -> [{int}]:
+        """Map each command (by index) to the previous commands it must wait for"""
+        dependencies = []
+        for idx, command in enumerate(commands):
+            dependencies.append(
+                {
+                    previous_idx
+                    for previous_idx, previous in enumerate(commands[:idx])
+                    if Invoker._conflict(previous, command)
+                }
+            )
+        return dependencies
+
+    @staticmethod
+    def _conflict(first: Command, second: Command) -> bool:
+        first_inputs, first_outputs = first.inputs(), first.outputs()
+        second_inputs, second_outputs = second.inputs(), second.outputs()
+        return Invoker._overlap(
+            first_outputs, second_inputs | second_outputs
+        ) or Invoker._overlap(first_inputs, second_outputs)
+
+    @staticmethod
+    def _overlap(resources: {str}, other_resources: {str}) -> bool:
+        if not resources or not other_resources:
+            return False
+
+        if Command.ALL_RESOURCES in resources | other_resources:
+            return True
+
+        return bool(resources & other_resources)
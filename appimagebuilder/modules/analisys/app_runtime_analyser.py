@@ -71,7 +71,7 @@ class AppRuntimeAnalyser:
             bin=exec_path, args=exec_args, **self._deps, library_paths=library_paths
         )
         self.logger.info(command)
-        _proc = subprocess.run(command, stderr=subprocess.PIPE, shell=True)
+        _proc = shell.run(command, stderr=subprocess.PIPE, shell=True)
 
         if _proc.returncode != 0:
             self.logger.warning(
@@ -13,6 +13,8 @@ import os
 import logging
 import subprocess
 
+from appimagebuilder.utils import shell
+
 
 class AppImageMount:
     def __init__(self, appimage_path):
@@ -37,7 +39,7 @@ class AppImageMount:
             raise RuntimeError("The target is mounted already")
 
         abs_target_path = os.path.abspath(self._appimage_path)
-        self._process = subprocess.Popen(
+        self._process = shell.popen(
             [abs_target_path, "--appimage-mount"], stdout=subprocess.PIPE
         )
         self.path = self._process.stdout.readline().decode("utf-8").strip()
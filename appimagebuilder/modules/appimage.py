@@ -11,10 +11,10 @@
 #  all copies or substantial portions of the Software.
 import os
 import logging
-from urllib import request
 
 from appimagebuilder.context import Context
 from appimagebuilder.utils.appimagetool import AppImageToolCommand
+from appimagebuilder.utils.asset_cache import AssetCache
 
 
 class AppImageCreator:
@@ -78,8 +78,7 @@ class AppImageCreator:
 
     def _download_runtime_if_required(self, runtime_path, runtime_url):
         if not os.path.exists(runtime_path):
-            logging.info(f"Downloading runtime: {runtime_url}")
-            request.urlretrieve(runtime_url, runtime_path)
+            AssetCache().fetch(runtime_url, runtime_path)
 
     def _get_runtime_path(self):
         os.makedirs(self.context.build_dir, exist_ok=True)
@@ -9,13 +9,23 @@
 #
 #   The above copyright notice and this permission notice shall be included in
 #   all copies or substantial portions of the Software.
+import importlib
 
-from .files.deploy_helper import FileDeploy
+# imported on first use, the package managers support pulls in heavy modules
+_EXPORTS = {
+    "FileDeploy": (".files.deploy_helper", "FileDeploy"),
+    "AptDeploy": (".apt.deploy", "Deploy"),
+    "AptVenv": (".apt.venv", "Venv"),
+    "PacmanDeploy": (".pacman.deploy", "Deploy"),
+    "PacmanVenv": (".pacman.venv", "Venv"),
+    "make_symlink_relative": (".util", "make_symlink_relative"),
+}
 
-from .apt.deploy import Deploy as AptDeploy
-from .apt.venv import Venv as AptVenv
+__all__ = list(_EXPORTS)
 
-from .pacman.deploy import Deploy as PacmanDeploy
-from .pacman.venv import Venv as PacmanVenv
 
-from .util import make_symlink_relative
+def __getattr__(name):
+    if name in _EXPORTS:
+        module_name, attr_name = _EXPORTS[name]
+        return getattr(importlib.import_module(module_name, __name__), attr_name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -14,6 +14,8 @@ import os
 import pathlib
 
 from . import listings
+from .package import Package
+from ..manifest import DeployManifest
 from .venv import Venv
 
 
@@ -25,31 +27,58 @@ class Deploy:
         self.logger = logging.getLogger("AptPackageDeploy")
 
     def deploy(
-        self, include_patterns: [str], appdir_root: pathlib.Path, exclude_patterns=None
+        self,
+        include_patterns: [str],
+        appdir_root: pathlib.Path,
+        exclude_patterns=None,
+        manifest: DeployManifest = None,
     ) -> [str]:
         """Deploy the packages and their dependencies to appdir_root.
 
         Packages listed in exclude will not be deployed nor their dependencies.
         Packages from the system services and graphics listings will be added by default to the exclude list.
+        If a manifest is provided only the packages that changed since the previous deploy are extracted.
         """
         if not include_patterns:
             # quick return if there is no packages to be deployed
             return
 
-        self._prepare_apt_venv()
-        deploy_list = self._resolve_packages_to_deploy(
-            include_patterns, exclude_patterns
-        )
-        extracted_packages = self._extract_packages(appdir_root, deploy_list)
+        deploy_list = self.resolve(include_patterns, exclude_patterns)
+        extracted_packages = self.extract(deploy_list, appdir_root, manifest)
         return [str(package) for package in extracted_packages]
 
-    def _prepare_apt_venv(self):
+    def resolve(
+        self, include_patterns: [str], exclude_patterns=None, update_index=True
+    ) -> [Package]:
+        """Resolve and download the packages to be deployed
+
+        The packages index is updated first unless update_index is False, which
+        allows reusing an index updated by the caller.
+        """
+        if update_index:
+            self.update()
+        self._prepare_apt_venv()
+        return self._resolve_packages_to_deploy(include_patterns, exclude_patterns)
+
+    def update(self):
+        """Update the packages index"""
         if not os.getenv("ABUILDER_APT_SKIP_UPDATE", False):
             self.apt_venv.update()
         else:
             self.logger.warning(
                 "Skipping`apt update` execution. Newly added sources will not be available!"
             )
+
+    def extract(
+        self,
+        packages: [Package],
+        appdir_root: pathlib.Path,
+        manifest: DeployManifest = None,
+    ) -> [Package]:
+        """Extract already downloaded packages into appdir_root"""
+        return self._extract_packages(appdir_root, packages, manifest)
+
+    def _prepare_apt_venv(self):
         # set apt core packages as installed, required for it to properly resolve dependencies
         apt_core_packages = self.apt_venv.search_packages(listings.apt_core)
         apt_core_packages = self._remove_old_packages(apt_core_packages)
@@ -68,15 +97,29 @@ class Deploy:
         self.apt_venv.set_installed_packages(excluded_packages)
         return set(self.apt_venv.resolve_packages(include_patterns))
 
-    def _extract_packages(self, appdir_root, packages):
+    def _extract_packages(self, appdir_root, packages, manifest=None):
         # ensure target directories exists
         appdir_root.mkdir(exist_ok=True, parents=True)
+
+        outdated_packages = None
+        if manifest:
+            outdated_packages = manifest.refresh([str(package) for package in packages])
+
         for package in packages:
+            if outdated_packages is not None and str(package) not in outdated_packages:
+                self.logger.debug(f"Skipping up to date package {package}")
+                continue
+
             final_target = appdir_root
             self.logger.info(
                 f"Deploying {package.get_expected_file_name()} to {final_target}"
             )
             self.apt_venv.extract_package(package, final_target)
+            if manifest:
+                manifest.add(str(package), self.apt_venv.list_package_files(package))
+
+        if manifest:
+            manifest.write()
 
         return packages
 
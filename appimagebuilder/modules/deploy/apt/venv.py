@@ -17,10 +17,12 @@ import logging
 import os
 import pathlib
 import subprocess
+import tarfile
 from pathlib import Path
 from urllib import request
 
 from appimagebuilder.utils import shell
+from appimagebuilder.utils.file_utils import files_digest
 from .package import Package
 
 DEPENDS_ON = ["dpkg-deb", "apt-get", "apt-key", "fakeroot", "apt-cache"]
@@ -147,7 +149,7 @@ class Venv:
         command = command.format(**self._deps)
         self.logger.debug(command)
 
-        _proc = subprocess.run(
+        _proc = shell.run(
             command, stdout=subprocess.PIPE, shell=True, env=self._get_environment()
         )
         shell.assert_successful_result(_proc)
@@ -157,9 +159,13 @@ class Venv:
         command = "apt-get update"
         self.logger.info(command)
 
-        _proc = subprocess.run(command, shell=True, env=self._get_environment())
+        _proc = shell.run(command, shell=True, env=self._get_environment())
         shell.assert_successful_result(_proc)
 
+    def index_digest(self) -> str:
+        """Digest of the Release files fetched by the last update"""
+        return files_digest(sorted((self._base_path / "lists").glob("*Release")))
+
     def search_names(self, patterns: [str]):
         output = self._run_apt_cache_pkgnames()
         packages = output.stdout.decode("utf-8").splitlines()
@@ -173,7 +179,7 @@ class Venv:
     def _run_apt_cache_pkgnames(self):
         command = "{apt-cache} pkgnames".format(**self._deps)
         self.logger.debug(command)
-        proc = subprocess.run(
+        proc = shell.run(
             command, stdout=subprocess.PIPE, shell=True, env=self._get_environment()
         )
         shell.assert_successful_result(proc)
@@ -198,7 +204,7 @@ class Venv:
             "{packages}".format(**self._deps, packages=" ".join(packages))
         )
         self.logger.debug(command)
-        command = subprocess.run(
+        command = shell.run(
             command,
             stderr=subprocess.PIPE,
             shell=True,
@@ -217,15 +223,31 @@ class Venv:
     def extract_package(self, package, target):
         # ensure target path existence
         # os.makedirs(target, exist_ok=True) # may fall in a race condition see https://github.com/python/cpython/issues/46016
-        subprocess.run(["mkdir", "-p", target])
+        shell.run(["mkdir", "-p", target])
 
         path = self._apt_archives_path / package.get_expected_file_name()
 
         command = " ".join([str(self._deps["dpkg-deb"]), "-x", str(path), str(target)])
         self.logger.debug(command)
-        output = subprocess.run(command, shell=True, env=self._get_environment())
+        output = shell.run(command, shell=True, env=self._get_environment())
         shell.assert_successful_result(output)
 
+    def list_package_files(self, package) -> [str]:
+        """List the files (but not directories) contained in the package data archive"""
+        path = self._apt_archives_path / package.get_expected_file_name()
+        command = [str(self._deps["dpkg-deb"]), "--fsys-tarfile", str(path)]
+        self.logger.debug(" ".join(command))
+        with shell.popen(command, stdout=subprocess.PIPE) as proc:
+            # stream the archive instead of loading it into memory
+            with tarfile.open(fileobj=proc.stdout, mode="r|") as tar:
+                files = [
+                    os.path.normpath(member.name)
+                    for member in tar
+                    if not member.isdir()
+                ]
+        shell.assert_successful_result(proc)
+        return files
+
     def _write_dpkg_arch(self, architectures: [str]):
         with open(self._dpkg_path / "arch", "w") as f:
             for arch in architectures:
@@ -12,15 +12,16 @@
 import os
 import pathlib
 import re
-import shutil
 import subprocess
 
+from appimagebuilder.utils import shell
 from .base_resolver import BaseResolver
 
 
 class ElfResolver(BaseResolver):
     def __init__(self):
         self.needed_libraries_cache = {}
+        self._ldd_bin = None
 
     def resolve(self, files: [pathlib.Path]) -> [pathlib.Path]:
         results = []
@@ -42,16 +43,17 @@ class ElfResolver(BaseResolver):
 
         return needed_libraries
 
-    @staticmethod
-    def _resolved_needed_using_ldd(file):
-        ldd_bin = shutil.which("ldd")
+    def _resolved_needed_using_ldd(self, file):
+        # looked up on first use, the resolver is also created when nothing is resolved
+        if not self._ldd_bin:
+            self._ldd_bin = shell.require_executable("ldd")
 
         # set locale to C to avoid output variations due localizations
         _proc_env = os.environ.copy()
         _proc_env["LC_ALL"] = "C"
 
-        _proc = subprocess.run(
-            [ldd_bin, str(file)],
+        _proc = shell.run(
+            [self._ldd_bin, str(file)],
             stdout=subprocess.PIPE,
             stderr=subprocess.PIPE,
             env=_proc_env,
@@ -0,0 +1,77 @@
+#  Copyright  2021 Alexis Lopez Zubieta
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a
+#  copy of this software and associated documentation files (the "Software"),
+#  to deal in the Software without restriction, including without limitation the
+#  rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+#  sell copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+import hashlib
+import json
+import logging
+import pathlib
+
+from ruamel.yaml import YAML
+
+
+class Lockfile:
+    """
+    Pins the exact set of packages resolved for a recipe section.
+
+    The lock is bound to a hash of the section it was generated from, editing
+    the section invalidates it and the packages are resolved again.
+    """
+
+    def __init__(self, path: pathlib.Path, section: dict):
+        self.path = pathlib.Path(path)
+        self.section_hash = self.hash_section(section)
+        self.logger = logging.getLogger("Lockfile")
+
+    @staticmethod
+    def hash_section(section: dict) -> str:
+        data = json.dumps(section, sort_keys=True, default=str)
+        return hashlib.sha256(data.encode()).hexdigest()
+
+    @staticmethod
+    def hash_file(path) -> str:
+        sha256 = hashlib.sha256()
+        with open(path, "rb") as f:
+            while data := f.read(2 ** 20):
+                sha256.update(data)
+        return sha256.hexdigest()
+
+    def read(self) -> [dict]:
+        """Returns the locked packages or None if the lock is missing or outdated"""
+        if not self.path.exists():
+            return None
+
+        with open(self.path) as f:
+            data = YAML(typ="safe").load(f) or {}
+
+        if data.get("section") != self.section_hash:
+            self.logger.info(f"Recipe section changed, ignoring lockfile: {self.path}")
+            return None
+
+        return data.get("packages") or None
+
+    def write(self, packages: [dict]):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "w") as f:
+            self.logger.info(f"Writing lockfile: {self.path}")
+            YAML().dump({"section": self.section_hash, "packages": packages}, f)
+
+    def verify(self, packages: [dict], files: [pathlib.Path]) -> bool:
+        """Check that every locked package archive is still in the cache unmodified"""
+        for package, file in zip(packages, files):
+            if not file.exists():
+                self.logger.info(f"Missing cached package archive: {file}")
+                return False
+
+            if self.hash_file(file) != package["sha256"]:
+                self.logger.warning(f"Package archive checksum mismatch: {file}")
+                return False
+
+        return True
@@ -0,0 +1,155 @@
+#  Copyright  2021 Alexis Lopez Zubieta
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a
+#  copy of this software and associated documentation files (the "Software"),
+#  to deal in the Software without restriction, including without limitation the
+#  rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+#  sell copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+import fnmatch
+import json
+import logging
+import os
+import pathlib
+import stat
+
+
+class DeployManifest:
+    """
+    Keeps track of the files each package contributed to an AppDir.
+
+    Packages are identified by a key that changes with their version, therefore
+    on a rebuild only the packages whose key changed need to be redeployed. The
+    files of packages that are no longer part of the deploy list are removed.
+
+    The size and modification time of every file are recorded when the package
+    is added, a package whose files were modified or removed afterwards is
+    redeployed. Files matching the excluded patterns are expected to be removed
+    by the files deploy step and don't trigger a redeploy.
+    """
+
+    def __init__(
+        self,
+        path: pathlib.Path,
+        app_dir: pathlib.Path,
+        excluded_patterns: [str] = None,
+    ):
+        self.path = pathlib.Path(path)
+        self.app_dir = pathlib.Path(app_dir)
+        self.excluded_patterns = excluded_patterns or []
+        self.packages = {}
+        self.logger = logging.getLogger("DeployManifest")
+
+        self._load()
+
+    def _load(self):
+        if not self.path.exists():
+            return
+
+        with open(self.path) as f:
+            data = json.load(f)
+
+        # manifests are only valid for the AppDir they were generated for
+        if data.get("app_dir") == str(self.app_dir):
+            self.packages = {
+                key: files
+                for key, files in data.get("packages", {}).items()
+                # manifests written by previous versions lack the file stats
+                if isinstance(files, dict)
+            }
+
+    def write(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "w") as f:
+            json.dump({"app_dir": str(self.app_dir), "packages": self.packages}, f)
+
+    def refresh(self, keys: [str]) -> {str}:
+        """
+        Remove the files of the packages that are not in keys anymore.
+
+        :return: the keys of the packages that must be (re)deployed
+        """
+        keys = set(keys)
+        stale_keys = set(self.packages).difference(keys)
+        self._remove_stale_files(stale_keys)
+
+        outdated_keys = set()
+        for key in keys:
+            if key not in self.packages or not self._is_deployed(key):
+                outdated_keys.add(key)
+
+        self.logger.info(
+            f"{len(keys) - len(outdated_keys)} packages up to date, "
+            f"{len(outdated_keys)} to deploy, {len(stale_keys)} to remove"
+        )
+        return outdated_keys
+
+    def add(self, key: str, files: [str]):
+        """Record the files of a package, must be called after extracting it"""
+        self.packages[key] = {
+            file: self._read_stat(self.app_dir / file) for file in sorted(files)
+        }
+
+    def _is_deployed(self, key):
+        for file, recorded_stat in self.packages[key].items():
+            path = self.app_dir / file
+            # glibc files are moved to the compat runtime by the AppRun setup
+            compat_path = self.app_dir / "runtime" / "compat" / file
+            file_stat = self._read_stat(path) or self._read_stat(compat_path)
+            if file_stat is None and self._is_excluded(file):
+                continue
+            if file_stat != recorded_stat:
+                return False
+        return True
+
+    @staticmethod
+    def _read_stat(path: pathlib.Path):
+        try:
+            st = os.lstat(path)
+        except FileNotFoundError:
+            return None
+
+        # directories change with their contents, only their existence matters
+        if stat.S_ISDIR(st.st_mode):
+            return []
+        return [st.st_size, st.st_mtime_ns]
+
+    def _is_excluded(self, file: str) -> bool:
+        # excluded directories are removed with all their contents
+        paths = [file, *(str(parent) for parent in pathlib.PurePath(file).parents)]
+        return any(
+            fnmatch.fnmatch(path, pattern)
+            for path in paths
+            for pattern in self.excluded_patterns
+        )
+
+    def _remove_stale_files(self, stale_keys):
+        owned_files = set()
+        for key, files in self.packages.items():
+            if key not in stale_keys:
+                owned_files.update(files)
+
+        for key in stale_keys:
+            self.logger.info(f"Removing {key}")
+            for file in self.packages.pop(key):
+                if file not in owned_files:
+                    self._remove_file(self.app_dir / file)
+                    self._remove_file(self.app_dir / "runtime" / "compat" / file)
+
+    def _remove_file(self, path: pathlib.Path):
+        if path.is_symlink() or path.is_file():
+            path.unlink()
+        else:
+            return
+
+        # remove the parent dirs that become empty
+        parent = path.parent
+        while parent != self.app_dir and self.app_dir in parent.parents:
+            try:
+                parent.rmdir()
+            except OSError:
+                break
+            parent = parent.parent
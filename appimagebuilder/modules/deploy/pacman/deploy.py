@@ -11,9 +11,11 @@
 #   all copies or substantial portions of the Software.
 import logging
 import os
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 from .venv import Venv
+from ..manifest import DeployManifest
 
 
 class Deploy:
@@ -51,14 +53,31 @@ class Deploy:
         self.pacman_venv = venv
         self.logger = logging.getLogger("PacmanPackageDeploy")
 
-    def deploy(self, packages: [str], appdir_root: str, exclude: [str] = None):
+    def deploy(
+        self,
+        packages: [str],
+        appdir_root: str,
+        exclude: [str] = None,
+        manifest: DeployManifest = None,
+    ):
         if not packages:
             # quick return if there is no packages to be deployed
             return
 
-        self.pacman_venv.update()
+        package_files = self.resolve(packages, exclude)
+        return self.extract(package_files, appdir_root, manifest)
+
+    def resolve(
+        self, packages: [str], exclude: [str] = None, update_index=True
+    ) -> [str]:
+        """Resolve and download the packages to be deployed, returns the package files
+
+        The sync databases are updated first unless update_index is False, which
+        allows reusing databases updated by the caller.
+        """
+        if update_index:
+            self.pacman_venv.update()
 
-        appdir_root = Path(appdir_root)
         if not exclude:
             exclude = []
 
@@ -73,10 +92,38 @@ class Deploy:
 
         package_files = self.pacman_venv.retrieve(packages, exclude)
         self.logger.debug(f'Candidate packages: {" ".join(package_files)}')
+        return package_files
+
+    def extract(
+        self,
+        package_files: [str],
+        appdir_root: str,
+        manifest: DeployManifest = None,
+    ) -> [str]:
+        """Extract already downloaded package files into appdir_root
+
+        If a manifest is provided only the packages that changed since the previous deploy are extracted.
+        """
+        appdir_root = Path(appdir_root)
+
+        # read all the package headers in one batch
+        packages_data = self.pacman_venv.read_packages_data(package_files)
+        deployed_packages = [f"{name}={version}" for name, version in packages_data]
+
+        # the manifest uses the deploy record names, the AppDir layout matches them
+        outdated_packages = None
+        if manifest:
+            outdated_packages = manifest.refresh(deployed_packages)
+
+        extraction_jobs = []
+        for file, (name, version) in zip(package_files, packages_data):
+            if (
+                outdated_packages is not None
+                and f"{name}={version}" not in outdated_packages
+            ):
+                self.logger.debug(f"Skipping up to date package {name}={version}")
+                continue
 
-        deployed_packages = []
-        for file in package_files:
-            name, version = self.pacman_venv.read_package_data(file)
             target = (
                 appdir_root / "runtime" / "compat"
                 if name in self.listings["glibc"]
@@ -84,21 +131,48 @@ class Deploy:
             )
 
             self.logger.info(f"Deploying {name}={version} to {target}")
-            self.pacman_venv.extract(file, target)
-            deployed_packages.append(f"{name}={version}")
+            extraction_jobs.append((f"{name}={version}", file, target))
+
+        # pacman packages don't share files, therefore they can be extracted concurrently
+        with ThreadPoolExecutor() as executor:
+            futures = [
+                executor.submit(self._extract_package, file, target, bool(manifest))
+                for _, file, target in extraction_jobs
+            ]
+            extracted_files = [future.result() for future in futures]
+
+        if manifest:
+            for (package, _, target), files in zip(extraction_jobs, extracted_files):
+                target_prefix = target.relative_to(appdir_root)
+                manifest.add(
+                    package,
+                    [os.path.normpath(target_prefix / path) for path in files],
+                )
+            manifest.write()
 
         # create symlinks existent in a regular archlinux system
-        os.symlink("usr/bin", appdir_root / "bin")
-        os.symlink("usr/bin", appdir_root / "sbin")
-        os.symlink("usr/lib", appdir_root / "lib")
-        os.symlink("usr/lib", appdir_root / "lib64")
-        os.symlink("lib", appdir_root / "usr" / "lib64")
-        os.symlink("bin", appdir_root / "usr" / "sbin")
-
-        os.symlink("usr/bin", appdir_root / "runtime" / "compat" / "bin")
-        os.symlink("usr/bin", appdir_root / "runtime" / "compat" / "sbin")
-        os.symlink("usr/lib", appdir_root / "runtime" / "compat" / "lib")
-        os.symlink("usr/lib", appdir_root / "runtime" / "compat" / "lib64")
-        os.symlink("lib", appdir_root / "runtime" / "compat" / "usr" / "lib64")
-        os.symlink("bin", appdir_root / "runtime" / "compat" / "usr" / "sbin")
+        self._symlink("usr/bin", appdir_root / "bin")
+        self._symlink("usr/bin", appdir_root / "sbin")
+        self._symlink("usr/lib", appdir_root / "lib")
+        self._symlink("usr/lib", appdir_root / "lib64")
+        self._symlink("lib", appdir_root / "usr" / "lib64")
+        self._symlink("bin", appdir_root / "usr" / "sbin")
+
+        self._symlink("usr/bin", appdir_root / "runtime" / "compat" / "bin")
+        self._symlink("usr/bin", appdir_root / "runtime" / "compat" / "sbin")
+        self._symlink("usr/lib", appdir_root / "runtime" / "compat" / "lib")
+        self._symlink("usr/lib", appdir_root / "runtime" / "compat" / "lib64")
+        self._symlink("lib", appdir_root / "runtime" / "compat" / "usr" / "lib64")
+        self._symlink("bin", appdir_root / "runtime" / "compat" / "usr" / "sbin")
         return deployed_packages
+
+    def _extract_package(self, file, target, list_files):
+        self.pacman_venv.extract(file, target)
+        if list_files:
+            return self.pacman_venv.list_package_files(file)
+
+    @staticmethod
+    def _symlink(target, link: Path):
+        # links are kept from previous deploys when the AppDir is updated in place
+        if not os.path.lexists(link):
+            os.symlink(target, link)
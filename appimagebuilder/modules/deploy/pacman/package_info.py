@@ -0,0 +1,107 @@
+#   Copyright  2020 Alexis Lopez Zubieta
+#
+#   Permission is hereby granted, free of charge, to any person obtaining a
+#   copy of this software and associated documentation files (the "Software"),
+#   to deal in the Software without restriction, including without limitation the
+#   rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+#   sell copies of the Software, and to permit persons to whom the Software is
+#   furnished to do so, subject to the following conditions:
+#
+#   The above copyright notice and this permission notice shall be included in
+#   all copies or substantial portions of the Software.
+import contextlib
+import os
+import tarfile
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+
+class PackageInfoError(RuntimeError):
+    pass
+
+
+class PackageInfo:
+    """Metadata stored in the .PKGINFO file of a pacman package archive"""
+
+    def __init__(self, name: str, version: str, arch: str, depends: [str]):
+        self.name = name
+        self.version = version
+        self.arch = arch
+        self.depends = depends
+
+    @staticmethod
+    def parse(data: str):
+        fields = {}
+        for line in data.splitlines():
+            if not line or line.startswith("#"):
+                continue
+
+            key, _, value = line.partition(" = ")
+            fields.setdefault(key.strip(), []).append(value.strip())
+
+        if "pkgname" not in fields or "pkgver" not in fields:
+            raise PackageInfoError("Malformed .PKGINFO, missing pkgname or pkgver")
+
+        return PackageInfo(
+            fields["pkgname"][0],
+            fields["pkgver"][0],
+            fields.get("arch", [None])[0],
+            fields.get("depend", []),
+        )
+
+
+def can_read_package_info(path) -> bool:
+    """zstd compressed archives can only be read if the zstandard module is available"""
+    return zstandard is not None or not str(path).endswith(".zst")
+
+
+def read_package_info(path) -> PackageInfo:
+    """
+    Read the .PKGINFO of a package archive without extracting it.
+
+    The archive is decompressed as a stream and the reading stops as soon as the
+    .PKGINFO entry is found, which makepkg places at the beginning of the archive.
+    """
+    with open_archive(path) as tar:
+        for member in tar:
+            if member.name == ".PKGINFO":
+                data = tar.extractfile(member).read().decode("utf-8")
+                return PackageInfo.parse(data)
+
+    raise PackageInfoError(f"Unable to find .PKGINFO in '{path}'")
+
+
+def read_package_files(path) -> [str]:
+    """List the files (but not directories nor metadata entries) of a package archive"""
+    with open_archive(path) as tar:
+        return [
+            os.path.normpath(member.name)
+            for member in tar
+            if not member.isdir() and not member.name.startswith(".")
+        ]
+
+
+@contextlib.contextmanager
+def open_archive(path):
+    """Open a, possibly zstd compressed, tar archive for sequential reading"""
+    with open(path, "rb") as raw_file:
+        if raw_file.read(4) == ZSTD_MAGIC:
+            if not zstandard:
+                raise PackageInfoError(f"Unable to read '{path}', zstandard is missing")
+            raw_file.seek(0)
+            stream = zstandard.ZstdDecompressor().stream_reader(
+                raw_file, read_across_frames=True
+            )
+            mode = "r|"
+        else:
+            raw_file.seek(0)
+            stream = raw_file
+            mode = "r|*"
+
+        with tarfile.open(fileobj=stream, mode=mode) as tar:
+            yield tar
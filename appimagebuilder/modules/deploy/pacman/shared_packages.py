@@ -0,0 +1,104 @@
+#  Copyright  2021 Alexis Lopez Zubieta
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a
+#  copy of this software and associated documentation files (the "Software"),
+#  to deal in the Software without restriction, including without limitation the
+#  rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+#  sell copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+import contextlib
+import fcntl
+import hashlib
+import logging
+import os
+import shutil
+from pathlib import Path
+
+from appimagebuilder.utils.file_utils import user_cache_dir
+from .sync_db import SyncDatabase
+
+
+class SharedPackages:
+    """
+    Pool of the architecture independent packages (*-any.pkg.tar.*) shared
+    between builds
+
+    The ones downloaded by the build of one architecture are reused by the builds
+    of the other architectures, and by later builds. They are stored by the
+    sha256 the sync database lists for them, so packages of different
+    repositories sharing a file name are never mixed up. Only the packages
+    downloaded by pacman, and so verified, are added to the pool.
+    """
+
+    def __init__(self, path: Path = None):
+        self.path = Path(path) if path else user_cache_dir("pacman", "any")
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.logger = logging.getLogger("pacman")
+
+    @contextlib.contextmanager
+    def lock(self, paths: [str], sync_db: SyncDatabase):
+        """
+        Lock the pooled packages of <paths> while they are restored, downloaded and added
+
+        Concurrent builds needing one of them wait and reuse it, the builds not
+        sharing packages don't wait for each other.
+        """
+        pooled_paths = {self._pooled_path(path, sync_db) for path in paths}
+        with contextlib.ExitStack() as stack:
+            # always locked in the same order, two builds never wait on each other
+            for pooled_path in sorted(path for path in pooled_paths if path):
+                lock_file = stack.enter_context(open(f"{pooled_path}.lock", "w"))
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            yield
+
+    def restore(self, paths: [str], sync_db: SyncDatabase) -> [str]:
+        """Copy the pooled packages to <paths>, returns the paths not in the pool"""
+        missing = []
+        for path in paths:
+            pooled_path = self._pooled_path(path, sync_db)
+            if pooled_path and pooled_path.exists():
+                self.logger.info(f"Using shared package: {os.path.basename(path)}")
+                shutil.copyfile(pooled_path, path)
+            else:
+                missing.append(path)
+
+        return missing
+
+    def add(self, paths: [str], sync_db: SyncDatabase):
+        for path in paths:
+            pooled_path = self._pooled_path(path, sync_db)
+            if not pooled_path or pooled_path.exists():
+                continue
+
+            if _file_sha256(path) != pooled_path.name:
+                self.logger.warning(
+                    f"Not sharing package with unexpected sha256: {path}"
+                )
+                continue
+
+            # copied aside and renamed, a partial file is never taken as pooled
+            partial_path = pooled_path.with_name(f"{pooled_path.name}.{os.getpid()}")
+            shutil.copyfile(path, partial_path)
+            os.replace(partial_path, pooled_path)
+
+    def _pooled_path(self, path: str, sync_db: SyncDatabase) -> Path:
+        file_name = os.path.basename(path)
+        if "-any.pkg.tar" not in file_name:
+            return None
+
+        package = sync_db.filenames.get(file_name)
+        if not package or not package.sha256:
+            return None
+
+        return self.path / package.sha256
+
+
+def _file_sha256(path) -> str:
+    sha = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(2 ** 20), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
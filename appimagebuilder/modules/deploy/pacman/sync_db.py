@@ -0,0 +1,89 @@
+#   Copyright  2020 Alexis Lopez Zubieta
+#
+#   Permission is hereby granted, free of charge, to any person obtaining a
+#   copy of this software and associated documentation files (the "Software"),
+#   to deal in the Software without restriction, including without limitation the
+#   rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+#   sell copies of the Software, and to permit persons to whom the Software is
+#   furnished to do so, subject to the following conditions:
+#
+#   The above copyright notice and this permission notice shall be included in
+#   all copies or substantial portions of the Software.
+import pathlib
+
+from .package_info import open_archive
+
+
+class SyncPackage:
+    """Package description stored in a sync database"""
+
+    def __init__(self, name: str, version: str, filename: str, sha256: str):
+        self.name = name
+        self.version = version
+        self.filename = filename
+        self.sha256 = sha256
+
+
+class SyncDatabase:
+    """
+    In-process reader of the pacman sync databases (<repo>.db files).
+
+    The databases are tar archives with a <name>-<version>/desc entry per
+    package, the entries are made of "%FIELD%" headers followed by its values.
+    """
+
+    def __init__(self, paths: [pathlib.Path]):
+        self.packages = {}
+        self.filenames = {}
+
+        # databases must be given in the repositories priority order
+        for path in paths:
+            self._read_database(path)
+
+    def _read_database(self, path):
+        with open_archive(path) as tar:
+            for member in tar:
+                if not member.name.endswith("/desc"):
+                    continue
+
+                fields = self.parse_entry(tar.extractfile(member).read().decode())
+                name = fields["NAME"][0]
+                # the first repository providing a package wins, as in pacman
+                package = SyncPackage(
+                    name,
+                    fields["VERSION"][0],
+                    fields["FILENAME"][0],
+                    fields.get("SHA256SUM", [None])[0],
+                )
+                self.packages.setdefault(name, package)
+                self.filenames[package.filename] = package
+
+    @staticmethod
+    def parse_entry(data: str) -> {str: [str]}:
+        fields = {}
+        values = None
+        for line in data.splitlines():
+            if line.startswith("%") and line.endswith("%"):
+                values = fields.setdefault(line[1:-1], [])
+            elif line and values is not None:
+                values.append(line)
+        return fields
+
+
+def read_files_database(path: pathlib.Path):
+    """
+    Iterate over the (file path, package name) pairs of a <repo>.files sync database.
+
+    Directories are skipped, the paths are relative to the system root.
+    """
+    with open_archive(path) as tar:
+        for member in tar:
+            if not member.name.endswith("/files"):
+                continue
+
+            # entries are named <name>-<pkgver>-<pkgrel>
+            package_name = member.name.split("/")[0].rsplit("-", 2)[0]
+            fields = SyncDatabase.parse_entry(tar.extractfile(member).read().decode())
+            for file in fields.get("FILES", []):
+                if not file.endswith("/"):
+                    yield file, package_name
@@ -9,27 +9,64 @@
 #
 #   The above copyright notice and this permission notice shall be included in
 #   all copies or substantial portions of the Software.
+import contextlib
 import glob
+import hashlib
 import logging
 import os
-import re
 import shlex
+import shutil
+import stat
 import subprocess
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from tempfile import TemporaryDirectory
 
 from appimagebuilder.utils import shell
+from appimagebuilder.utils.file_utils import files_digest, user_cache_dir
+from .package_info import (
+    can_read_package_info,
+    read_package_files,
+    read_package_info,
+)
+from .shared_packages import SharedPackages
+from .sync_db import SyncDatabase
 
-DEPENDS_ON = ["bsdtar", "pacman", "pacman-key", "fakeroot", "gpg-agent"]
+DEPENDS_ON = ["bsdtar", "pacman", "pacman-key", "fakeroot", "gpg-agent", "pkill"]
 
 
 class PacmanVenvError(RuntimeError):
     pass
 
 
+def read_config_repositories(path, repositories: [str] = None) -> [str]:
+    """Names of the repositories of a pacman.conf, following its includes, in order"""
+    repositories = [] if repositories is None else repositories
+    try:
+        with open(path) as f:
+            lines = f.read().splitlines()
+    except OSError:
+        # pacman reports the missing files
+        return repositories
+
+    for line in lines:
+        line = line.split("#", 1)[0].strip()
+        if line.startswith("[") and line.endswith("]"):
+            if line[1:-1] != "options" and line[1:-1] not in repositories:
+                repositories.append(line[1:-1])
+        elif "=" in line:
+            key, value = [part.strip() for part in line.split("=", 1)]
+            if key == "Include":
+                for include_path in sorted(glob.glob(value)):
+                    read_config_repositories(include_path, repositories)
+
+    return repositories
+
+
 class Venv:
     default_options = []
+    keyrings_path = Path("/usr/share/pacman/keyrings/")
 
     def __init__(
         self,
@@ -56,34 +93,47 @@ class Venv:
         self._logger = logging.getLogger("pacman")
         self._deps = shell.require_executables(DEPENDS_ON)
         self._generate_config()
-        self._start_gpg_agent()
         self._configure_keyring()
 
-    def __del__(self):
-        # cleanup
-        if hasattr(self, "_gpg_agent_proc") and self._gpg_agent_proc:
-            self._gpg_agent_proc.terminate()
-
     def update(self):
         self._run_command("{fakeroot} {pacman} --config {config} -Sy --quiet")
 
+    def index_digest(self) -> str:
+        """Digest of the sync databases fetched by the last update"""
+        return files_digest(sorted((self._db_path / "sync").glob("*.db")))
+
     def retrieve(self, packages: [str], excluded_packages: [str] = None):
-        initial_install_list = self._run_pacman_list_packages_and_versions(
-            " ".join(packages)
-        )
+        sync_db = self._read_sync_database()
 
         exclude_str = ""
-        packages_str = ""
-        for package in initial_install_list:
-            pkg_name, pkg_version = package.split("=", 1)
-            if pkg_name in excluded_packages:
-                exclude_str = f"{exclude_str}--assume-installed {package} "
-
-            if pkg_name in packages:
-                packages_str = f"{packages_str}{package} "
-
-        self._run_pacman_download_packages(packages_str, exclude_str)
-        return self._run_pacman_list_package_files(exclude_str, packages_str)
+        for name in excluded_packages or []:
+            if name in sync_db.packages:
+                version = sync_db.packages[name].version
+                exclude_str = f"{exclude_str}--assume-installed {name}={version} "
+
+        # the dependencies are resolved only here, the locations tell what's not cached yet
+        packages_str = " ".join(packages)
+        locations = self._run_pacman_list_package_locations(packages_str, exclude_str)
+        files, missing = self._package_files(locations)
+        if missing:
+            shared_packages = SharedPackages()
+            with shared_packages.lock(list(missing), sync_db):
+                downloads = shared_packages.restore(list(missing), sync_db)
+                if downloads:
+                    # the resolved packages are downloaded as they are, skipping the
+                    # dependency checks. pacman verifies their signatures against the keyring
+                    self._run_command(
+                        "{fakeroot} {pacman} --config {config} -Sw "
+                        "--nodeps --nodeps --noconfirm {targets}",
+                        targets=" ".join(missing[path] for path in downloads),
+                    )
+
+                for path in downloads:
+                    if not os.path.exists(path):
+                        raise PacmanVenvError(f"Package not downloaded: {path}")
+                shared_packages.add(downloads, sync_db)
+
+        return files
 
     def extract(self, file, target):
         os.makedirs(target, exist_ok=True)
@@ -97,39 +147,83 @@ class Venv:
         )
         self._run_command(command, file=file, target=target)
 
-    def _run_pacman_download_packages(self, packages_str, exclude_str):
-        self._run_command(
-            "{fakeroot} {pacman} --config {config} -Sy --downloadonly "
-            "--noconfirm {exclude} {packages}",
-            exclude=exclude_str,
-            packages=packages_str,
-        )
-
-    def _run_pacman_list_packages_and_versions(self, packages_str):
-        command = (
-            "{pacman} --config {config} -S "
-            "--print-format '%n=%v' "
-            "--noconfirm {packages}"
-        )
-        output = self._run_command(
-            command, packages=packages_str, stdout=subprocess.PIPE
-        )  # noqa:
-
-        return output.stdout.read().decode("utf-8").splitlines()  # noqa:
-
-    def _run_pacman_list_package_files(self, exclude_str, packages_str):
+    def list_package_files(self, file) -> [str]:
+        """List the files (but not directories) that extract() would deploy"""
+        if can_read_package_info(file):
+            return read_package_files(file)
+
+        command = [self._deps["bsdtar"], "-tf", str(file)]
+        self._logger.debug(" ".join(command))
+        # listings can be large, don't wait on a full pipe as _run_command does
+        output = shell.run(command, stdout=subprocess.PIPE)
+        shell.assert_successful_result(output)
+
+        files = []
+        for line in output.stdout.decode("utf-8").splitlines():
+            # skip directories and the package metadata files (.PKGINFO, .MTREE, ...)
+            if line.endswith("/") or line.startswith("."):
+                continue
+            files.append(os.path.normpath(line))
+        return files
+
+    def _run_pacman_list_package_locations(
+        self, packages_str, exclude_str
+    ) -> [(str, str)]:
+        """Resolve the packages to install, as (<repository>/<name>, location) pairs"""
         command = (
             "{pacman} --config {config} -S "
-            "--print-format '%%l' "
+            "--print-format '%r/%n %l' "
             "--noconfirm {exclude} {packages}"
         )
+        command = command.format(
+            config=self._config_path,
+            exclude=exclude_str,
+            packages=packages_str,
+            **self._deps,
+        )
         self._logger.debug(command)
-        output = self._run_command(
-            command, packages=packages_str, exclude=exclude_str, stdout=subprocess.PIPE
-        )  # noqa:
-        return re.findall("file://(.*)", output.stdout.read().decode("utf-8"))
+        output = shell.run(shlex.split(command), stdout=subprocess.PIPE)
+        shell.assert_successful_result(output)
+        return [
+            tuple(line.split(" ", 1))
+            for line in output.stdout.decode("utf-8").splitlines()
+        ]
+
+    def _package_files(self, locations: [(str, str)]) -> ([str], {str: str}):
+        """Paths of the packages in the cache dir, and the targets of the ones missing there"""
+        files = []
+        missing = {}
+        for target, location in locations:
+            # pacman reports the cache path of the packages already downloaded
+            if location.startswith("file://"):
+                files.append(location[len("file://") :])
+                continue
+
+            path = str(self._cache_dir / location.rsplit("/", 1)[-1])
+            files.append(path)
+            if not os.path.exists(path):
+                missing[path] = target
+
+        return files, missing
+
+    def _read_sync_database(self) -> SyncDatabase:
+        sync_dir = self._db_path / "sync"
+        # in the configuration order, the first repository providing a package wins
+        repositories = self._repositories or read_config_repositories(self._config_path)
+        paths = [sync_dir / f"{repository}.db" for repository in repositories]
+
+        return SyncDatabase([path for path in paths if path.exists()])
+
+    def read_packages_data(self, files: [str]) -> [(str, str)]:
+        """Read the name and version of several package files at once, keeping their order"""
+        with ThreadPoolExecutor() as executor:
+            return list(executor.map(self.read_package_data, files))
 
     def read_package_data(self, file):
+        if can_read_package_info(file):
+            info = read_package_info(file)
+            return info.name, info.version
+
         output = self._run_command(
             "{pacman} -Qp {file}", file=file, stdout=subprocess.PIPE  # noqa:
         )
@@ -171,29 +265,85 @@ class Venv:
     def _configure_keyring(self):
         if not self._keyrings:
             self._logger.info("Using system keyrings")
-            default_keyrigns_path = Path("/usr/share/pacman/keyrings/")
-            for x in default_keyrigns_path.glob("*.gpg"):
+            for x in self.keyrings_path.glob("*.gpg"):
                 self._keyrings.append(x.stem)
 
-        # Ensure the keyring is properly initialized
-        self._run_command("{fakeroot} {pacman-key} --config {config} --init")
-
-        self._run_command(
-            "{fakeroot} {pacman-key} --config {config} --populate {keyrings}",
-            keyrings=" ".join(self._keyrings),
-        )
-
-    def _start_gpg_agent(self):
-        # start gpg-agent if not running
-        #   (pkill -0 doesn't kill the process just checks if it's running)
-        if subprocess.call(["pkill", "-0", "gpg-agent"]) != 0:
-            self._gpg_agent_proc = self._run_command(
-                "{gpg-agent} --homedir" f" {self._gpg_dir}" " --server",
-                assert_success=False,
-                wait_for_completion=False,
+        keyring_id = self._keyring_id()
+        keyring_id_path = self._gpg_dir / ".keyring-id"
+        if keyring_id_path.exists() and keyring_id_path.read_text() == keyring_id:
+            self._logger.info("Keyring is up to date")
+            return
+
+        # populating the keyring takes several seconds, reuse it between builds
+        cache_dir = user_cache_dir("pacman", "gnupg") / keyring_id
+        if cache_dir.exists():
+            self._logger.info(f"Using cached keyring: {cache_dir}")
+            self._copy_gpg_dir(cache_dir, self._gpg_dir)
+            return
+
+        with self._gpg_agent():
+            # Ensure the keyring is properly initialized
+            self._run_command("{fakeroot} {pacman-key} --config {config} --init")
+
+            self._run_command(
+                "{fakeroot} {pacman-key} --config {config} --populate {keyrings}",
+                keyrings=" ".join(self._keyrings),
             )
-        else:
-            self._gpg_agent_proc = None
+        keyring_id_path.write_text(keyring_id)
+
+        # copy aside and rename so concurrent builds never use a partial keyring
+        partial_cache_dir = cache_dir.with_name(f"{cache_dir.name}.{os.getpid()}")
+        self._copy_gpg_dir(self._gpg_dir, partial_cache_dir)
+        try:
+            partial_cache_dir.rename(cache_dir)
+        except OSError:
+            # another build cached the same keyring meanwhile
+            shutil.rmtree(partial_cache_dir)
+
+    def _keyring_id(self) -> str:
+        """Identifies the keyring by the set of keyrings and their files mtimes"""
+        sha = hashlib.sha256()
+        for keyring in sorted(self._keyrings):
+            sha.update(f"{keyring}\n".encode())
+            for path in sorted(self.keyrings_path.glob(f"{keyring}*")):
+                path_stat = path.stat()
+                sha.update(
+                    f"{path}:{path_stat.st_mtime_ns}:{path_stat.st_size}\n".encode()
+                )
+        return sha.hexdigest()[:16]
+
+    @staticmethod
+    def _copy_gpg_dir(source: Path, target: Path):
+        def ignore_sockets(path, names):
+            # gpg-agent sockets are bound to the running agent
+            return [
+                name
+                for name in names
+                if stat.S_ISSOCK(os.lstat(os.path.join(path, name)).st_mode)
+            ]
+
+        shutil.rmtree(target, ignore_errors=True)
+        shutil.copytree(source, target, symlinks=True, ignore=ignore_sockets)
+
+    @contextlib.contextmanager
+    def _gpg_agent(self):
+        """Run a gpg-agent for the keyring setup if there is none running"""
+        #   (pkill -0 doesn't kill the process just checks if it's running)
+        if shell.run([self._deps["pkill"], "-0", "gpg-agent"]).returncode == 0:
+            yield
+            return
+
+        gpg_agent_proc = self._run_command(
+            "{gpg-agent} --homedir" f" {self._gpg_dir}" " --server",
+            stdout=subprocess.DEVNULL,
+            assert_success=False,
+            wait_for_completion=False,
+        )
+        try:
+            yield
+        finally:
+            gpg_agent_proc.terminate()
+            gpg_agent_proc.wait()
 
     def _run_command(
         self,
@@ -219,7 +369,7 @@ class Venv:
         self._logger.debug(command)
 
         # need to split the command into args
-        _proc = subprocess.Popen(
+        _proc = shell.popen(
             shlex.split(command), stdout=stdout, stdin=sys.stdin, stderr=sys.stderr
         )
 
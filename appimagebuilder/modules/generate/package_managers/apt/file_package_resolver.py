@@ -32,7 +32,7 @@ class FilePackageResolver:
         command = "{dpkg-query} -S {files}"
         command = command.format(**self._cli_tools, files=" ".join(files))
         self.logger.info(command)
-        _proc = subprocess.run(command, stdout=subprocess.PIPE, shell=True)
+        _proc = shell.run(command, stdout=subprocess.PIPE, shell=True)
         return _proc.stdout.decode()
 
     def _parse_dpkg_query_s_output(self, stdout_data):
@@ -15,35 +15,80 @@ import pathlib
 import re
 import subprocess
 
+from appimagebuilder.modules.deploy.pacman.venv import read_config_repositories
 from appimagebuilder.utils import shell
+from appimagebuilder.utils.file_utils import user_cache_dir
+from .files_index import FilesIndex
 
 
 class FilePackageResolver:
-    """Resolve which package provide a given file using `pacman -F`"""
+    """
+    Resolve which package provide a given file.
+
+    The .files sync databases are indexed in-process, `pacman -F` is only used
+    as fallback when they are not available.
+    """
 
     REQUIRED_COMMANDS = ["pacman"]
+    # keep the command lines far away from ARG_MAX
+    PACMAN_F_CHUNK_SIZE = 500
 
-    def __init__(self):
+    def __init__(
+        self,
+        sync_dir: pathlib.Path = pathlib.Path("/var/lib/pacman/sync"),
+        config_path: pathlib.Path = pathlib.Path("/etc/pacman.conf"),
+    ):
         self.logger = logging.getLogger(str(self.__class__.__name__))
         self._cli_tools = shell.require_executables(self.REQUIRED_COMMANDS)
+        self.sync_dir = pathlib.Path(sync_dir)
+        self.config_path = pathlib.Path(config_path)
 
     def resolve(self, files) -> {}:
-        output = self._run_pacman_f(files)
-        return self._parse_pacman_f_output(output)
+        """Map each file, as it was given, to the name of its owner package"""
+        files = list(files)
+        databases = self._find_files_databases()
+        if not databases:
+            self._run_pacman_fy()
+            databases = self._find_files_databases()
+
+        if databases:
+            index = FilesIndex(databases, user_cache_dir("pacman"))
+            return index.lookup(files)
+
+        owners = {}
+        for start in range(0, len(files), self.PACMAN_F_CHUNK_SIZE):
+            output = self._run_pacman_f(files[start : start + self.PACMAN_F_CHUNK_SIZE])
+            owners.update(self._parse_pacman_f_output(output))
+        return {
+            file: owners[pathlib.Path(file)]
+            for file in files
+            if pathlib.Path(file) in owners
+        }
+
+    def _find_files_databases(self) -> [pathlib.Path]:
+        # pacman.conf order, which is also their priority
+        repositories = read_config_repositories(self.config_path)
+        if repositories:
+            paths = [self.sync_dir / f"{repo}.files" for repo in repositories]
+            return [path for path in paths if path.exists()]
+
+        return sorted(self.sync_dir.glob("*.files"))
+
+    def _run_pacman_fy(self):
+        command = [self._cli_tools["pacman"], "-Fy"]
+        self.logger.info(" ".join(command))
+        shell.run(command, stdout=subprocess.DEVNULL)
 
     def _run_pacman_f(self, files):
         # make sure that the files are str
-        files = [str(file) for file in files]
-
-        command = "{pacman} -Fy {files}"
+        command = [self._cli_tools["pacman"], "-F"] + [str(file) for file in files]
 
         # ensure C locale is used to avoid locales affecting the output format
         env = os.environ.copy()
         env["LC_ALL"] = "C"
 
-        command = command.format(**self._cli_tools, files=" ".join(files))
-        self.logger.info(command)
-        _proc = subprocess.run(command, stdout=subprocess.PIPE, shell=True, env=env)
+        self.logger.info(" ".join(command[:2]) + f" <{len(files)} files>")
+        _proc = shell.run(command, stdout=subprocess.PIPE, env=env)
         return _proc.stdout.decode()
 
     @staticmethod
@@ -0,0 +1,118 @@
+#  Copyright  2021 Alexis Lopez Zubieta
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a
+#  copy of this software and associated documentation files (the "Software"),
+#  to deal in the Software without restriction, including without limitation the
+#  rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+#  sell copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+import fcntl
+import hashlib
+import logging
+import os
+import pathlib
+import sqlite3
+import tempfile
+
+from appimagebuilder.modules.deploy.pacman.sync_db import read_files_database
+
+
+class FilesIndex:
+    """
+    Persisted path to package index built from the pacman .files sync databases.
+
+    The index is stored as a sqlite database named after the set of .files
+    databases it was built from (files-<paths id>-<state id>.sqlite), it's
+    rebuilt only when one of them changes. The indexes of previous states of
+    the same databases are removed then, the ones of other databases are kept.
+    """
+
+    def __init__(self, databases: [pathlib.Path], cache_dir: pathlib.Path):
+        # databases must be given in the repositories priority order
+        self.databases = [pathlib.Path(path) for path in databases]
+        self.cache_dir = pathlib.Path(cache_dir)
+        self.path = self.cache_dir / (
+            f"files-{self._paths_id()}-{self._databases_id()}.sqlite"
+        )
+        self.logger = logging.getLogger("FilesIndex")
+
+    def _paths_id(self):
+        sha = hashlib.sha256()
+        for path in self.databases:
+            sha.update(f"{path.absolute()}\n".encode())
+        return sha.hexdigest()[:16]
+
+    def _databases_id(self):
+        sha = hashlib.sha256()
+        for path in self.databases:
+            stat = path.stat()
+            sha.update(f"{path}:{stat.st_mtime_ns}:{stat.st_size}\n".encode())
+        return sha.hexdigest()[:16]
+
+    def lookup(self, files: [str]) -> {str: str}:
+        """Find the owner of the given absolute paths, files without owner are omitted"""
+        if not self.path.exists():
+            self._build()
+
+        results = {}
+        with sqlite3.connect(str(self.path)) as connection:
+            for file in files:
+                row = connection.execute(
+                    "SELECT package FROM files WHERE path = ?",
+                    (str(file).lstrip("/"),),
+                ).fetchone()
+                if row:
+                    results[file] = row[0]
+        return results
+
+    def _build(self):
+        self.logger.info("Indexing %s", ", ".join(str(p) for p in self.databases))
+
+        # build aside, in a file of its own, and rename so concurrent builds
+        # never see a partial index
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile(
+            dir=self.cache_dir,
+            prefix=f"{self.path.stem}.",
+            suffix=".part",
+            delete=False,
+        ) as partial_file:
+            partial_path = pathlib.Path(partial_file.name)
+
+        try:
+            connection = sqlite3.connect(str(partial_path))
+            try:
+                connection.execute(
+                    "CREATE TABLE files (path TEXT PRIMARY KEY, package TEXT)"
+                )
+                # the first repository providing a file wins, as in pacman
+                for database in self.databases:
+                    connection.executemany(
+                        "INSERT OR IGNORE INTO files VALUES (?, ?)",
+                        read_files_database(database),
+                    )
+                connection.commit()
+            finally:
+                connection.close()
+        except BaseException:
+            partial_path.unlink()
+            raise
+
+        with open(self.cache_dir / "files.lock", "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            os.replace(partial_path, self.path)
+            self._remove_stale_indexes()
+
+    def _remove_stale_indexes(self):
+        """Remove the indexes of the same databases older than the current one"""
+        current_mtime = self.path.stat().st_mtime_ns
+        for index_path in self.cache_dir.glob(f"files-{self._paths_id()}-*.sqlite"):
+            if (
+                index_path != self.path
+                and index_path.stat().st_mtime_ns < current_mtime
+            ):
+                self.logger.debug(f"Removing stale index: {index_path}")
+                index_path.unlink(missing_ok=True)
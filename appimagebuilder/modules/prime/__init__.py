@@ -9,5 +9,15 @@
 #
 #  The above copyright notice and this permission notice shall be included in
 #  all copies or substantial portions of the Software.
+import importlib
 
-from .appimage_primer import AppImagePrimer
+# imported on first use, the primer pulls in gnupg
+_EXPORTS = {"AppImagePrimer": ".appimage_primer"}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        return getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -10,26 +10,38 @@
 #  The above copyright notice and this permission notice shall be included in
 #  all copies or substantial portions of the Software.
 import hashlib
+import json
 import logging
 import os
 import pathlib
 import shutil
 import stat
-import subprocess
-from urllib import request
-
-import gnupg
-import lief
 
 from appimagebuilder.modules.prime.base_primer import BasePrimer
-from appimagebuilder.utils import shell
+from appimagebuilder.modules.prime.errors import PrimerError
+from appimagebuilder.modules.prime.squashfs_layout import SquashfsLayout
+from appimagebuilder.modules.prime import zsync
+from appimagebuilder.utils import elf, shell
+from appimagebuilder.utils.asset_cache import AssetCache
 
 
 class AppImagePrimer(BasePrimer):
-    def __init__(self, context):
+    # compressors accepting -Xcompression-level and its range
+    COMPRESSION_LEVELS = {"gzip": (1, 9), "lzo": (1, 9), "zstd": (1, 22)}
+    # compression used in development builds, faster to create but bigger
+    FAST_COMPRESSION = ("zstd", 1)
+    # the bundle is read in big chunks to keep the interpreter overhead low
+    READ_BUFFER_SIZE = 2 ** 20
+    # carrier sections patched in the AppImage
+    CARRIER_SECTIONS = [".upd_info", ".sha256_sig", ".sig_key"]
+
+    def __init__(self, context, fast_squashfs: bool = False):
         super().__init__(context)
         self.logger = logging.getLogger("AppImagePrimer")
         self.config = self.context.recipe.AppImage
+        self.fast_squashfs = fast_squashfs
+        # validated early to not fail at the end of the build
+        self.squashfs_options = self._resolve_squashfs_options()
         self.bundle_main_arch = self.config.arch()
         self.carrier_path = (
             self.context.build_dir / "prime" / f"runtime-{self.bundle_main_arch}"
@@ -42,22 +54,32 @@ class AppImagePrimer(BasePrimer):
         if not self.carrier_path.exists():
             self._get_appimage_kit_runtime()
 
-        # create payload
-        payload_path = self._make_squashfs(self.context.app_dir)
-
         # prepare carrier (a.k.a. "runtime" using a different name to differentiate from the AppRun settings)
         shutil.copyfile(self.carrier_path, self.appimage_path)
-        self._add_payload(payload_path)
 
-        carrier_binary = lief.parse(self.carrier_path.__str__())
-        self._add_appimage_update_information(carrier_binary)
-        (bundle_md5, bundle_sha256) = self._generate_checksums()
-        # md5 digest skips sections instead of using 0 which differ from how the signature checksum is generated
-        # this will be skipped is not a mandatory on the spec
-        # self._add_md5_digest(carrier_binary, bundle_md5)
-        self._sign_bundle_sha256_digest(carrier_binary, bundle_sha256)
+        layout = None
+        if self.config.squashfs.delta_friendly():
+            layout = SquashfsLayout(
+                self.context.app_dir, self.context.build_dir, self.context.record
+            )
+
+        # the payload is written right after the carrier, the bundle is written only once
+        carrier_size = self.carrier_path.stat().st_size
+        self.make_squashfs(
+            self.context.app_dir, self.appimage_path, carrier_size, layout
+        )
+        if layout:
+            layout.report(self.appimage_path.stat().st_size - carrier_size)
+
+        carrier_sections = self._read_carrier_sections()
+        self._add_appimage_update_information(carrier_sections)
+        zsync_generator = self._create_zsync_generator()
+        # the md5 digest section is skipped, it's not mandatory on the spec
+        signature_ranges = self._sign_bundle_sha256_digest(
+            carrier_sections, zsync_generator
+        )
 
-        self._generate_zsync_file()
+        self._generate_zsync_file(zsync_generator, signature_ranges)
         self._make_appimage_executable()
 
     def _resolve_appimage_file_name(self):
@@ -67,100 +89,226 @@ class AppImagePrimer(BasePrimer):
             else self.context.recipe.AppImage.file_name()
         )
 
-    def _make_squashfs(self, appdir: pathlib.Path):
-        payload_path = appdir.with_suffix(".squashfs")
+    def make_squashfs(
+        self,
+        appdir: pathlib.Path,
+        target: pathlib.Path,
+        offset=0,
+        layout: SquashfsLayout = None,
+    ):
+        """Write the squashfs of the AppDir into <target>, preserving its first <offset> bytes"""
         mksquashfs_bin = shell.require_executable("mksquashfs")
         command = [
             mksquashfs_bin,
             str(appdir),
-            str(payload_path),
+            str(target),
+            "-offset",
+            str(offset),
             "-root-owned",
             "-noappend",
             "-reproducible",
-            "-comp",
-            "xz",
-        ]
+        ] + self.squashfs_options
+        if layout:
+            sort_file = self.context.build_dir / "prime" / "squashfs.sort"
+            layout.write_sort_file(sort_file)
+            # fragments pack the tails of several files in the same block, a
+            # change in one of them would change the whole block
+            command += ["-sort", str(sort_file), "-no-fragments"]
+
         self.logger.info("Creating squashfs from AppDir")
         self.logger.debug(" ".join(command))
-        subprocess.run(command, check=True)
-        return payload_path
+        shell.run(command, check=True)
+
+    def _resolve_squashfs_options(self) -> [str]:
+        settings = self.config.squashfs
+        compression = settings.compression() or "xz"
+        level = settings.compression_level() or None
+        if self.fast_squashfs:
+            compression, level = self.FAST_COMPRESSION
+
+        options = ["-comp", compression]
+        if level is not None:
+            if compression not in self.COMPRESSION_LEVELS:
+                raise RuntimeError(
+                    f"squashfs compression_level is not supported by {compression}"
+                )
+
+            min_level, max_level = self.COMPRESSION_LEVELS[compression]
+            if not min_level <= level <= max_level:
+                raise RuntimeError(
+                    f"Invalid {compression} compression_level {level}, "
+                    f"it must be between {min_level} and {max_level}"
+                )
+            options += ["-Xcompression-level", str(level)]
+
+        if block_size := settings.block_size():
+            options += ["-b", str(block_size)]
+
+        # mksquashfs compresses the blocks in parallel
+        options += ["-processors", str(settings.processors() or os.cpu_count() or 1)]
+        return options
 
     def _get_appimage_kit_runtime(self):
         url = f"https://github.com/AppImage/AppImageKit/releases/download/continuous/runtime-{self.bundle_main_arch}"
-        logging.info(f"Downloading: {url}")
+        AssetCache().fetch(url, self.carrier_path)
+
+    def _read_carrier_sections(self) -> {str: (int, int)}:
+        """
+        Offset and size of the carrier sections patched in the AppImage
 
-        os.makedirs(self.carrier_path.parent, exist_ok=True)
-        request.urlretrieve(url, self.carrier_path)
+        They are cached next to the carrier, keyed by its hash, so the elf is
+        only parsed when the runtime changes.
+        """
+        with open(self.carrier_path, "rb") as carrier_file:
+            carrier_sha256 = hashlib.sha256(carrier_file.read()).hexdigest()
 
-    def _add_payload(self, payload_path):
+        cache_path = self.carrier_path.with_name(self.carrier_path.name + ".json")
         try:
-            with open(self.appimage_path, "ab") as appimage_file:
-                with open(payload_path, "rb") as payload_file:
-                    shutil.copyfileobj(payload_file, appimage_file)
-        except RuntimeError:
-            raise
-        finally:
-            payload_path.unlink(missing_ok=True)
+            with open(cache_path) as f:
+                cache = json.load(f)
+            if cache["sha256"] == carrier_sha256:
+                return {name: tuple(value) for name, value in cache["sections"].items()}
+        except (OSError, ValueError, KeyError):
+            pass
+
+        sections = elf.read_sections(self.carrier_path)
+        missing = [name for name in self.CARRIER_SECTIONS if name not in sections]
+        if missing:
+            raise PrimerError(
+                f"Invalid AppImage runtime {self.carrier_path}, "
+                f"missing sections: {', '.join(missing)}"
+            )
+
+        sections = {name: sections[name] for name in self.CARRIER_SECTIONS}
+        with open(cache_path, "w") as f:
+            json.dump({"sha256": carrier_sha256, "sections": sections}, f)
+        return sections
 
     def _make_appimage_executable(self):
         st = os.stat(self.appimage_path)
         os.chmod(self.appimage_path, st.st_mode | stat.S_IEXEC)
 
-    def _add_appimage_update_information(self, binary):
+    def _add_appimage_update_information(self, carrier_sections):
         if update_information := self.config["update-information"]():
             self.logger.info(f'Setting update information: "{update_information}"')
-            section = binary.get_section(".upd_info")
-            self._patch_appimage(
-                section.file_offset, bytes(update_information, "utf-8")
-            )
+            offset, _ = carrier_sections[".upd_info"]
+            self._patch_appimage(offset, bytes(update_information, "utf-8"))
 
     def _sign_bundle_sha256_digest(
-        self, carrier_elf: lief.Binary, bundle_sha256: bytes
-    ):
+        self, carrier_sections, zsync_generator: zsync.ZsyncGenerator = None
+    ) -> [(int, int)]:
+        """
+        Sign the bundle, returning the patched sections
+
+        The zsync block checksums are computed in the same read of the bundle.
+        """
         if sign_key := self.config["sign-key"]():
+            signature_section = carrier_sections[".sha256_sig"]
+            signature_key_section = carrier_sections[".sig_key"]
+            signature_ranges = [signature_section, signature_key_section]
+            # the digest is computed as if the signature sections were empty
+            bundle_sha256 = self._generate_sha256_digest(
+                signature_ranges,
+                [zsync_generator.update_blocks] if zsync_generator else [],
+            )
+
+            # imported on use, signing is optional
+            import gnupg
+
             gpg = gnupg.GPG()
             # sign both files as if they were together
-
             signature = gpg.sign(bundle_sha256.hex(), keyid=sign_key, detach=True)
-            signature_section = carrier_elf.get_section(".sha256_sig")
-            self._patch_appimage(signature_section.file_offset, signature.data)
+            self._patch_appimage(signature_section[0], signature.data)
 
             # resolve secret key id in case a key fingerprint was used
             key = gpg.export_keys(keyids=[sign_key])
-            signature_key_section = carrier_elf.get_section(".sig_key")
-            self._patch_appimage(signature_key_section.file_offset, bytes(key, "utf-8"))
+            self._patch_appimage(signature_key_section[0], bytes(key, "utf-8"))
+            return signature_ranges
+        return []
 
-    def _generate_checksums(self):
-        md5 = hashlib.md5()
+    def _generate_sha256_digest(
+        self, zeroed_ranges: [(int, int)] = (), consumers=()
+    ) -> bytes:
         sha256 = hashlib.sha256()
-        with open(self.appimage_path, "rb") as appimage_file:
-            while True:
-                data = appimage_file.read(2 ** 10)
-                if not data:
-                    break
-                md5.update(data)
-                sha256.update(data)
+        self._read_bundle([sha256.update, *consumers], zeroed_ranges)
+        return sha256.digest()
 
-        return md5.digest(), sha256.digest()
+    def _read_bundle(self, consumers, zeroed_ranges: [(int, int)] = ()):
+        """
+        Feed the bundle contents to each consumer in a single pass
+
+        The bytes in <zeroed_ranges>, (offset, size) pairs, are replaced by zeros.
+        """
+        buffer = bytearray(self.READ_BUFFER_SIZE)
+        view = memoryview(buffer)
+        position = 0
+        with open(self.appimage_path, "rb") as appimage_file:
+            while size := appimage_file.readinto(buffer):
+                for offset, length in zeroed_ranges:
+                    start = max(offset - position, 0)
+                    end = min(offset + length - position, size)
+                    if start < end:
+                        view[start:end] = bytes(end - start)
 
-    def _add_md5_digest(self, carrier_binary, bundle_md5):
-        if md5_digest_section := carrier_binary.get_section(".digest_md5"):
-            self._patch_appimage(md5_digest_section.file_offset, bundle_md5)
+                for consumer in consumers:
+                    consumer(view[:size])
+                position += size
 
     def _patch_appimage(self, offset, data):
-        # using manual patch over lief as the elf structure should not be changed
+        # using manual patch as the elf structure should not be changed
         with open(self.appimage_path, "r+b") as appimage_file:
             appimage_file.seek(offset, 0)
             appimage_file.write(data)
 
-    def _generate_zsync_file(self):
+    def _create_zsync_generator(self) -> zsync.ZsyncGenerator:
+        """Generator of the zsync file, None if it's not required or zsyncmake is used"""
+        if not self.config["update-information"]:
+            return None
+
+        if not zsync.has_fast_md4():
+            try:
+                shell.require_executable("zsyncmake")
+                return None
+            except shell.CommandNotFoundError:
+                self.logger.warning(
+                    "MD4 is not available in hashlib and zsyncmake was not "
+                    "found, generating the zsync file will be slow"
+                )
+        return zsync.ZsyncGenerator(self.appimage_path.stat().st_size)
+
+    def _generate_zsync_file(
+        self, generator: zsync.ZsyncGenerator, patched_ranges: [(int, int)] = ()
+    ):
         if self.config["update-information"]:
-            zsyncmake_bin = shell.require_executable("zsyncmake")
-            command = [
-                zsyncmake_bin,
-                "-u",
-                self.appimage_path.name,
-                self.appimage_path.__str__(),
-            ]
-            self.logger.debug(command)
-            subprocess.run(command, check=True)
+            self.logger.info("Generating zsync file")
+            if generator is None:
+                self._run_zsyncmake()
+                return
+
+            if patched_ranges:
+                # the blocks were read while signing, before the signature was written
+                generator.rehash_blocks(self.appimage_path, patched_ranges)
+                # the SHA-1 covers the signature, it can only be computed now
+                self._read_bundle([generator.update_sha1])
+            else:
+                self._read_bundle([generator.update])
+
+            generator.write(
+                self.appimage_path.with_name(self.appimage_path.name + ".zsync"),
+                url=self.appimage_path.name,
+                file_name=self.appimage_path.name,
+                mtime=self.appimage_path.stat().st_mtime,
+            )
+
+    def _run_zsyncmake(self):
+        zsyncmake_bin = shell.require_executable("zsyncmake")
+        command = [
+            zsyncmake_bin,
+            "-u",
+            self.appimage_path.name,
+            "-o",
+            str(self.appimage_path.with_name(self.appimage_path.name + ".zsync")),
+            str(self.appimage_path),
+        ]
+        self.logger.debug(command)
+        shell.run(command, check=True)
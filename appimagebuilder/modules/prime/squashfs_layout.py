@@ -0,0 +1,132 @@
+#  Copyright  2021 Alexis Lopez Zubieta
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a
+#  copy of this software and associated documentation files (the "Software"),
+#  to deal in the Software without restriction, including without limitation the
+#  rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+#  sell copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+import json
+import logging
+import os
+import pathlib
+
+from appimagebuilder.modules.deploy.manifest import DeployManifest
+
+
+class SquashfsLayout:
+    """
+    Order the AppDir files in the squashfs to keep the blocks stable between releases
+
+    zsync only downloads the blocks that changed, but a change in a file moves
+    the data of the files placed after it. The files of the packages whose
+    version didn't change since the previous build go first, then the files of
+    the updated packages and finally the files that don't come from packages.
+
+    The state of the previous build is kept in the build dir, it's also used to
+    estimate the size of the zsync update.
+    """
+
+    UNCHANGED_PACKAGES_PRIORITY = 2
+    UPDATED_PACKAGES_PRIORITY = 1
+
+    def __init__(self, app_dir: pathlib.Path, build_dir: pathlib.Path, record: dict):
+        self.app_dir = pathlib.Path(app_dir)
+        self.build_dir = pathlib.Path(build_dir)
+        self.state_path = self.build_dir / "prime" / "layout.json"
+        self.packages = self._read_packages(record)
+        self.logger = logging.getLogger("SquashfsLayout")
+
+        self._previous = self._load_previous()
+
+    @staticmethod
+    def _read_packages(record: dict) -> [str]:
+        packages = []
+        for section in ("apt", "pacman"):
+            packages.extend(record.get(section, {}).get("packages", []))
+        return [str(package) for package in packages]
+
+    def _load_previous(self) -> dict:
+        if not self.state_path.exists():
+            return {}
+
+        try:
+            with open(self.state_path) as f:
+                return json.load(f)
+        except ValueError as err:
+            self.logger.warning(f"Ignoring invalid layout {self.state_path}: {err}")
+            return {}
+
+    def write_sort_file(self, path: pathlib.Path):
+        """Write the priority of the files in the mksquashfs -sort format"""
+        previous_packages = set(self._previous.get("packages", []))
+        priorities = {}
+        for package, files in self._read_package_files().items():
+            priority = self.UPDATED_PACKAGES_PRIORITY
+            if package in previous_packages:
+                priority = self.UNCHANGED_PACKAGES_PRIORITY
+
+            for file in files:
+                # glibc files are moved to the compat runtime by the AppRun setup
+                for candidate in (file, os.path.join("runtime", "compat", file)):
+                    if os.path.lexists(self.app_dir / candidate):
+                        priorities[candidate] = max(
+                            priority, priorities.get(candidate, 0)
+                        )
+
+        path = pathlib.Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w") as f:
+            for file, priority in sorted(priorities.items()):
+                # the format doesn't support white spaces, they keep the default priority
+                if not any(char.isspace() for char in file):
+                    f.write(f"{file} {priority}\n")
+
+    def _read_package_files(self) -> {str: [str]}:
+        files = {}
+        for package_manager in ("apt", "pacman"):
+            manifest_path = self.build_dir / package_manager / "manifest.json"
+            if manifest_path.exists():
+                manifest = DeployManifest(manifest_path, self.app_dir)
+                files.update(manifest.packages)
+
+        # only the packages in the current deploy record are part of the AppDir
+        return {key: files[key] for key in self.packages if key in files}
+
+    def report(self, payload_size: int):
+        """Log an estimation of the zsync update size and store the current state"""
+        files = self._list_files()
+        previous_files = self._previous.get("files")
+        if previous_files is not None:
+            changed = [
+                path for path, info in files.items() if previous_files.get(path) != info
+            ]
+            changed_size = sum(files[path][0] for path in changed)
+            total_size = sum(info[0] for info in files.values()) or 1
+            # assumes the changed files compress as well as the whole AppDir
+            estimate = changed_size * payload_size / total_size
+            self.logger.info(
+                f"{len(changed)} of {len(files)} files changed since the previous "
+                f"build, estimated zsync update size: {estimate / 2 ** 20:.1f}MiB "
+                f"of {payload_size / 2 ** 20:.1f}MiB"
+            )
+
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.state_path, "w") as f:
+            json.dump({"packages": self.packages, "files": files}, f)
+
+    def _list_files(self) -> {str: [int, int]}:
+        """Size and modification time of the AppDir files"""
+        files = {}
+        for root, _, names in os.walk(self.app_dir):
+            for name in names:
+                path = os.path.join(root, name)
+                stat = os.lstat(path)
+                files[os.path.relpath(path, self.app_dir)] = [
+                    stat.st_size,
+                    stat.st_mtime_ns,
+                ]
+        return files
@@ -0,0 +1,228 @@
+#  Copyright  2021 Alexis Lopez Zubieta
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a
+#  copy of this software and associated documentation files (the "Software"),
+#  to deal in the Software without restriction, including without limitation the
+#  rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+#  sell copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+import hashlib
+import math
+import pathlib
+import struct
+import time
+
+
+class ZsyncGenerator:
+    """
+    Generate zsync control files, as `zsyncmake -u <url> <file>` (0.6.2) does
+
+    The file contents are fed with `update` in chunks of any size, so it can
+    share a single read of the file with other consumers. The block checksums
+    and the SHA-1 of the file can also be fed separately, with `update_blocks`
+    and `update_sha1`, when the file is patched after the blocks are read.
+    """
+
+    VERSION = "0.6.2"
+
+    def __init__(self, length: int, block_size: int = None):
+        self.length = length
+        # zsyncmake defaults
+        self.block_size = block_size or (2048 if length < 100000000 else 4096)
+        self.seq_matches, self.rsum_bytes, self.checksum_bytes = self._hash_lengths()
+
+        self._sha1 = hashlib.sha1()
+        self._block_sums = bytearray()
+        self._pending = bytearray()
+
+    def _hash_lengths(self) -> (int, int, int):
+        """Bytes of the block checksums required to identify them in a file of this size"""
+        length, block_size = max(self.length, 1), self.block_size
+        seq_matches = 2 if length > block_size else 1
+        rsum_bytes = math.ceil(
+            ((math.log(length) + math.log(block_size)) / math.log(2) - 8.6)
+            / seq_matches
+            / 8
+        )
+        rsum_bytes = min(max(rsum_bytes, 2), 4)
+
+        checksum_bytes = math.ceil(
+            (20 + (math.log(length) + math.log(1 + length // block_size)) / math.log(2))
+            / seq_matches
+            / 8
+        )
+        checksum_bytes_2 = int(
+            (7.9 + (20 + math.log(1 + length // block_size) / math.log(2))) / 8
+        )
+        checksum_bytes = min(max(checksum_bytes, checksum_bytes_2), 16)
+        return seq_matches, rsum_bytes, checksum_bytes
+
+    def update(self, data):
+        self.update_sha1(data)
+        self.update_blocks(data)
+
+    def update_sha1(self, data):
+        self._sha1.update(data)
+
+    def update_blocks(self, data):
+        data = memoryview(data).cast("B")
+        if self._pending:
+            missing = self.block_size - len(self._pending)
+            self._pending += data[:missing]
+            data = data[missing:]
+            if len(self._pending) < self.block_size:
+                return
+            self._add_blocks(self._pending)
+            self._pending = bytearray()
+
+        end = len(data) - len(data) % self.block_size
+        if end:
+            self._add_blocks(data[:end])
+        self._pending += data[end:]
+
+    def rehash_blocks(self, path: pathlib.Path, ranges: [(int, int)]):
+        """Recompute the checksums of the blocks of <path> overlapping the (offset, size) <ranges>"""
+        self._add_pending_block()
+        entry_size = self.rsum_bytes + self.checksum_bytes
+        with open(path, "rb") as f:
+            for offset, size in ranges:
+                first = offset // self.block_size
+                last = (offset + size - 1) // self.block_size
+                f.seek(first * self.block_size)
+                data = f.read((last - first + 1) * self.block_size)
+                # the last block is padded with zeros
+                data += bytes(-len(data) % self.block_size)
+
+                block_sums, self._block_sums = self._block_sums, bytearray()
+                self._add_blocks(data)
+                start, end = first * entry_size, (last + 1) * entry_size
+                block_sums[start:end] = self._block_sums
+                self._block_sums = block_sums
+
+    def _add_blocks(self, data):
+        """Add the checksums of <data>, made of whole blocks"""
+        import numpy
+
+        blocks = numpy.frombuffer(data, dtype=numpy.uint8).reshape(-1, self.block_size)
+        # rsum: a is the sum of the bytes, b the sum of their running sums, which
+        # is the sum of the bytes weighted by their distance to the block end.
+        # The uint32 arithmetic wraps around but keeps the low 16 bits exact.
+        weights = numpy.arange(self.block_size, 0, -1, dtype=numpy.uint32)
+        rsum_a = blocks.sum(axis=1, dtype=numpy.uint32) & 0xFFFF
+        rsum_b = blocks.dot(weights) & 0xFFFF
+        rsums = ((rsum_a << 16) | rsum_b).astype(">u4").view(numpy.uint8)
+        # the trailing bytes of the rsum are the most useful ones
+        rsums = rsums.reshape(-1, 4)[:, 4 - self.rsum_bytes :].tobytes()
+
+        rsum_bytes, block_size = self.rsum_bytes, self.block_size
+        for idx in range(len(blocks)):
+            self._block_sums += rsums[idx * rsum_bytes : (idx + 1) * rsum_bytes]
+            block = data[idx * block_size : (idx + 1) * block_size]
+            self._block_sums += md4(block)[: self.checksum_bytes]
+
+    def _add_pending_block(self):
+        if self._pending:
+            # the last block is padded with zeros
+            padding = bytes(self.block_size - len(self._pending))
+            self._add_blocks(self._pending + padding)
+            self._pending = bytearray()
+
+    def write(self, path: pathlib.Path, url: str, file_name: str, mtime: float):
+        self._add_pending_block()
+
+        header = (
+            f"zsync: {self.VERSION}\n"
+            f"Filename: {file_name}\n"
+            f"MTime: {self._format_mtime(mtime)}\n"
+            f"Blocksize: {self.block_size}\n"
+            f"Length: {self.length}\n"
+            f"Hash-Lengths: {self.seq_matches},{self.rsum_bytes},{self.checksum_bytes}\n"
+            f"URL: {url}\n"
+            f"SHA-1: {self._sha1.hexdigest()}\n"
+            "\n"
+        )
+        with open(path, "wb") as f:
+            f.write(header.encode())
+            f.write(self._block_sums)
+
+    @staticmethod
+    def _format_mtime(mtime: float) -> str:
+        # RFC 2822 date in UTC, without depending on the locale
+        days = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+        months = ["Jan", "Feb", "Mar", "Apr", "May", "Jun"]
+        months += ["Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
+        date = time.gmtime(int(mtime))
+        return (
+            f"{days[date.tm_wday]}, {date.tm_mday:02d} {months[date.tm_mon - 1]} "
+            f"{date.tm_year} {date.tm_hour:02d}:{date.tm_min:02d}:{date.tm_sec:02d} +0000"
+        )
+
+
+def has_fast_md4() -> bool:
+    """Whether OpenSSL provides MD4, the pure Python one takes minutes on large bundles"""
+    return _HASHLIB_MD4
+
+
+def md4(data) -> bytes:
+    if _HASHLIB_MD4:
+        return hashlib.new("md4", data).digest()
+    return _md4(bytes(data))
+
+
+def _has_hashlib_md4() -> bool:
+    # OpenSSL 3 only provides it through the legacy provider
+    try:
+        hashlib.new("md4")
+        return True
+    except ValueError:
+        return False
+
+
+def _md4(data: bytes) -> bytes:
+    """RFC 1320 MD4"""
+
+    def rotate(value, bits):
+        value &= 0xFFFFFFFF
+        return ((value << bits) | (value >> (32 - bits))) & 0xFFFFFFFF
+
+    message = data + b"\x80" + bytes((55 - len(data)) % 64)
+    message += struct.pack("<Q", len(data) * 8)
+
+    state = [0x67452301, 0xEFCDAB89, 0x98BADCFE, 0x10325476]
+    for offset in range(0, len(message), 64):
+        x = struct.unpack("<16I", message[offset : offset + 64])
+        a, b, c, d = state
+
+        for i in range(16):
+            f = (b & c) | (~b & d)
+            a, b, c, d = d, rotate(a + f + x[i], (3, 7, 11, 19)[i % 4]), b, c
+
+        for i in range(16):
+            k = i // 4 + (i % 4) * 4
+            g = (b & c) | (b & d) | (c & d)
+            a, b, c, d = (
+                d,
+                rotate(a + g + x[k] + 0x5A827999, (3, 5, 9, 13)[i % 4]),
+                b,
+                c,
+            )
+
+        for i in range(16):
+            k = (0, 8, 4, 12)[i % 4] + (0, 2, 1, 3)[i // 4]
+            h = b ^ c ^ d
+            a, b, c, d = (
+                d,
+                rotate(a + h + x[k] + 0x6ED9EBA1, (3, 9, 11, 15)[i % 4]),
+                b,
+                c,
+            )
+
+        state = [(value + new) & 0xFFFFFFFF for value, new in zip(state, (a, b, c, d))]
+
+    return struct.pack("<4I", *state)
+
+
+_HASHLIB_MD4 = _has_hashlib_md4()
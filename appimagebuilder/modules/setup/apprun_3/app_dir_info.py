@@ -40,10 +40,11 @@ class AppDirFileInfo:
 class AppDir:
     """Holds the information of the files contained in the AppDir"""
 
-    files: {pathlib.Path: AppDirFileInfo} = dict()
+    files: {pathlib.Path: AppDirFileInfo}
 
     def __init__(self, app_dir_path: pathlib.Path):
         self.path = pathlib.Path(app_dir_path)
+        self.files = {}
 
         # file information aggregations
         self.architectures = set()
@@ -13,8 +13,8 @@ import logging
 import os
 import re
 import subprocess
-import shutil
 
+from appimagebuilder.utils import shell
 from .base_helper import AppRun3Helper
 
 
@@ -42,7 +42,7 @@ class AppRun3GdkPixbuf(AppRun3Helper):
             "system modules and the output will be *adapted* to the AppDir."
         )
 
-        proc = subprocess.run(bin_path, stdout=subprocess.PIPE)
+        proc = shell.run(bin_path, stdout=subprocess.PIPE)
 
         query_output = proc.stdout.decode()
         # remove absolute paths from module names
@@ -62,13 +62,14 @@ class AppRun3GdkPixbuf(AppRun3Helper):
         # perhaps we should search /usr/bin too
         # Arch Linux has gdk-pixbuf-query-loaders in /usr/bin and
         # not in /usr/lib. This can be easily found out using
-        # shutil.which API. => $PATH
-        if shutil.which("gdk-pixbuf-query-loaders"):
-            return shutil.which("gdk-pixbuf-query-loaders")
+        # a $PATH lookup.
         # fedora provides gdk-pixbuf-query-loaders-64 instead
         # of gdk-pixbuf-query-loaders in /usr/bin
-        if shutil.which("gdk-pixbuf-query-loaders-64"):
-            return shutil.which("gdk-pixbuf-query-loaders-64")
+        for name in ["gdk-pixbuf-query-loaders", "gdk-pixbuf-query-loaders-64"]:
+            try:
+                return shell.require_executable(name)
+            except shell.CommandNotFoundError:
+                pass
 
         raise RuntimeError(
             "Missing 'gdk-pixbuf-query-loaders' "
@@ -9,9 +9,8 @@
 #
 #  The above copyright notice and this permission notice shall be included in
 #  all copies or substantial portions of the Software.
-import shutil
-import subprocess
 
+from appimagebuilder.utils import shell
 from .base_helper import AppRun3Helper
 
 
@@ -31,9 +30,7 @@ class AppRun3GLib(AppRun3Helper):
 
     def _configure_schemas(self):
         if schema_file := self.context.app_dir.find_one(["*/glib-2.0/schemas/*"]):
-            bin_path = shutil.which("glib-compile-schemas")
-            if not bin_path:
-                raise RuntimeError("Missing 'glib-compile-schemas' executable")
+            bin_path = shell.require_executable("glib-compile-schemas")
 
-            subprocess.run([bin_path, schema_file.path.parent])
+            shell.run([bin_path, schema_file.path.parent])
             self.context.runtime_env["GSETTINGS_SCHEMA_DIR"] = str(schema_file.path.parent)
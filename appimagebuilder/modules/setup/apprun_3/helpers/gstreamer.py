@@ -11,9 +11,8 @@
 #  all copies or substantial portions of the Software.
 import logging
 import os
-import shutil
-import subprocess
 
+from appimagebuilder.utils import shell
 from .base_helper import AppRun3Helper
 from ..apprun3_context import AppRun3Context
 
@@ -53,7 +52,10 @@ class AppRun3GStreamer(AppRun3Helper):
             logging.info(f"GST_PTP_HELPER set to: {gst_ptp_helper}")
 
     def _generate_gst_registry(self):
-        gst_launch_bin = shutil.which("gst-launch-1.0")
+        try:
+            gst_launch_bin = shell.require_executable("gst-launch-1.0")
+        except shell.CommandNotFoundError:
+            gst_launch_bin = None
 
         if gst_launch_bin and self._plugins_path:
             gst_registry_path = self._plugins_path / "registry.bin"
@@ -62,7 +64,7 @@ class AppRun3GStreamer(AppRun3Helper):
             gst_launch_env = self._prepare_gst_launch_env()
             # run gst "diagnostic" to force registry generation
             # https://gstreamer.freedesktop.org/documentation/tools/gst-launch.html?gi-language=c#diagnostic
-            proc = subprocess.run(
+            proc = shell.run(
                 [gst_launch_bin, "fakesrc", "num-buffers=16", "!", "fakesink"],
                 env=gst_launch_env,
             )
@@ -21,13 +21,9 @@
 #
 #  The above copyright notice and this permission notice shall be included in
 #  all copies or substantial portions of the Software.
-import logging
 import pathlib
-import tarfile
-from pathlib import Path
-from urllib import request
 
-from appimagebuilder.modules.setup import apprun_utils
+from appimagebuilder.utils.asset_cache import AssetCache
 
 
 class AppRunBinariesResolver:
@@ -89,5 +85,4 @@ class AppRunBinariesResolver:
         path.parent.mkdir(parents=True, exist_ok=True)
 
         url = f"https://github.com/AppImageCrafters/AppRun/releases/download/{self.apprun_version}/{asset}"
-        logging.info(f"Downloading: {url}")
-        request.urlretrieve(url, path)
+        AssetCache().fetch(url, path)
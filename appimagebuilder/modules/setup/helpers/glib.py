@@ -9,10 +9,9 @@
 #
 #  The above copyright notice and this permission notice shall be included in
 #  all copies or substantial portions of the Software.
-import shutil
-import subprocess
 
 from appimagebuilder.utils.finder import Finder
+from appimagebuilder.utils import shell
 from .base_helper import BaseHelper
 from ..environment import Environment
 
@@ -33,9 +32,7 @@ class GLib(BaseHelper):
 
     def _configure_schemas(self, env):
         if path := self.finder.find_one("*/glib-2.0/schemas", [Finder.is_dir]):
-            bin_path = shutil.which("glib-compile-schemas")
-            if not bin_path:
-                raise RuntimeError("Missing 'glib-compile-schemas' executable")
+            bin_path = shell.require_executable("glib-compile-schemas")
 
-            subprocess.run([bin_path, path])
+            shell.run([bin_path, path])
             env.set("GSETTINGS_SCHEMA_DIR", path)
@@ -11,10 +11,9 @@
 #  all copies or substantial portions of the Software.
 import logging
 import os
-import shutil
-import subprocess
 
 from appimagebuilder.utils.finder import Finder
+from appimagebuilder.utils import shell
 from .base_helper import BaseHelper
 from ..environment import Environment
 
@@ -50,14 +49,17 @@ class GStreamer(BaseHelper):
             app_run.set("GST_PTP_HELPER", gst_ptp_helper_path)
 
     def _generate_gst_registry(self, env):
-        gst_launch_bin = shutil.which("gst-launch-1.0")
+        try:
+            gst_launch_bin = shell.require_executable("gst-launch-1.0")
+        except shell.CommandNotFoundError:
+            gst_launch_bin = None
         if gst_launch_bin and "GST_PLUGIN_PATH" in env:
             env.set("GST_REGISTRY", env["GST_PLUGIN_PATH"] + "/registry.bin")
 
             gst_launch_env = self._prepare_gst_launch_env(env)
             # run gst "diagnostic" to force registry generation
             # https://gstreamer.freedesktop.org/documentation/tools/gst-launch.html?gi-language=c#diagnostic
-            proc = subprocess.run(
+            proc = shell.run(
                 [gst_launch_bin, "fakesrc", "num-buffers=16", "!", "fakesink"],
                 env=gst_launch_env,
             )
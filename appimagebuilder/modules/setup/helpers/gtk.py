@@ -11,8 +11,8 @@
 #  all copies or substantial portions of the Software.
 import os
 import re
-import subprocess
 
+from appimagebuilder.utils import shell
 from .base_helper import BaseHelper
 from ..environment import Environment
 
@@ -35,4 +35,4 @@ class Gtk(BaseHelper):
         env.set("GTK_PATH", gtk_path)
 
         for path in self.finder.find("usr/share/icons/*", [self.finder.is_dir]):
-            subprocess.run(["gtk-update-icon-cache", str(path)])
+            shell.run(["gtk-update-icon-cache", str(path)])
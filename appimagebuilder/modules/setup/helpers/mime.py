@@ -9,9 +9,8 @@
 #
 #  The above copyright notice and this permission notice shall be included in
 #  all copies or substantial portions of the Software.
-import shutil
-import subprocess
 
+from appimagebuilder.utils import shell
 from .base_helper import BaseHelper
 
 
@@ -19,7 +18,5 @@ class MIME(BaseHelper):
     def configure(self, env, preserve_files):
         path = self.finder.base_path / "usr" / "share" / "mime"
         if path.is_dir():
-            if bin_path := shutil.which("update-mime-database"):
-                subprocess.run([bin_path, path])
-            else:
-                raise RuntimeError("Missing 'update-mime-database' executable")
+            bin_path = shell.require_executable("update-mime-database")
+            shell.run([bin_path, path])
@@ -0,0 +1,185 @@
+#  Copyright  2021 Alexis Lopez Zubieta
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a
+#  copy of this software and associated documentation files (the "Software"),
+#  to deal in the Software without restriction, including without limitation the
+#  rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+#  sell copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+import argparse
+import contextlib
+import logging
+import os
+import pathlib
+import subprocess
+import sys
+import threading
+
+from appimagebuilder import recipe
+from appimagebuilder.commands.create_appimage import CreateAppImageCommand
+from appimagebuilder.orchestrator import Orchestrator
+from appimagebuilder.utils import shell
+
+
+@contextlib.contextmanager
+def target_arch(arch: str):
+    """Set TARGET_ARCH while the recipe of <arch> is loaded or inspected"""
+    previous_value = os.environ.get("TARGET_ARCH")
+    os.environ["TARGET_ARCH"] = arch
+    try:
+        yield
+    finally:
+        if previous_value is None:
+            del os.environ["TARGET_ARCH"]
+        else:
+            os.environ["TARGET_ARCH"] = previous_value
+
+
+class ArchBuild:
+    """Commands and directories of the build of a single architecture"""
+
+    def __init__(self, arch: str, args: argparse.Namespace, commands: list):
+        self.arch = arch
+        self.args = args
+        self.commands = commands
+
+
+class MultiArchBuild:
+    """
+    Build several architectures from one recipe
+
+    The recipe is loaded once per architecture with TARGET_ARCH set to it, the
+    variable recipes use to pick the packages and the runtime of each one. Every
+    architecture gets its own AppDir (<appdir>-<arch>) and build dir
+    (<build dir>/<arch>).
+
+    Each architecture is built by its own appimage-builder process, with
+    TARGET_ARCH set in its environment, so the variables exported by the recipe
+    scripts (BUILDER_ENV) and the working dir of one build don't leak into the
+    others. Their output is forwarded prefixed by the architecture name. The
+    --max-processes limit is split between them.
+
+    The builds share no work: each process runs the recipe scripts, loads the
+    recipe and resolves and downloads its packages on its own, so building N
+    architectures costs about N single builds run concurrently. The scripts
+    can't be run once for all of them, they get a different TARGET_ARCH and
+    AppDir each. Only the files that are the same for every architecture are
+    reused, through the user caches: the assets downloaded from the same URL
+    and the pacman "any" packages. The commands created here by prepare() are
+    only used to check the AppImage file names and to print the build plan.
+    """
+
+    def __init__(self, args: argparse.Namespace):
+        self.args = args
+        self.archs = list(dict.fromkeys(args.archs))
+        self.logger = logging.getLogger("MultiArchBuild")
+
+    def prepare(self) -> [ArchBuild]:
+        builds = []
+        for arch in self.archs:
+            with target_arch(arch):
+                recipe_roamer = self._load_recipe()
+                args = self._arch_args(arch)
+                commands = Orchestrator().process(recipe_roamer, args)
+            builds.append(ArchBuild(arch, args, commands))
+
+        self._check_appimage_file_names(builds)
+        return builds
+
+    def execute(self, builds: [ArchBuild]):
+        processes = []
+        for build in builds:
+            argv = self._arch_argv(build, len(builds))
+            self.logger.info(f"Building {build.arch}: {' '.join(argv)}")
+            process = shell.popen(
+                argv,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                env=dict(os.environ, TARGET_ARCH=build.arch),
+            )
+            forwarder = threading.Thread(
+                target=self._forward_output, args=(build.arch, process.stdout)
+            )
+            forwarder.start()
+            processes.append((build, process, forwarder))
+
+        # the builds are independent, a failure doesn't stop the other ones
+        failed = []
+        for build, process, forwarder in processes:
+            forwarder.join()
+            if process.wait() != 0:
+                self.logger.error(
+                    f"{build.arch} build failed with exit code: {process.returncode}"
+                )
+                failed.append(build.arch)
+        if failed:
+            raise RuntimeError(f"Failed to build: {', '.join(failed)}")
+
+    def _load_recipe(self) -> recipe.Roamer:
+        recipe_loader = recipe.Loader()
+        recipe_roamer = recipe.Roamer(recipe_loader.load(self.args.recipe))
+        recipe.Schema().validate(recipe_roamer)
+        return recipe_roamer
+
+    def _arch_args(self, arch: str) -> argparse.Namespace:
+        args = argparse.Namespace(**vars(self.args))
+        args.appdir = f"{pathlib.Path(self.args.appdir).absolute()}-{arch}"
+        args.build_dir = str(pathlib.Path(self.args.build_dir).absolute() / arch)
+        return args
+
+    def _arch_argv(self, build: ArchBuild, builds_count: int) -> [str]:
+        """Command line of the single architecture build of <build>"""
+        args = build.args
+        argv = [
+            sys.executable,
+            "-m",
+            "appimagebuilder",
+            "--recipe",
+            str(pathlib.Path(args.recipe).absolute()),
+            "--appdir",
+            args.appdir,
+            "--build-dir",
+            args.build_dir,
+            "--log",
+            args.loglevel,
+        ]
+        for flag in (
+            "skip_script",
+            "skip_build",
+            "skip_tests",
+            "skip_appimage",
+            "no_cache",
+            "profile_trace",
+            "fast_squashfs",
+        ):
+            if getattr(args, flag):
+                argv.append(f"--{flag.replace('_', '-')}")
+
+        max_processes = args.max_processes or os.cpu_count() or 1
+        argv.extend(["--max-processes", str(max(1, max_processes // builds_count))])
+        return argv
+
+    @staticmethod
+    def _forward_output(arch: str, stream):
+        with stream:
+            for line in stream:
+                sys.stdout.write(f"[{arch}] {line.decode(errors='replace')}")
+                sys.stdout.flush()
+
+    @staticmethod
+    def _check_appimage_file_names(builds: [ArchBuild]):
+        file_names = {}
+        for build in builds:
+            for command in build.commands:
+                if isinstance(command, CreateAppImageCommand):
+                    appimage_path = command.primer.appimage_path
+                    if appimage_path in file_names:
+                        raise RuntimeError(
+                            f"The {file_names[appimage_path]} and {build.arch} builds "
+                            f"create the same AppImage: {appimage_path}. Use "
+                            "${TARGET_ARCH} in AppImage.file_name"
+                        )
+                    file_names[appimage_path] = build.arch
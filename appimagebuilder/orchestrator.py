@@ -14,12 +14,10 @@ import pathlib
 
 from appimagebuilder.utils.finder import Finder
 from appimagebuilder.context import AppInfo, Context, BundleInfo
-from appimagebuilder.commands.apt_deploy import AptDeployCommand
-from appimagebuilder.commands.create_appimage import CreateAppImageCommand
+from appimagebuilder.commands.fetch_apprun import FetchAppRunBinariesCommand
 from appimagebuilder.commands.file_deploy import FileDeployCommand
-from appimagebuilder.commands.pacman_deploy import PacmanDeployCommand
+from appimagebuilder.commands.retrieve_packages import RetrievePackagesCommand
 from appimagebuilder.commands.run_script import RunScriptCommand
-from appimagebuilder.commands.run_test import RunTestCommand
 from appimagebuilder.commands.setup_app_info import SetupAppInfoCommand
 from appimagebuilder.commands.setup_runtime import SetupRuntimeCommand
 from appimagebuilder.commands.setup_symlinks import SetupSymlinksCommand
@@ -30,7 +28,12 @@ from appimagebuilder.recipe.roamer import Roamer
 
 
 class Orchestrator:
-    """Transforms a recipe into a command list"""
+    """
+    Transforms a recipe into a command list
+
+    The commands of optional recipe sections are imported only when they are
+    used, they pull in heavy modules (docker, gnupg, pydpkg...).
+    """
 
     def process(self, recipe: Roamer, args):
         if recipe.version() == 1:
@@ -38,6 +41,18 @@ class Orchestrator:
 
         raise RuntimeError(f"Unknown recipe version:  {recipe.version()}")
 
+    def create_context(self, recipe: Roamer, args) -> Context:
+        """
+        Build context of a recipe, as given to its commands
+
+        Meant for tools running single commands or stages out of a build, like
+        the benchmarks. Only the recipe, appdir and build_dir args are required.
+        """
+        if recipe.version() == 1:
+            return self._extract_v1_recipe_context(args, recipe)
+
+        raise RuntimeError(f"Unknown recipe version:  {recipe.version()}")
+
     def _prepare_commands_for_recipe_v1(self, args, recipe):
         context = self._extract_v1_recipe_context(args, recipe)
         commands = []
@@ -49,11 +64,15 @@ class Orchestrator:
             commands.extend(self._create_app_dir_commands(context, recipe))
 
         if not args.skip_tests and recipe.AppDir.test:
+            from appimagebuilder.commands.run_test import RunTestCommand
+
             command = RunTestCommand(context, recipe.AppDir.test)
             commands.append(command)
 
         if not args.skip_appimage and recipe.AppImage:
-            command = CreateAppImageCommand(context, recipe)
+            from appimagebuilder.commands.create_appimage import CreateAppImageCommand
+
+            command = CreateAppImageCommand(context, recipe, args.fast_squashfs)
             commands.append(command)
 
         return commands
@@ -76,12 +95,21 @@ class Orchestrator:
                 context, recipe.AppDir.before_bundle, "before bundle script"
             )
             commands.append(command)
+
+        # downloads don't touch the AppDir, the Invoker runs them concurrently
+        # with each other and with the extraction of the packages already retrieved
+        package_deploy_commands = []
         if apt_section := recipe.AppDir.apt:
             command = self._generate_apt_deploy_command(context, apt_section)
-            commands.append(command)
+            package_deploy_commands.append(command)
         if pacman_section := recipe.AppDir.pacman:
             command = self._generate_pacman_deploy_command(context, pacman_section)
-            commands.append(command)
+            package_deploy_commands.append(command)
+        for command in package_deploy_commands:
+            commands.append(RetrievePackagesCommand(context, command))
+        commands.append(FetchAppRunBinariesCommand(context))
+        commands.extend(package_deploy_commands)
+
         if files_section := recipe.AppDir.files:
             command = FileDeployCommand(
                 context,
@@ -122,6 +150,8 @@ class Orchestrator:
         return commands
 
     def _generate_apt_deploy_command(self, context, apt_section):
+        from appimagebuilder.commands.apt_deploy import AptDeployCommand
+
         apt_archs = apt_section.arch()
         if isinstance(apt_archs, str):
             apt_archs = [apt_archs]
@@ -142,9 +172,12 @@ class Orchestrator:
             sources,
             keys,
             apt_section.allow_unauthenticated() or False,
+            apt_section.lockfile() or False,
         )
 
     def _generate_pacman_deploy_command(self, context, pacman_section):
+        from appimagebuilder.commands.pacman_deploy import PacmanDeployCommand
+
         return PacmanDeployCommand(
             context,
             pacman_section.include(),
@@ -152,6 +185,7 @@ class Orchestrator:
             pacman_section["Architecture"](),
             pacman_section.repositories(),
             pacman_section.options(),
+            pacman_section.lockfile() or False,
         )
 
     def _extract_v1_recipe_context(self, args, recipe):
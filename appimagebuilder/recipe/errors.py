@@ -13,3 +13,7 @@
 
 class RecipeError(RuntimeError):
     pass
+
+
+class MissingVariableError(RecipeError):
+    pass
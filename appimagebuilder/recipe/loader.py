@@ -18,6 +18,45 @@ import yaml
 from appimagebuilder.recipe.errors import RecipeError
 from appimagebuilder.recipe.roamer import Roamer
 
+# pattern for global vars: look for ${word}
+_ENV_PATTERN = re.compile(r".*?\${(\w+)}.*?")
+
+
+class _RecipeYamlLoader(getattr(yaml, "CSafeLoader", yaml.SafeLoader)):
+    """
+    Safe yaml loader resolving the environment variables
+
+    Uses the libyaml parser when available. The !ENV resolver is registered on
+    this class only, the global yaml loaders are left untouched.
+    """
+
+
+def _construct_env_variables(loader, node):
+    """
+    Extracts the environment variable from the node's value
+    :param yaml.Loader loader: the yaml loader
+    :param node: the current node in the yaml
+    :return: the parsed string that contains the value of the environment
+    variable
+    """
+    value = loader.construct_scalar(node)
+    match = _ENV_PATTERN.findall(value)  # to find all env variables in line
+    if match:
+        full_value = value
+        for g in match:
+            if g not in os.environ:
+                raise RecipeError(f"Unable to resolve environment variable: {g}")
+
+            full_value = full_value.replace(f"${{{g}}}", os.environ[g])
+        return full_value
+    return value
+
+
+# the tag will be used to mark where to start searching for the pattern
+# e.g. somekey: !ENV somestring${MYENVVAR}blah blah blah
+_RecipeYamlLoader.add_implicit_resolver("!ENV", _ENV_PATTERN, None)
+_RecipeYamlLoader.add_constructor("!ENV", _construct_env_variables)
+
 
 class Loader:
     """
@@ -36,39 +75,7 @@ class Loader:
     """
 
     def __init__(self):
-        self._loader = yaml.SafeLoader
-
-        # the tag will be used to mark where to start searching for the pattern
-        # e.g. somekey: !ENV somestring${MYENVVAR}blah blah blah
-        self._tag = "!ENV"
-
-        # pattern for global vars: look for ${word}
-        pattern = re.compile(".*?\${(\w+)}.*?")
-
-        self._loader.add_implicit_resolver(self._tag, pattern, None)
-
-        def constructor_env_variables(loader, node):
-            """
-            Extracts the environment variable from the node's value
-            :param yaml.Loader loader: the yaml loader
-            :param node: the current node in the yaml
-            :return: the parsed string that contains the value of the environment
-            variable
-            """
-            value = loader.construct_scalar(node)
-            match = pattern.findall(value)  # to find all env variables in line
-            if match:
-                full_value = value
-                for g in match:
-                    value = os.environ.get(g, g)
-                    if value == g:
-                        raise RecipeError(f"Unable to resolve environment variable: {g}")
-
-                    full_value = full_value.replace(f"${{{g}}}", value)
-                return full_value
-            return value
-
-        self._loader.add_constructor(self._tag, constructor_env_variables)
+        self._loader = _RecipeYamlLoader
 
     def load(self, path):
         if os.path.isfile(path):
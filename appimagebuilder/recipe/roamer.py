@@ -9,11 +9,20 @@
 #
 #  The above copyright notice and this permission notice shall be included in
 #  all copies or substantial portions of the Software.
+import functools
 import os
 import re
 
 import roam
 
+from appimagebuilder.recipe.errors import MissingVariableError
+
+# {{VAR}} placeholders, resolved from the environment
+_VARIABLE = re.compile(r"{{\s?(\w+)\s?}}")
+
+# the attribute lookups of roam prefer them over the mapping keys
+_DICT_ATTRIBUTES = frozenset(dir(dict))
+
 
 class Roamer(roam.Roamer):
     """
@@ -21,6 +30,10 @@ class Roamer(roam.Roamer):
 
     The Roamer class acts as a Shim over the data objects easing the access and
     traversal operations.
+
+    The variables are resolved on every access, the scripts run during the build
+    can export new ones. The strings are split in literals and variable names only
+    once, the recipe values are read many times.
     """
 
     def __call__(
@@ -30,15 +43,37 @@ class Roamer(roam.Roamer):
         _raise=False,
         _roam=False,
         _invoke=None,
-        **kwargs
+        **kwargs,
     ):
         result = super().__call__(
             *args, _raise=_raise, _roam=_roam, _invoke=_invoke, **kwargs
         )
 
-        return self._resolve_variables(result) if resolve_variables else result
+        if not resolve_variables:
+            return result
+
+        try:
+            return self._resolve_variables(result)
+        except KeyError as err:
+            raise MissingVariableError(
+                f"Missing environment variable: '{err.args[0]}' "
+                f"required by {self._r_path_.description()}"
+            )
 
     def __getattr__(self, attr_name):
+        item = self._r_item_
+        # fast path for the recipe mappings, roam handles the other lookups
+        if (
+            type(item) is dict
+            and attr_name in item
+            and attr_name not in _DICT_ATTRIBUTES
+            and not self._r_is_multi_item_
+        ):
+            result = Roamer(self)
+            result._r_item_ = item[attr_name]
+            result._r_path_.log_getattr(attr_name, result)
+            return result
+
         result = super().__getattr__(attr_name)
         return Roamer(result)
 
@@ -52,14 +87,21 @@ class Roamer(roam.Roamer):
             return {k: self._resolve_variables(v) for k, v in variable.items()}
         return variable
 
-    def _replace_env_variables_in_str(self, variable):
-        new_val = variable
-        for item in re.findall(r"{{\s?\w+\s?}}", new_val):
-            var_name = item[2:-2]
-            var_name = var_name.strip()
-            if var_name not in os.environ:
-                raise RuntimeError(f"Missing environment variable: '{var_name}'")
-            value = os.environ[var_name]
-            new_val = new_val.replace(item, value, 1)
-
-        return new_val
+    @staticmethod
+    def _replace_env_variables_in_str(variable):
+        parts = _compile_template(variable)
+        if not parts:
+            return variable
+
+        values = list(parts)
+        # the variable names are at the odd positions
+        for idx in range(1, len(parts), 2):
+            values[idx] = os.environ[parts[idx]]
+        return "".join(values)
+
+
+@functools.lru_cache(maxsize=None)
+def _compile_template(value: str) -> (str,):
+    """Split a string in its literal parts and variable names, None if it has no variables"""
+    parts = _VARIABLE.split(value)
+    return tuple(parts) if len(parts) > 1 else None
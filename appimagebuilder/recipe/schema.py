@@ -61,6 +61,7 @@ class RecipeSchema:
                 "include": [str],
                 Optional("exclude"): [str],
                 Optional("allow_unauthenticated"): bool,
+                Optional("lockfile"): bool,
             }
         )
         self.v1_pacman = Schema(
@@ -71,6 +72,7 @@ class RecipeSchema:
                 Optional("options"): {str: str},
                 "include": [str],
                 Optional("exclude"): [str],
+                Optional("lockfile"): bool,
             }
         )
 
@@ -90,12 +92,21 @@ class RecipeSchema:
             }
         )
 
+        self.v1_squashfs = {
+            Optional("compression"): Or("xz", "zstd", "gzip", "lz4", "lzo"),
+            Optional("compression_level"): int,
+            Optional("block_size"): Or(int, str),
+            Optional("processors"): int,
+            Optional("delta_friendly"): bool,
+        }
+
         self.v1_appimage = Schema(
             {
                 "arch": str,
                 Optional("update-information"): str,
                 Optional("sign-key"): str,
                 Optional("file_name"): str,
+                Optional("squashfs"): self.v1_squashfs,
             }
         )
 
@@ -0,0 +1,155 @@
+#  Copyright  2021 Alexis Lopez Zubieta
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a
+#  copy of this software and associated documentation files (the "Software"),
+#  to deal in the Software without restriction, including without limitation the
+#  rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+#  sell copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+import hashlib
+import json
+import logging
+import pathlib
+
+from appimagebuilder.commands.command import Command
+from appimagebuilder.recipe.errors import MissingVariableError
+from appimagebuilder.utils.file_utils import tree_digest
+
+
+class StepCache:
+    """
+    Skip the leading build steps whose results are already in place
+
+    Each step is identified by a key chained from its fingerprint and the keys
+    of the previous steps, so a change in a step invalidates the following ones.
+    The AppDir is modified in place, therefore the state left by the cached steps
+    is only available if no later step changed it. This is verified using the
+    digest of the AppDir recorded after each step that modifies it.
+    """
+
+    def __init__(self, cache_dir: pathlib.Path, app_dir: pathlib.Path):
+        self.path = pathlib.Path(cache_dir) / "steps.json"
+        self.app_dir = pathlib.Path(app_dir)
+        self.logger = logging.getLogger("StepCache")
+
+        self._entries = self._load()
+        self._new_entries = {}
+        self._keys = []
+
+    def _load(self) -> [dict]:
+        if not self.path.exists():
+            return []
+
+        try:
+            with open(self.path) as f:
+                return json.load(f)["steps"]
+        except (ValueError, KeyError) as err:
+            self.logger.warning(f"Ignoring invalid step cache {self.path}: {err}")
+            return []
+
+    def write(self):
+        # only the steps completed in a row are useful
+        steps = []
+        while len(steps) in self._new_entries:
+            steps.append(self._new_entries[len(steps)])
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "w") as f:
+            json.dump({"steps": steps}, f)
+
+    def plan(self, commands: [Command]) -> int:
+        """
+        Restore the state of the leading commands that are up to date
+
+        :return: the number of commands that can be skipped
+        """
+        skipped = self.predict(commands)
+        for idx in range(skipped):
+            self.logger.info(f"Skipping {commands[idx].description}, up to date")
+            commands[idx].restore_state(self._entries[idx]["state"])
+            self._new_entries[idx] = self._entries[idx]
+
+        return skipped
+
+    def predict(self, commands: [Command]) -> int:
+        """Number of leading commands that are up to date, their state is not restored"""
+        self._keys = self._chain_keys(commands)
+
+        matches = 0
+        while (
+            matches < min(len(commands), len(self._entries))
+            and self._keys[matches]
+            and self._keys[matches] == self._entries[matches]["key"]
+        ):
+            matches += 1
+
+        return self._find_app_dir_state(matches)
+
+    def is_cacheable(self, idx: int) -> bool:
+        """Whether the results of a planned command can be cached"""
+        return bool(self._keys[idx])
+
+    def store(self, idx: int, command: Command):
+        """Cache the results of a command, must be called before the next command starts"""
+        if not self._keys[idx]:
+            return
+
+        app_dir_digest = None
+        if {"app_dir", Command.ALL_RESOURCES}.intersection(command.outputs()):
+            app_dir_digest = tree_digest(self.app_dir)
+
+        self._new_entries[idx] = {
+            "key": self._keys[idx],
+            "app_dir_digest": app_dir_digest,
+            "state": command.cached_state(),
+        }
+
+    def _find_app_dir_state(self, matches: int) -> int:
+        """Find the longest run of steps that left the AppDir as it is now"""
+        current_digest = None
+        skipped = matches
+        while skipped > 0:
+            writers = [
+                idx
+                for idx in range(skipped)
+                if self._entries[idx]["app_dir_digest"] is not None
+            ]
+            if not writers:
+                # the steps didn't touch the AppDir
+                break
+
+            if current_digest is None:
+                current_digest = tree_digest(self.app_dir)
+
+            if self._entries[writers[-1]]["app_dir_digest"] == current_digest:
+                break
+
+            skipped = writers[-1]
+
+        return skipped
+
+    @staticmethod
+    def _chain_keys(commands: [Command]) -> [str]:
+        keys = []
+        sha = hashlib.sha256()
+        for command in commands:
+            try:
+                fingerprint = command.fingerprint()
+            except MissingVariableError as err:
+                # the variables exported by the build scripts are set once they run
+                logging.getLogger("StepCache").info(
+                    f"Not caching {command.description} and the following steps: {err}"
+                )
+                fingerprint = None
+
+            if fingerprint is None:
+                # the following steps can't be cached either
+                keys.extend([None] * (len(commands) - len(keys)))
+                break
+
+            sha.update(f"{command.id()}\0{fingerprint}\n".encode())
+            keys.append(sha.hexdigest())
+        return keys
@@ -0,0 +1,255 @@
+#  Copyright  2021 Alexis Lopez Zubieta
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a
+#  copy of this software and associated documentation files (the "Software"),
+#  to deal in the Software without restriction, including without limitation the
+#  rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+#  sell copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import pathlib
+import shutil
+import time
+from urllib import error, request
+
+from appimagebuilder.utils.file_utils import user_cache_dir
+
+
+class AssetCacheError(RuntimeError):
+    pass
+
+
+class AssetCache:
+    """
+    Downloaded assets (runtimes, AppRun binaries) shared between builds
+
+    Files are stored by the sha256 of their contents and indexed by their url.
+    Concurrent builds requesting the same url wait for a single download, which
+    is resumed if a previous one was interrupted. Entries are written aside and
+    renamed, so a partial file is never taken as cached.
+
+    The assets requested without a checksum can change upstream (i.e.: the
+    continuous runtime), they are revalidated with a conditional request once
+    <max_age> seconds passed since the last check. The cached copy is still used
+    if the server can't be reached or fails to answer.
+
+    The assets can also be provided from an offline mirror, a directory holding
+    them by their file name, set in the ABUILDER_ASSETS_MIRROR environment var.
+    """
+
+    CHUNK_SIZE = 2 ** 20
+    MAX_AGE = 24 * 60 * 60
+
+    def __init__(
+        self,
+        cache_dir: pathlib.Path = None,
+        mirror_dir: pathlib.Path = None,
+        max_age: int = MAX_AGE,
+    ):
+        self.cache_dir = pathlib.Path(cache_dir or user_cache_dir("assets"))
+        self.max_age = max_age
+        mirror_dir = mirror_dir or os.getenv("ABUILDER_ASSETS_MIRROR")
+        self.mirror_dir = pathlib.Path(mirror_dir) if mirror_dir else None
+        self.logger = logging.getLogger("AssetCache")
+
+        for name in ("blobs", "urls", "partial"):
+            (self.cache_dir / name).mkdir(parents=True, exist_ok=True)
+
+    def fetch(self, url: str, target: pathlib.Path, sha256: str = None):
+        """Copy the asset at <url> into <target>, downloading it if it's not cached"""
+        target = pathlib.Path(target)
+        url_key = hashlib.sha256(url.encode()).hexdigest()
+        with self._lock(url_key):
+            entry = self._lookup(url_key, sha256)
+            if (
+                entry
+                and not sha256
+                and time.time() - entry.get("checked", 0) > self.max_age
+            ):
+                entry = self._revalidate(url, url_key, entry)
+            if not entry:
+                entry = self._add(url, url_key, sha256)
+            blob_path = self.cache_dir / "blobs" / entry["sha256"]
+
+        target.parent.mkdir(parents=True, exist_ok=True)
+        partial_target = target.with_name(f"{target.name}.{os.getpid()}.part")
+        shutil.copyfile(blob_path, partial_target)
+        partial_target.replace(target)
+        return target
+
+    def _lock(self, url_key: str):
+        return _FileLock(self.cache_dir / "partial" / f"{url_key}.lock")
+
+    def _lookup(self, url_key: str, sha256: str = None) -> dict:
+        try:
+            with open(self.cache_dir / "urls" / url_key) as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if sha256 and entry["sha256"] != sha256:
+            # the asset was updated
+            return None
+
+        blob_path = self.cache_dir / "blobs" / entry["sha256"]
+        return entry if blob_path.exists() else None
+
+    def _revalidate(self, url: str, url_key: str, entry: dict) -> dict:
+        """Check whether the cached asset is up to date, None if it changed"""
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        if not headers:
+            return None
+
+        try:
+            with request.urlopen(
+                request.Request(url, headers=headers, method="HEAD")
+            ) as response:
+                if _is_modified(response, entry):
+                    # it's downloaded again
+                    return None
+        except error.HTTPError as err:
+            if err.code != 304:
+                # a mirror failure doesn't tell the asset changed
+                self.logger.warning(
+                    f"Unable to revalidate {url}, using the cached copy: {err}"
+                )
+                return entry
+        except OSError as err:
+            self.logger.warning(
+                f"Unable to revalidate {url}, using the cached copy: {err}"
+            )
+            return entry
+
+        entry["checked"] = time.time()
+        self._write_entry(url_key, entry)
+        return entry
+
+    def _add(self, url: str, url_key: str, sha256: str = None) -> dict:
+        partial_path = self.cache_dir / "partial" / url_key
+        validators = {}
+        mirror_path = self._find_in_mirror(url)
+        if mirror_path:
+            self.logger.info(f"Using {mirror_path} from the mirror")
+            shutil.copyfile(mirror_path, partial_path)
+        else:
+            validators = self._download(url, partial_path)
+
+        digest = _file_sha256(partial_path)
+        if sha256 and digest != sha256:
+            partial_path.unlink()
+            raise AssetCacheError(f"Checksum mismatch on: {url}")
+
+        partial_path.replace(self.cache_dir / "blobs" / digest)
+
+        entry = {"url": url, "sha256": digest, "checked": time.time(), **validators}
+        self._write_entry(url_key, entry)
+        return entry
+
+    def _write_entry(self, url_key: str, entry: dict):
+        entry_path = self.cache_dir / "urls" / url_key
+        partial_entry_path = entry_path.with_name(f"{url_key}.part")
+        with open(partial_entry_path, "w") as f:
+            json.dump(entry, f)
+        partial_entry_path.replace(entry_path)
+
+    def _find_in_mirror(self, url: str) -> pathlib.Path:
+        if self.mirror_dir:
+            path = self.mirror_dir / url.rsplit("/", 1)[-1]
+            if path.is_file():
+                return path
+
+        return None
+
+    def _download(self, url: str, path: pathlib.Path) -> {str: str}:
+        """Download <url> into <path>, returns the validators of the downloaded file"""
+        validators_path = path.with_name(f"{path.name}.json")
+        validators = {}
+        if path.exists() and validators_path.exists():
+            with open(validators_path) as f:
+                validators = json.load(f)
+
+        headers = {}
+        # resume an interrupted download, if the file didn't change meanwhile
+        offset = path.stat().st_size if path.exists() else 0
+        if_range = validators.get("etag") or validators.get("last_modified")
+        if offset and if_range:
+            headers["Range"] = f"bytes={offset}-"
+            headers["If-Range"] = if_range
+
+        self.logger.info(f"Downloading: {url}")
+        try:
+            with request.urlopen(request.Request(url, headers=headers)) as response:
+                resumed = getattr(response, "status", None) == 206
+                if not resumed:
+                    validators = _read_validators(response)
+                    with open(validators_path, "w") as f:
+                        json.dump(validators, f)
+
+                with open(path, "ab" if resumed else "wb") as f:
+                    shutil.copyfileobj(response, f, self.CHUNK_SIZE)
+        except error.HTTPError as err:
+            # the previous download was interrupted right after it was completed
+            if err.code != 416 or "Range" not in headers:
+                raise AssetCacheError(f"Unable to download {url}: {err}") from err
+        except OSError as err:
+            raise AssetCacheError(f"Unable to download {url}: {err}") from err
+
+        validators_path.unlink()
+        return validators
+
+
+def _is_modified(response, entry: dict) -> bool:
+    """Whether a successful revalidation <response> reports a new version of <entry>"""
+    if getattr(response, "status", 200) != 200:
+        return False
+
+    # some servers ignore the conditional headers, compare the validators
+    validators = _read_validators(response)
+    return not validators or any(
+        entry.get(key) != value for key, value in validators.items()
+    )
+
+
+def _read_validators(response) -> {str: str}:
+    headers = getattr(response, "headers", None) or {}
+    validators = {
+        "etag": headers.get("ETag"),
+        "last_modified": headers.get("Last-Modified"),
+    }
+    return {key: value for key, value in validators.items() if value}
+
+
+class _FileLock:
+    """Exclusive lock between processes, released when the process ends"""
+
+    def __init__(self, path: pathlib.Path):
+        self.path = path
+        self._file = None
+
+    def __enter__(self):
+        self._file = open(self.path, "a")
+        fcntl.flock(self._file, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        fcntl.flock(self._file, fcntl.LOCK_UN)
+        self._file.close()
+
+
+def _file_sha256(path: pathlib.Path) -> str:
+    sha256 = hashlib.sha256()
+    with open(path, "rb") as f:
+        while data := f.read(AssetCache.CHUNK_SIZE):
+            sha256.update(data)
+    return sha256.hexdigest()
@@ -14,6 +14,8 @@ import os
 from shutil import which
 import subprocess
 
+from appimagebuilder.utils import shell
+
 
 class Command:
     class CommandMissingError(RuntimeError):
@@ -54,7 +56,7 @@ class Command:
         else:
             self.logger.debug(" ".join(command))
 
-        process = subprocess.Popen(
+        process = shell.popen(
             command,
             stdout=subprocess.PIPE,
             stderr=subprocess.PIPE,
@@ -66,7 +68,7 @@ class Command:
 
     def _run_with_input(self, command, input):
         self.logger.info(" ".join(command))
-        process = subprocess.Popen(
+        process = shell.popen(
             command,
             stdin=subprocess.PIPE,
             stdout=subprocess.PIPE,
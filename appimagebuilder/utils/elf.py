@@ -10,6 +10,7 @@
 #  The above copyright notice and this permission notice shall be included in
 #  all copies or substantial portions of the Software.
 import shutil
+import struct
 import subprocess
 
 from appimagebuilder.utils import shell
@@ -32,7 +33,7 @@ def has_soname(path):
     """
     readelf_path = shell.require_executable("readelf")
     # note: don't use `shell=True` as it forces the usage of the system shell which cases a failure if readelf is embed.
-    _proc = subprocess.run(
+    _proc = shell.run(
         [readelf_path, "-d", path],
         stdout=subprocess.PIPE,
         stderr=subprocess.PIPE,
@@ -54,7 +55,7 @@ def has_start_symbol(path):
     """
     readelf_path = shell.require_executable("readelf")
     # note: don't use `shell=True` as it forces the usage of the system shell which cases a failure if readelf is embed.
-    _proc = subprocess.run(
+    _proc = shell.run(
         [readelf_path, "-s", path],
         stdout=subprocess.PIPE,
         stderr=subprocess.PIPE,
@@ -89,3 +90,49 @@ def get_arch(path):
             raise RuntimeError(
                 f"Unknown instructions set architecture `{e_machine.hex()}` on: {path}"
             )
+
+
+def read_sections(path) -> {str: (int, int)}:
+    """
+    Read the file offset and size of the sections of an elf from its section headers
+
+    https://en.wikipedia.org/wiki/Executable_and_Linkable_Format#Section_header
+    """
+    with open(path, "rb") as f:
+        ident = f.read(16)
+        if ident[:4] != b"\x7fELF" or ident[4] not in (1, 2) or ident[5] not in (1, 2):
+            raise RuntimeError(f"Not a valid elf file: {path}")
+
+        is_64_bits = ident[4] == 2
+        byte_order = "<" if ident[5] == 1 else ">"
+        if is_64_bits:
+            header_format, section_format = "QQQIHHHHHH", "IIQQQQIIQQ"
+        else:
+            header_format, section_format = "IIIIHHHHHH", "IIIIIIIIII"
+
+        header_format = byte_order + "HHI" + header_format
+        header = struct.unpack(header_format, f.read(struct.calcsize(header_format)))
+        e_shoff = header[5]
+        e_shentsize, e_shnum, e_shstrndx = header[10:13]
+
+        section_headers = []
+        for idx in range(e_shnum):
+            f.seek(e_shoff + idx * e_shentsize)
+            data = f.read(struct.calcsize(byte_order + section_format))
+            # sh_name, sh_offset and sh_size
+            fields = struct.unpack(byte_order + section_format, data)
+            section_headers.append((fields[0], fields[4], fields[5]))
+
+        if not section_headers:
+            return {}
+
+        _, names_offset, names_size = section_headers[e_shstrndx]
+        f.seek(names_offset)
+        names = f.read(names_size)
+
+    sections = {}
+    # the first section header is reserved
+    for name_offset, offset, size in section_headers[1:]:
+        name = names[name_offset : names.index(b"\0", name_offset)].decode()
+        sections[name] = (offset, size)
+    return sections
@@ -9,7 +9,10 @@
 #
 #  The above copyright notice and this permission notice shall be included in
 #  all copies or substantial portions of the Software.
+import fnmatch
+import hashlib
 import os
+import pathlib
 import stat
 
 
@@ -24,3 +27,55 @@ def set_permissions_rx_all(path):
         | stat.S_IXOTH
         | stat.S_IWUSR,
     )
+
+
+def user_cache_dir(*parts) -> pathlib.Path:
+    """Per user cache directory shared between builds, honors $XDG_CACHE_HOME"""
+    base_dir = os.getenv("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    path = pathlib.Path(base_dir, "appimage-builder", *parts)
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def tree_digest(path, excluded_paths=(), excluded_patterns=()) -> str:
+    """
+    Digest of the metadata (not the content) of the files in a directory tree
+
+    It's a cheap way of telling whether a tree was modified, files are compared
+    by their type, permissions, size, modification time and link target.
+    """
+    path = str(path)
+    excluded_paths = {str(excluded_path) for excluded_path in excluded_paths}
+
+    def is_excluded(root, name):
+        return os.path.join(root, name) in excluded_paths or any(
+            fnmatch.fnmatch(name, pattern) for pattern in excluded_patterns
+        )
+
+    sha = hashlib.sha256()
+    for root, dirs, files in os.walk(path):
+        dirs[:] = sorted(name for name in dirs if not is_excluded(root, name))
+        for name in sorted(dirs + files):
+            if is_excluded(root, name):
+                continue
+
+            entry_path = os.path.join(root, name)
+            entry_stat = os.lstat(entry_path)
+            link = os.readlink(entry_path) if stat.S_ISLNK(entry_stat.st_mode) else ""
+            sha.update(
+                f"{os.path.relpath(entry_path, path)}\0{entry_stat.st_mode}\0"
+                f"{entry_stat.st_size}\0{entry_stat.st_mtime_ns}\0{link}\n".encode()
+            )
+    return sha.hexdigest()
+
+
+def files_digest(paths) -> str:
+    """Digest of the names and contents of a list of files, in the given order"""
+    sha = hashlib.sha256()
+    for path in paths:
+        sha.update(f"{os.path.basename(path)}\0".encode())
+        with open(path, "rb") as f:
+            while data := f.read(2 ** 20):
+                sha.update(data)
+        sha.update(b"\n")
+    return sha.hexdigest()
@@ -1,11 +1,43 @@
 import logging
+import os
 import shutil
+import subprocess
+import threading
+import time
 
 
 class CommandNotFoundError(RuntimeError):
     pass
 
 
+class SpawnRecord:
+    """Trace of an external tool execution"""
+
+    def __init__(self, argv, duration: float, returncode: int, output_size: int):
+        if isinstance(argv, (str, bytes, os.PathLike)):
+            argv = [argv]
+        self.argv = [os.fsdecode(arg) for arg in argv]
+        self.duration = duration
+        self.returncode = returncode
+        self.output_size = output_size
+
+    def to_dict(self) -> dict:
+        return dict(vars(self))
+
+
+# called with a SpawnRecord every time a traced process finishes
+spawn_listeners = []
+
+# limits the number of tools run at once through run(), processes started with
+# popen() are often long living (agents, mounts) and are not accounted
+_spawn_slots = threading.BoundedSemaphore(os.cpu_count() or 1)
+
+
+def set_concurrency_limit(limit: int):
+    global _spawn_slots
+    _spawn_slots = threading.BoundedSemaphore(max(limit, 1))
+
+
 def require_executables(executables: [str]):
     """
     Iterates through all items in <executables> searching for their paths
@@ -15,12 +47,74 @@ def require_executables(executables: [str]):
 
 
 def require_executable(tool):
-    if tool_path := shutil.which(tool):
+    # scripts may extend $PATH, it's part of the lookup key
+    if tool_path := _which(tool, os.getenv("PATH")):
         return tool_path
     else:
         raise CommandNotFoundError("Could not find '{exe}' on $PATH.".format(exe=tool))
 
 
+_which_cache = {}
+
+
+def _which(tool, path):
+    # misses aren't cached, a later step may install the tool
+    if tool_path := _which_cache.get((tool, path)):
+        return tool_path
+
+    tool_path = shutil.which(tool, path=path)
+    if tool_path:
+        _which_cache[(tool, path)] = tool_path
+    return tool_path
+
+
+def run(args, **kwargs) -> subprocess.CompletedProcess:
+    """subprocess.run replacement that traces the execution"""
+    with _spawn_slots:
+        start = time.monotonic()
+        proc = subprocess.run(args, **kwargs)
+        _notify(proc.args, time.monotonic() - start, proc.returncode, proc)
+    return proc
+
+
+def popen(args, **kwargs) -> subprocess.Popen:
+    """subprocess.Popen replacement that traces the execution"""
+    return _TracedPopen(args, **kwargs)
+
+
+class _TracedPopen(subprocess.Popen):
+    def __init__(self, args, **kwargs):
+        self._start = time.monotonic()
+        self._traced = False
+        super().__init__(args, **kwargs)
+
+    def poll(self):
+        returncode = super().poll()
+        self._trace()
+        return returncode
+
+    def wait(self, timeout=None):
+        returncode = super().wait(timeout)
+        self._trace()
+        return returncode
+
+    def _trace(self):
+        if self.returncode is not None and not self._traced:
+            self._traced = True
+            _notify(self.args, time.monotonic() - self._start, self.returncode)
+
+
+def _notify(args, duration, returncode, proc=None):
+    output_size = 0
+    for output in (getattr(proc, "stdout", None), getattr(proc, "stderr", None)):
+        if isinstance(output, (bytes, str)):
+            output_size += len(output)
+
+    record = SpawnRecord(args, duration, returncode, output_size)
+    for listener in spawn_listeners:
+        listener(record)
+
+
 def assert_successful_result(proc):
     if proc.returncode:
         logging.error(f'"{proc.args}" execution failed')
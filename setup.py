@@ -58,6 +58,8 @@ setuptools.setup(
         "python-gnupg",
         "libconf",
         "pydpkg",
+        "zstandard",
+        "numpy",
     ],
     python_requires=">=3.6",
     package_data={"": []},
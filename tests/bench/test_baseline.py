@@ -0,0 +1,48 @@
+#  Copyright  2021 Alexis Lopez Zubieta
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a
+#  copy of this software and associated documentation files (the "Software"),
+#  to deal in the Software without restriction, including without limitation the
+#  rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+#  sell copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+import pathlib
+import tempfile
+from unittest import TestCase
+
+from appimagebuilder.bench import Baseline
+
+
+class TestBaseline(TestCase):
+    def setUp(self) -> None:
+        self.baseline = Baseline({"bash": {"scan": 1.0, "resolve": 0.01}})
+
+    def test_compare_detects_regressions(self):
+        regressions = self.baseline.compare("bash", {"scan": 1.5, "resolve": 0.01})
+
+        self.assertEqual([(r.stage, r.current) for r in regressions], [("scan", 1.5)])
+
+    def test_compare_ignores_slowdowns_within_threshold(self):
+        regressions = self.baseline.compare("bash", {"scan": 1.1}, threshold=0.2)
+
+        self.assertEqual(regressions, [])
+
+    def test_compare_ignores_small_deltas(self):
+        regressions = self.baseline.compare("bash", {"resolve": 0.02}, min_delta=0.05)
+
+        self.assertEqual(regressions, [])
+
+    def test_compare_ignores_unknown_stages(self):
+        self.assertEqual(self.baseline.compare("bash", {"squashfs": 10.0}), [])
+        self.assertEqual(self.baseline.compare("vlc", {"scan": 10.0}), [])
+
+    def test_write_and_load(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = pathlib.Path(tmp) / "baseline.json"
+            self.baseline.update("vlc", {"scan": 2.0})
+            self.baseline.write(path)
+
+            self.assertEqual(Baseline.load(path).timings, self.baseline.timings)
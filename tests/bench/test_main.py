@@ -0,0 +1,61 @@
+#  Copyright  2021 Alexis Lopez Zubieta
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a
+#  copy of this software and associated documentation files (the "Software"),
+#  to deal in the Software without restriction, including without limitation the
+#  rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+#  sell copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+import pathlib
+import subprocess
+import sys
+import tempfile
+from unittest import TestCase
+
+ROOT_DIR = pathlib.Path(__file__).parents[2]
+RECIPES_DIR = ROOT_DIR / "recipes"
+
+
+class TestMain(TestCase):
+    def _run_bench(self, *args):
+        with tempfile.TemporaryDirectory() as tmp:
+            return subprocess.run(
+                [
+                    sys.executable,
+                    "-m",
+                    "appimagebuilder.bench",
+                    "--fixtures",
+                    tmp,
+                    "--baseline",
+                    str(pathlib.Path(tmp) / "baseline.json"),
+                    *args,
+                ],
+                cwd=ROOT_DIR,
+                stderr=subprocess.PIPE,
+            )
+
+    def test_fails_if_no_benchmark_ran(self):
+        result = self._run_bench(str(RECIPES_DIR / "bash"))
+
+        self.assertEqual(result.returncode, 1)
+        self.assertIn(b"No benchmark ran", result.stderr)
+
+    def test_default_run(self):
+        # the checked-in fixtures and baseline, timings are not compared here
+        result = subprocess.run(
+            [sys.executable, "-m", "appimagebuilder.bench", "--repeat", "1"]
+            + ["--min-delta", "3600"],
+            cwd=ROOT_DIR,
+            stderr=subprocess.PIPE,
+        )
+
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertIn(b"bash-files scan", result.stderr)
+
+    def test_run(self):
+        result = self._run_bench("--synthetic-recipes", "10", "--stages", "load")
+
+        self.assertEqual(result.returncode, 0, result.stderr)
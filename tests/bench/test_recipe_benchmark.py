@@ -0,0 +1,56 @@
+#  Copyright  2021 Alexis Lopez Zubieta
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a
+#  copy of this software and associated documentation files (the "Software"),
+#  to deal in the Software without restriction, including without limitation the
+#  rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+#  sell copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+import pathlib
+import shutil
+import tempfile
+from unittest import TestCase
+
+from appimagebuilder.bench import RecipeBenchmark
+
+ROOT_DIR = pathlib.Path(__file__).parents[2]
+RECIPES_DIR = ROOT_DIR / "recipes"
+
+
+class TestRecipeBenchmark(TestCase):
+    def setUp(self) -> None:
+        self.fixtures_dir = pathlib.Path(tempfile.mkdtemp())
+        bin_dir = self.fixtures_dir / "AppDir" / "usr" / "bin"
+        bin_dir.mkdir(parents=True)
+        shutil.copy(shutil.which("true"), bin_dir)
+        (bin_dir / "script.sh").write_text("#!/bin/sh\n")
+
+        self.benchmark = RecipeBenchmark(
+            "bash", RECIPES_DIR / "bash" / "AppImageBuilder.yml", self.fixtures_dir
+        )
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.fixtures_dir)
+
+    def test_run_skips_stages_without_fixtures(self):
+        results = self.benchmark.run(repeat=2)
+
+        self.assertIn("scan", results)
+        self.assertIn("resolve", results)
+        # no package archives nor AppRun binaries
+        self.assertNotIn("extract", results)
+        self.assertNotIn("runtime", results)
+
+    def test_run_selected_stages(self):
+        results = self.benchmark.run(["scan"])
+
+        self.assertEqual(list(results), ["scan"])
+
+    def test_run_does_not_modify_the_fixtures(self):
+        self.benchmark.run(["scan", "resolve"])
+
+        files = sorted(p.name for p in (self.fixtures_dir / "AppDir").rglob("*"))
+        self.assertEqual(files, ["bin", "script.sh", "true", "usr"])
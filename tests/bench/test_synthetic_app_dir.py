@@ -0,0 +1,102 @@
+#  Copyright  2021 Alexis Lopez Zubieta
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a
+#  copy of this software and associated documentation files (the "Software"),
+#  to deal in the Software without restriction, including without limitation the
+#  rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+#  sell copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+import os
+import pathlib
+import platform
+import shutil
+import tempfile
+from unittest import TestCase, skipUnless
+
+from appimagebuilder.bench import SyntheticAppDir
+from appimagebuilder.modules.deploy.files.dependencies_resolver.elf_resolver import (
+    ElfResolver,
+)
+from appimagebuilder.utils import elf
+from appimagebuilder.utils.finder import Finder
+
+
+class TestSyntheticAppDir(TestCase):
+    def setUp(self) -> None:
+        self.path = pathlib.Path(tempfile.mkdtemp())
+        self.app_dir = self.path / "AppDir"
+        SyntheticAppDir(
+            self.app_dir,
+            executables=2,
+            libraries=7,
+            depth=3,
+            fan_out=2,
+            symlinks=4,
+            scripts=3,
+            data_files=5,
+        ).generate()
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.path)
+
+    def test_generate(self):
+        finder = Finder(self.app_dir)
+        elf_files = list(
+            finder.find("*", [Finder.is_file, Finder.is_elf], [Finder.is_symlink])
+        )
+        symlinks = list(finder.find("*", [Finder.is_symlink]))
+        data_files = list(finder.find("*.dat", [Finder.is_file]))
+
+        self.assertEqual(len(elf_files), 9)
+        self.assertEqual(len(symlinks), 4)
+        self.assertEqual(len(data_files), 5)
+        self.assertEqual(
+            (self.app_dir / "usr" / "bin" / "script-0").read_text(),
+            "#!/bin/sh\necho 0\n",
+        )
+
+    def test_generated_elf_files(self):
+        executable = self.app_dir / "usr" / "bin" / "synthetic-0"
+        library = self.app_dir / "usr" / "lib" / "libsynthetic-0.so"
+
+        self.assertEqual(elf.get_arch(executable), "x86_64")
+        self.assertTrue(elf.has_start_symbol(executable))
+        self.assertFalse(elf.has_soname(executable))
+        self.assertTrue(elf.has_soname(library))
+        self.assertFalse(elf.has_start_symbol(library))
+
+    def test_generate_is_reproducible(self):
+        other_app_dir = self.path / "Other"
+        SyntheticAppDir(
+            other_app_dir,
+            executables=2,
+            libraries=7,
+            depth=3,
+            fan_out=2,
+            symlinks=4,
+            scripts=3,
+            data_files=5,
+        ).generate()
+
+        for path in self.app_dir.rglob("*"):
+            other_path = other_app_dir / path.relative_to(self.app_dir)
+            if path.is_symlink():
+                self.assertEqual(os.readlink(path), os.readlink(other_path))
+            elif path.is_file():
+                self.assertEqual(path.read_bytes(), other_path.read_bytes())
+
+    @skipUnless(platform.machine() == "x86_64", "requires a x86_64 dynamic loader")
+    def test_dependencies_are_resolved_inside_the_app_dir(self):
+        executable = self.app_dir / "usr" / "bin" / "synthetic-0"
+
+        dependencies = ElfResolver().resolve([executable])
+
+        self.assertTrue(dependencies)
+        for dependency in dependencies:
+            if "linux-vdso" not in dependency:
+                self.assertTrue(
+                    pathlib.Path(dependency).resolve().is_relative_to(self.app_dir)
+                )
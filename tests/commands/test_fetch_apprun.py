@@ -0,0 +1,40 @@
+#  Copyright  2021 Alexis Lopez Zubieta
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a
+#  copy of this software and associated documentation files (the "Software"),
+#  to deal in the Software without restriction, including without limitation the
+#  rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+#  sell copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+import pathlib
+from unittest import TestCase
+from unittest.mock import patch
+
+from appimagebuilder.commands.fetch_apprun import FetchAppRunBinariesCommand
+from appimagebuilder.context import AppInfo, BundleInfo, Context
+from appimagebuilder.recipe.roamer import Roamer
+from appimagebuilder.utils.asset_cache import AssetCacheError
+
+
+class TestFetchAppRunBinariesCommand(TestCase):
+    @patch(
+        "appimagebuilder.commands.fetch_apprun.AppRunBinariesResolver.resolve_executable",
+        side_effect=AssetCacheError("offline"),
+    )
+    def test_download_errors_are_left_to_the_runtime_setup(self, _):
+        context = Context(
+            Roamer({"AppDir": {"runtime": {}}}),
+            pathlib.Path("AppImageBuilder.yml"),
+            AppInfo(),
+            BundleInfo(runtime_arch="x86_64"),
+            pathlib.Path("/tmp/AppDir"),
+            pathlib.Path("/tmp/appimage-build"),
+        )
+
+        with self.assertLogs(level="WARNING") as logs:
+            FetchAppRunBinariesCommand(context)()
+
+        self.assertIn("offline", logs.output[0])
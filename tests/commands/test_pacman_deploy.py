@@ -0,0 +1,71 @@
+#  Copyright  2021 Alexis Lopez Zubieta
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a
+#  copy of this software and associated documentation files (the "Software"),
+#  to deal in the Software without restriction, including without limitation the
+#  rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+#  sell copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+import pathlib
+import tempfile
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+from appimagebuilder.commands.pacman_deploy import PacmanDeployCommand
+from appimagebuilder.context import AppInfo, BundleInfo, Context
+from appimagebuilder.invoker import Invoker
+from appimagebuilder.recipe.roamer import Roamer
+from appimagebuilder.step_cache import StepCache
+
+
+class TestPacmanDeployCommand(TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.app_dir = pathlib.Path(self.temp_dir.name) / "AppDir"
+        self.build_dir = pathlib.Path(self.temp_dir.name) / "build"
+        self.app_dir.mkdir()
+
+        self.venv = MagicMock()
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+
+    @patch("appimagebuilder.commands.pacman_deploy.Deploy")
+    def _build(self, index_digest, deploy):
+        deploy.return_value.resolve.return_value = []
+        deploy.return_value.extract.return_value = []
+        self.venv.index_digest.return_value = index_digest
+
+        context = Context(
+            Roamer({"AppDir": {}}),
+            pathlib.Path("AppImageBuilder.yml"),
+            AppInfo(),
+            BundleInfo(),
+            self.app_dir,
+            self.build_dir,
+        )
+        command = PacmanDeployCommand(context, ["bash"], [], "x86_64", None, {})
+        with patch.object(command, "_create_venv", return_value=self.venv):
+            Invoker(cache=StepCache(self.build_dir / "cache", self.app_dir)).execute(
+                [command]
+            )
+
+        return deploy.return_value
+
+    def test_unchanged_sync_databases(self):
+        self._build("db-1")
+        deploy = self._build("db-1")
+
+        deploy.extract.assert_not_called()
+
+    def test_changed_sync_databases(self):
+        self._build("db-1")
+        deploy = self._build("db-2")
+
+        deploy.extract.assert_called_once()
+        # the databases updated for the fingerprint are reused by the resolution
+        self.assertEqual(self.venv.update.call_count, 2)
+        deploy.resolve.assert_called_once_with(["bash"], [], False)
@@ -0,0 +1,42 @@
+#  Copyright  2022 Alexis Lopez Zubieta
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a
+#  copy of this software and associated documentation files (the "Software"),
+#  to deal in the Software without restriction, including without limitation the
+#  rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+#  sell copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+import pathlib
+from unittest import TestCase
+from unittest.mock import patch
+
+from appimagebuilder.modules.deploy.files.dependencies_resolver.elf_resolver import (
+    ElfResolver,
+)
+from appimagebuilder.utils import shell
+
+
+class TestElfResolverLddLookup(TestCase):
+    @patch(
+        "appimagebuilder.utils.shell.require_executable",
+        side_effect=shell.CommandNotFoundError("ldd"),
+    )
+    def test_created_without_ldd(self, require_executable_mock):
+        resolver = ElfResolver()
+
+        self.assertEqual(resolver.resolve([]), [])
+        require_executable_mock.assert_not_called()
+
+    @patch("appimagebuilder.utils.shell.run")
+    @patch("appimagebuilder.utils.shell.require_executable", return_value="/bin/ldd")
+    def test_ldd_is_looked_up_once(self, require_executable_mock, run_mock):
+        run_mock.return_value.stdout = b"libc.so.6 => /lib/libc.so.6 (0x0)\n"
+        resolver = ElfResolver()
+
+        resolver.resolve([pathlib.Path("/bin/a"), pathlib.Path("/bin/b")])
+
+        require_executable_mock.assert_called_once_with("ldd")
+        self.assertEqual(run_mock.call_count, 2)
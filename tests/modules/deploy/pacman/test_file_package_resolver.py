@@ -10,7 +10,9 @@
 #  The above copyright notice and this permission notice shall be included in
 #  all copies or substantial portions of the Software.
 import pathlib
+import tempfile
 from unittest import TestCase
+from unittest.mock import patch
 
 from appimagebuilder.modules.generate.package_managers.pacman.file_package_resolver import (
     FilePackageResolver,
@@ -31,3 +33,21 @@ usr/bin/xtables-legacy-multi is owned by core/iptables 1:1.8.7-1
             pathlib.Path("usr/bin/xtables-legacy-multi"): "iptables",
         }
         self.assertEqual(result, expected)
+
+    @patch("appimagebuilder.utils.shell.require_executables", return_value={})
+    def test_find_files_databases_in_config_order(self, _):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = pathlib.Path(tmp)
+            (path / "repos.conf").write_text("[extra]\n[core]\n")
+            (path / "pacman.conf").write_text(
+                f"[options]\nInclude = {path}/repos.conf\n[community]\n"
+            )
+            for repository in ["community", "core", "extra", "unused"]:
+                (path / f"{repository}.files").touch()
+
+            resolver = FilePackageResolver(path, path / "pacman.conf")
+
+            self.assertEqual(
+                resolver._find_files_databases(),
+                [path / "extra.files", path / "core.files", path / "community.files"],
+            )
@@ -0,0 +1,76 @@
+#  Copyright  2021 Alexis Lopez Zubieta
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a
+#  copy of this software and associated documentation files (the "Software"),
+#  to deal in the Software without restriction, including without limitation the
+#  rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+#  sell copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+import os
+import pathlib
+import tempfile
+from unittest import TestCase
+
+from appimagebuilder.modules.generate.package_managers.pacman.files_index import (
+    FilesIndex,
+)
+from tests.modules.deploy.pacman.test_sync_db import _write_database
+
+
+class TestFilesIndex(TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = pathlib.Path(self.temp_dir.name)
+
+        _write_database(
+            self.path / "core.files",
+            {
+                "bash-5.1.016-1/files": "%FILES%\nusr/\nusr/bin/\nusr/bin/bash\n",
+                "glibc-2.35-2/files": "%FILES%\nusr/lib/libc.so.6\n",
+            },
+        )
+        _write_database(
+            self.path / "testing.files",
+            {"glibc-2.36-1/files": "%FILES%\nusr/lib/libc.so.6\nusr/lib/libm.so.6\n"},
+        )
+        self.databases = [self.path / "core.files", self.path / "testing.files"]
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+
+    def test_lookup(self):
+        index = FilesIndex(self.databases, self.path / "cache")
+        results = index.lookup(["/usr/bin/bash", "/usr/lib/libc.so.6", "/usr/bin"])
+
+        self.assertEqual(
+            results, {"/usr/bin/bash": "bash", "/usr/lib/libc.so.6": "glibc"}
+        )
+        self.assertTrue(index.path.exists())
+
+    def test_index_is_reused(self):
+        FilesIndex(self.databases, self.path / "cache").lookup([])
+        index = FilesIndex(self.databases, self.path / "cache")
+        self.assertEqual(
+            index.lookup(["/usr/lib/libm.so.6"]), {"/usr/lib/libm.so.6": "glibc"}
+        )
+        self.assertEqual(len(list((self.path / "cache").glob("*.sqlite"))), 1)
+        self.assertEqual(list((self.path / "cache").glob("*.part")), [])
+
+    def test_stale_index_is_removed(self):
+        stale_index = FilesIndex(self.databases, self.path / "cache")
+        stale_index.lookup([])
+        other_index = FilesIndex(self.databases[:1], self.path / "cache")
+        other_index.lookup([])
+
+        # an updated database is indexed again
+        os.utime(self.databases[1], ns=(0, 0))
+        index = FilesIndex(self.databases, self.path / "cache")
+        index.lookup([])
+
+        self.assertNotEqual(index.path, stale_index.path)
+        self.assertFalse(stale_index.path.exists())
+        self.assertTrue(other_index.path.exists())
+        self.assertTrue(index.path.exists())
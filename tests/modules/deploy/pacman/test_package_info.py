@@ -0,0 +1,102 @@
+#  Copyright  2021 Alexis Lopez Zubieta
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a
+#  copy of this software and associated documentation files (the "Software"),
+#  to deal in the Software without restriction, including without limitation the
+#  rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+#  sell copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+import io
+import pathlib
+import tarfile
+import tempfile
+from unittest import TestCase, skipIf
+from unittest.mock import patch
+
+from appimagebuilder.modules.deploy.pacman import package_info
+from appimagebuilder.modules.deploy.pacman.package_info import (
+    read_package_files,
+    read_package_info,
+)
+
+PKGINFO = b"""# Generated by makepkg 6.0.1
+pkgname = bash
+pkgbase = bash
+pkgver = 5.1.016-1
+pkgdesc = The GNU Bourne Again shell
+arch = x86_64
+depend = readline
+depend = libreadline.so=8-64
+depend = glibc
+"""
+
+
+def _make_package_tar():
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w") as tar:
+        for name, data in [(".PKGINFO", PKGINFO), ("usr/bin/bash", b"\x7fELF")]:
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+
+        info = tarfile.TarInfo("usr/lib")
+        info.type = tarfile.DIRTYPE
+        tar.addfile(info)
+    return buffer.getvalue()
+
+
+class TestPackageInfo(TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = pathlib.Path(self.temp_dir.name)
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+
+    def _check_package(self, path):
+        info = read_package_info(path)
+        self.assertEqual(info.name, "bash")
+        self.assertEqual(info.version, "5.1.016-1")
+        self.assertEqual(info.arch, "x86_64")
+        self.assertEqual(info.depends, ["readline", "libreadline.so=8-64", "glibc"])
+        self.assertEqual(read_package_files(path), ["usr/bin/bash"])
+
+    def test_read_xz_package(self):
+        import lzma
+
+        path = self.path / "bash-5.1.016-1-x86_64.pkg.tar.xz"
+        path.write_bytes(lzma.compress(_make_package_tar()))
+        self._check_package(path)
+
+    @skipIf(not package_info.zstandard, reason="requires zstandard")
+    def test_read_zst_package(self):
+        path = self.path / "bash-5.1.016-1-x86_64.pkg.tar.zst"
+        compressor = package_info.zstandard.ZstdCompressor()
+        path.write_bytes(compressor.compress(_make_package_tar()))
+        self._check_package(path)
+
+    def test_read_zst_package_without_zstandard(self):
+        path = self.path / "bash-5.1.016-1-x86_64.pkg.tar.zst"
+        path.write_bytes(package_info.ZSTD_MAGIC + bytes(16))
+
+        with patch.object(package_info, "zstandard", None):
+            self.assertFalse(package_info.can_read_package_info(path))
+            self.assertRaisesRegex(
+                package_info.PackageInfoError,
+                "zstandard is missing",
+                read_package_info,
+                path,
+            )
+
+    def test_read_xz_package_without_zstandard(self):
+        import lzma
+
+        path = self.path / "bash-5.1.016-1-x86_64.pkg.tar.xz"
+        path.write_bytes(lzma.compress(_make_package_tar()))
+
+        with patch.object(package_info, "zstandard", None):
+            self.assertTrue(package_info.can_read_package_info(path))
+            self._check_package(path)
@@ -0,0 +1,102 @@
+#  Copyright  2021 Alexis Lopez Zubieta
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a
+#  copy of this software and associated documentation files (the "Software"),
+#  to deal in the Software without restriction, including without limitation the
+#  rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+#  sell copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+import fcntl
+import hashlib
+import pathlib
+import tempfile
+from unittest import TestCase
+
+from appimagebuilder.modules.deploy.pacman.shared_packages import SharedPackages
+from appimagebuilder.modules.deploy.pacman.sync_db import SyncPackage
+
+
+class FakeSyncDatabase:
+    def __init__(self, packages: [SyncPackage]):
+        self.filenames = {package.filename: package for package in packages}
+
+
+class TestSharedPackages(TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = pathlib.Path(self.temp_dir.name)
+        self.shared_packages = SharedPackages(self.path / "pool")
+
+        self.data = b"package data"
+        self.sync_db = FakeSyncDatabase(
+            [
+                SyncPackage(
+                    "icons",
+                    "1.0-1",
+                    "icons-1.0-1-any.pkg.tar.zst",
+                    hashlib.sha256(self.data).hexdigest(),
+                ),
+                SyncPackage("bash", "5.1-1", "bash-5.1-1-x86_64.pkg.tar.zst", "00ff"),
+            ]
+        )
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+
+    def _write_package(self, arch, file_name, data=None):
+        path = self.path / arch / file_name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data or self.data)
+        return str(path)
+
+    def test_share_arch_independent_packages(self):
+        self.shared_packages.add(
+            [
+                self._write_package("x86_64", "icons-1.0-1-any.pkg.tar.zst"),
+                self._write_package("x86_64", "bash-5.1-1-x86_64.pkg.tar.zst"),
+            ],
+            self.sync_db,
+        )
+
+        icons_path = str(self.path / "aarch64" / "icons-1.0-1-any.pkg.tar.zst")
+        bash_path = str(self.path / "aarch64" / "bash-5.1-1-x86_64.pkg.tar.zst")
+        (self.path / "aarch64").mkdir()
+        missing = self.shared_packages.restore([icons_path, bash_path], self.sync_db)
+
+        self.assertEqual(missing, [bash_path])
+        self.assertEqual(pathlib.Path(icons_path).read_bytes(), self.data)
+
+    def test_unexpected_sha256_is_not_shared(self):
+        self.shared_packages.add(
+            [self._write_package("x86_64", "icons-1.0-1-any.pkg.tar.zst", b"other")],
+            self.sync_db,
+        )
+
+        path = str(self.path / "aarch64" / "icons-1.0-1-any.pkg.tar.zst")
+        self.assertEqual(self.shared_packages.restore([path], self.sync_db), [path])
+
+    def test_unknown_package_is_not_shared(self):
+        path = self._write_package("x86_64", "fonts-2.0-1-any.pkg.tar.zst")
+        self.shared_packages.add([path], self.sync_db)
+
+        self.assertEqual(list((self.path / "pool").iterdir()), [])
+
+    def test_lock_the_shared_packages(self):
+        icons_path = str(self.path / "aarch64" / "icons-1.0-1-any.pkg.tar.zst")
+        bash_path = str(self.path / "aarch64" / "bash-5.1-1-x86_64.pkg.tar.zst")
+        lock_path = self.path / "pool" / f"{hashlib.sha256(self.data).hexdigest()}.lock"
+
+        with self.shared_packages.lock([icons_path, bash_path], self.sync_db):
+            with open(lock_path) as lock_file:
+                self.assertRaises(
+                    BlockingIOError,
+                    fcntl.flock,
+                    lock_file,
+                    fcntl.LOCK_EX | fcntl.LOCK_NB,
+                )
+
+            # the packages that aren't shared are not locked
+            self.assertEqual(list((self.path / "pool").iterdir()), [lock_path])
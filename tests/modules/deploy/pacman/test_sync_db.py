@@ -0,0 +1,72 @@
+#  Copyright  2021 Alexis Lopez Zubieta
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a
+#  copy of this software and associated documentation files (the "Software"),
+#  to deal in the Software without restriction, including without limitation the
+#  rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+#  sell copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+import io
+import pathlib
+import tarfile
+import tempfile
+from unittest import TestCase
+
+from appimagebuilder.modules.deploy.pacman.sync_db import SyncDatabase
+
+
+def _write_database(path, entries: {str: str}):
+    with tarfile.open(path, mode="w:gz") as tar:
+        for name, data in entries.items():
+            data = data.encode()
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+
+
+def _desc(name, version, sha256="00ff"):
+    return (
+        f"%FILENAME%\n{name}-{version}-x86_64.pkg.tar.zst\n\n"
+        f"%NAME%\n{name}\n\n"
+        f"%VERSION%\n{version}\n\n"
+        f"%SHA256SUM%\n{sha256}\n\n"
+    )
+
+
+class TestSyncDatabase(TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = pathlib.Path(self.temp_dir.name)
+
+        _write_database(
+            self.path / "core.db",
+            {
+                "bash-5.1.016-1/desc": _desc("bash", "5.1.016-1"),
+                "glibc-2.35-2/desc": _desc("glibc", "2.35-2"),
+            },
+        )
+        _write_database(
+            self.path / "testing.db",
+            {"glibc-2.36-1/desc": _desc("glibc", "2.36-1")},
+        )
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+
+    def test_read_packages(self):
+        sync_db = SyncDatabase([self.path / "core.db", self.path / "testing.db"])
+
+        self.assertEqual(sync_db.packages["bash"].version, "5.1.016-1")
+        self.assertEqual(sync_db.packages["bash"].sha256, "00ff")
+        # the first repository has priority
+        self.assertEqual(sync_db.packages["glibc"].version, "2.35-2")
+        self.assertIn("glibc-2.36-1-x86_64.pkg.tar.zst", sync_db.filenames)
+
+    def test_parse_entry(self):
+        fields = SyncDatabase.parse_entry(
+            "%NAME%\nbash\n\n%DEPENDS%\nglibc\nreadline\n"
+        )
+        self.assertEqual(fields, {"NAME": ["bash"], "DEPENDS": ["glibc", "readline"]})
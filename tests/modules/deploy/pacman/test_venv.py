@@ -22,11 +22,20 @@
 #  The above copyright notice and this permission notice shall be included in
 #  all copies or substantial portions of the Software.
 
+import contextlib
+import os
 import shutil
+import socket
+import tempfile
 from pathlib import Path
 from unittest import TestCase, skipIf
+from unittest.mock import patch
 
-from appimagebuilder.modules.deploy.pacman.venv import Venv
+from appimagebuilder.modules.deploy.pacman.venv import (
+    DEPENDS_ON,
+    Venv,
+    read_config_repositories,
+)
 
 
 @skipIf(not shutil.which("pacman"), reason="requires pacman")
@@ -70,3 +79,187 @@ class TestVenv(TestCase):
             ["bash"], ["tzdata", "filesystem", "linux-api-headers"]
         )
         self.assertTrue(self.pacman_venv.read_package_data(files[0]))
+
+
+class TestVenvWithoutPacman(TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = Path(self.temp_dir.name)
+        # keep the shared caches out of the user cache dir
+        cache_patch = patch.dict(os.environ, {"XDG_CACHE_HOME": str(self.path)})
+        cache_patch.start()
+        self.addCleanup(cache_patch.stop)
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+
+    def _create_venv(self, repositories=None) -> Venv:
+        deps = {name: name for name in DEPENDS_ON}
+        with patch(
+            "appimagebuilder.utils.shell.require_executables", return_value=deps
+        ):
+            with patch.object(Venv, "_configure_keyring"):
+                return Venv(self.path / "venv", repositories)
+
+    def test_read_config_repositories(self):
+        (self.path / "mirrorlist").write_text("Server = https://mirror/$repo\n")
+        (self.path / "repos.conf").write_text(
+            f"[extra]\nInclude = {self.path}/mirrorlist\n[core]  # comment\n"
+        )
+        (self.path / "pacman.conf").write_text(
+            "[options]\n"
+            "Architecture = auto\n"
+            "[testing]\n"
+            f"Include = {self.path}/repos.conf\n"
+            "[core]\n"
+            "[community]\n"
+        )
+
+        self.assertEqual(
+            read_config_repositories(self.path / "pacman.conf"),
+            ["testing", "extra", "core", "community"],
+        )
+
+    def test_retrieve_downloads_only_the_missing_targets(self):
+        venv = self._create_venv({"core": ["https://mirror/$repo"]})
+        cached_path = str(venv._cache_dir / "glibc-2.33-1-x86_64.pkg.tar.zst")
+        Path(cached_path).write_bytes(b"glibc")
+        bash_path = str(venv._cache_dir / "bash-5.1-1-x86_64.pkg.tar.zst")
+        locations = [
+            ("core/glibc", f"file://{cached_path}"),
+            ("core/bash", "https://mirror/core/bash-5.1-1-x86_64.pkg.tar.zst"),
+        ]
+
+        def download(command, **kwargs):
+            Path(bash_path).write_bytes(b"bash")
+
+        with patch.object(
+            venv, "_run_pacman_list_package_locations", return_value=locations
+        ), patch.object(venv, "_run_command", side_effect=download) as run_mock:
+            files = venv.retrieve(["bash"])
+
+        self.assertEqual(files, [cached_path, bash_path])
+        command, kwargs = run_mock.call_args.args[0], run_mock.call_args.kwargs
+        # the dependencies were already resolved
+        self.assertIn("--nodeps --nodeps", command)
+        self.assertEqual(kwargs["targets"], "core/bash")
+
+
+class TestVenvKeyring(TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = Path(self.temp_dir.name)
+        cache_patch = patch.dict(os.environ, {"XDG_CACHE_HOME": str(self.path)})
+        cache_patch.start()
+        self.addCleanup(cache_patch.stop)
+
+        self.keyrings_path = self.path / "keyrings"
+        self.keyrings_path.mkdir()
+        (self.keyrings_path / "archlinux.gpg").write_bytes(b"keys")
+        (self.keyrings_path / "archlinux-trusted").write_text("trusted")
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+
+    def _create_venv(self, name="venv") -> Venv:
+        deps = {name: name for name in DEPENDS_ON}
+        with patch(
+            "appimagebuilder.utils.shell.require_executables", return_value=deps
+        ):
+            with patch.object(Venv, "_configure_keyring"):
+                venv = Venv(self.path / name)
+        venv.keyrings_path = self.keyrings_path
+        return venv
+
+    def _configure_keyring(self, venv: Venv, populate=None):
+        def run_command(command, **kwargs):
+            if "--populate" in command:
+                (venv._gpg_dir / "pubring.gpg").write_text(venv._gpg_dir.parent.name)
+                if populate:
+                    populate()
+
+        with patch.object(venv, "_gpg_agent", contextlib.nullcontext):
+            with patch.object(venv, "_run_command", side_effect=run_command) as run:
+                venv._configure_keyring()
+        return [call.args[0] for call in run.call_args_list]
+
+    def _cache_dir(self, venv: Venv) -> Path:
+        return self.path / "appimage-builder" / "pacman" / "gnupg" / venv._keyring_id()
+
+    def test_cache_miss_populates_and_publishes_the_keyring(self):
+        venv = self._create_venv()
+
+        commands = self._configure_keyring(venv)
+
+        self.assertEqual(len(commands), 2)
+        self.assertIn("--populate {keyrings}", commands[1])
+        self.assertEqual(venv._keyrings, ["archlinux"])
+        cache_dir = self._cache_dir(venv)
+        self.assertEqual((cache_dir / "pubring.gpg").read_text(), "venv")
+        self.assertEqual((cache_dir / ".keyring-id").read_text(), cache_dir.name)
+        self.assertEqual(
+            [path.name for path in cache_dir.parent.iterdir()], [cache_dir.name]
+        )
+
+    def test_cache_hit_copies_the_keyring(self):
+        self._configure_keyring(self._create_venv("first"))
+        venv = self._create_venv("second")
+
+        commands = self._configure_keyring(venv)
+
+        self.assertEqual(commands, [])
+        self.assertEqual((venv._gpg_dir / "pubring.gpg").read_text(), "first")
+
+    def test_up_to_date_keyring(self):
+        venv = self._create_venv()
+        self._configure_keyring(venv)
+        shutil.rmtree(self._cache_dir(venv))
+
+        self.assertEqual(self._configure_keyring(venv), [])
+        self.assertFalse(self._cache_dir(venv).exists())
+
+    def test_keyring_id_changes_with_the_keyring_files(self):
+        venv = self._create_venv()
+        venv._keyrings = ["archlinux"]
+        keyring_path = self.keyrings_path / "archlinux.gpg"
+
+        keyring_id = venv._keyring_id()
+        os.utime(keyring_path, ns=(0, 1000))
+        mtime_keyring_id = venv._keyring_id()
+        keyring_path.write_bytes(b"more keys")
+        os.utime(keyring_path, ns=(0, 1000))
+        size_keyring_id = venv._keyring_id()
+
+        self.assertEqual(len({keyring_id, mtime_keyring_id, size_keyring_id}), 3)
+
+    def test_keyring_cached_concurrently(self):
+        venv = self._create_venv("loser")
+        venv._keyrings = ["archlinux"]
+        cache_dir = self._cache_dir(venv)
+
+        def publish_winner_keyring():
+            # another build publishes the same keyring while this one populates it
+            cache_dir.mkdir(parents=True)
+            (cache_dir / "pubring.gpg").write_text("winner")
+
+        self._configure_keyring(venv, publish_winner_keyring)
+
+        self.assertEqual((cache_dir / "pubring.gpg").read_text(), "winner")
+        self.assertEqual(
+            [path.name for path in cache_dir.parent.iterdir()], [cache_dir.name]
+        )
+        self.assertEqual((venv._gpg_dir / "pubring.gpg").read_text(), "loser")
+
+    def test_copy_gpg_dir_skips_sockets(self):
+        source = self.path / "source"
+        source.mkdir()
+        (source / "pubring.gpg").write_text("keys")
+        agent_socket = socket.socket(socket.AF_UNIX)
+        self.addCleanup(agent_socket.close)
+        agent_socket.bind(str(source / "S.gpg-agent"))
+
+        Venv._copy_gpg_dir(source, self.path / "target")
+
+        self.assertEqual(
+            [path.name for path in (self.path / "target").iterdir()], ["pubring.gpg"]
+        )
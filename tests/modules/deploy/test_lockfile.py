@@ -0,0 +1,58 @@
+#  Copyright  2021 Alexis Lopez Zubieta
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a
+#  copy of this software and associated documentation files (the "Software"),
+#  to deal in the Software without restriction, including without limitation the
+#  rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+#  sell copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+import pathlib
+import tempfile
+from unittest import TestCase
+
+from appimagebuilder.modules.deploy.lockfile import Lockfile
+
+
+class TestLockfile(TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = pathlib.Path(self.temp_dir.name)
+        self.archive = self.path / "bash_5.1-2_amd64.deb"
+        self.archive.write_bytes(b"fake archive")
+        self.entries = [
+            {
+                "name": "bash",
+                "version": "5.1-2",
+                "arch": "amd64",
+                "sha256": Lockfile.hash_file(self.archive),
+            }
+        ]
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+
+    def test_read_written_lock(self):
+        lockfile = Lockfile(self.path / "lock.yml", {"include": ["bash"]})
+        lockfile.write(self.entries)
+
+        lockfile = Lockfile(self.path / "lock.yml", {"include": ["bash"]})
+        self.assertEqual(lockfile.read(), self.entries)
+
+    def test_read_outdated_lock(self):
+        Lockfile(self.path / "lock.yml", {"include": ["bash"]}).write(self.entries)
+
+        lockfile = Lockfile(self.path / "lock.yml", {"include": ["bash", "zsh"]})
+        self.assertIsNone(lockfile.read())
+
+    def test_verify(self):
+        lockfile = Lockfile(self.path / "lock.yml", {"include": ["bash"]})
+        self.assertTrue(lockfile.verify(self.entries, [self.archive]))
+
+        self.archive.write_bytes(b"modified archive")
+        self.assertFalse(lockfile.verify(self.entries, [self.archive]))
+
+        self.archive.unlink()
+        self.assertFalse(lockfile.verify(self.entries, [self.archive]))
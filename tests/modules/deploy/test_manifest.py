@@ -0,0 +1,99 @@
+#  Copyright  2021 Alexis Lopez Zubieta
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a
+#  copy of this software and associated documentation files (the "Software"),
+#  to deal in the Software without restriction, including without limitation the
+#  rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+#  sell copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+import json
+import pathlib
+import shutil
+import tempfile
+from unittest import TestCase
+
+from appimagebuilder.modules.deploy.manifest import DeployManifest
+
+
+class TestDeployManifest(TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.app_dir = pathlib.Path(self.temp_dir.name) / "AppDir"
+        self.manifest_path = pathlib.Path(self.temp_dir.name) / "manifest.json"
+
+        self._deploy("usr/bin/bash", "usr/share/doc/bash/README", "usr/lib/libc.so.6")
+        manifest = DeployManifest(self.manifest_path, self.app_dir)
+        manifest.add("bash=5.0", ["usr/bin/bash", "usr/share/doc/bash/README"])
+        manifest.add("libc6=2.31", ["usr/lib/libc.so.6"])
+        manifest.write()
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+
+    def _deploy(self, *files):
+        for file in files:
+            path = self.app_dir / file
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.touch()
+
+    def test_refresh_unchanged(self):
+        manifest = DeployManifest(self.manifest_path, self.app_dir)
+        self.assertEqual(manifest.refresh(["bash=5.0", "libc6=2.31"]), set())
+
+    def test_refresh_updated_package(self):
+        manifest = DeployManifest(self.manifest_path, self.app_dir)
+        outdated = manifest.refresh(["bash=5.1", "libc6=2.31"])
+
+        self.assertEqual(outdated, {"bash=5.1"})
+        self.assertFalse((self.app_dir / "usr/bin/bash").exists())
+        self.assertFalse((self.app_dir / "usr/share/doc").exists())
+        self.assertTrue((self.app_dir / "usr/lib/libc.so.6").exists())
+
+    def test_refresh_missing_files(self):
+        (self.app_dir / "usr/bin/bash").unlink()
+
+        manifest = DeployManifest(self.manifest_path, self.app_dir)
+        self.assertEqual(manifest.refresh(["bash=5.0", "libc6=2.31"]), {"bash=5.0"})
+
+    def test_refresh_modified_files(self):
+        (self.app_dir / "usr/bin/bash").write_text("#!/bin/sh")
+
+        manifest = DeployManifest(self.manifest_path, self.app_dir)
+        self.assertEqual(manifest.refresh(["bash=5.0", "libc6=2.31"]), {"bash=5.0"})
+
+    def test_refresh_excluded_files(self):
+        shutil.rmtree(self.app_dir / "usr/share/doc")
+
+        manifest = DeployManifest(self.manifest_path, self.app_dir, ["usr/share/doc"])
+        self.assertEqual(manifest.refresh(["bash=5.0", "libc6=2.31"]), set())
+
+    def test_refresh_excluded_files_back_in_the_bundle(self):
+        shutil.rmtree(self.app_dir / "usr/share/doc")
+
+        manifest = DeployManifest(self.manifest_path, self.app_dir, ["usr/bin/*"])
+        self.assertEqual(manifest.refresh(["bash=5.0", "libc6=2.31"]), {"bash=5.0"})
+
+    def test_refresh_files_moved_to_compat_runtime(self):
+        compat_path = self.app_dir / "runtime/compat/usr/lib/libc.so.6"
+        compat_path.parent.mkdir(parents=True)
+        (self.app_dir / "usr/lib/libc.so.6").rename(compat_path)
+
+        manifest = DeployManifest(self.manifest_path, self.app_dir)
+        self.assertEqual(manifest.refresh(["bash=5.0", "libc6=2.31"]), set())
+
+    def test_other_app_dir(self):
+        manifest = DeployManifest(self.manifest_path, self.app_dir.parent / "Other")
+        self.assertEqual(manifest.refresh(["bash=5.0"]), {"bash=5.0"})
+
+    def test_manifest_without_file_stats(self):
+        data = {
+            "app_dir": str(self.app_dir),
+            "packages": {"bash=5.0": ["usr/bin/bash", "usr/share/doc/bash/README"]},
+        }
+        self.manifest_path.write_text(json.dumps(data))
+
+        manifest = DeployManifest(self.manifest_path, self.app_dir)
+        self.assertEqual(manifest.refresh(["bash=5.0"]), {"bash=5.0"})
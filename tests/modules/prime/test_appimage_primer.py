@@ -0,0 +1,253 @@
+#  Copyright  2021 Alexis Lopez Zubieta
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a
+#  copy of this software and associated documentation files (the "Software"),
+#  to deal in the Software without restriction, including without limitation the
+#  rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+#  sell copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+import hashlib
+import pathlib
+import tempfile
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+from appimagebuilder.context import AppInfo, BundleInfo, Context
+from appimagebuilder.modules.prime import zsync
+from appimagebuilder.modules.prime.appimage_primer import AppImagePrimer
+from appimagebuilder.modules.prime.errors import PrimerError
+from appimagebuilder.recipe.roamer import Roamer
+
+
+class TestAppImagePrimer(TestCase):
+    def _create_primer(self, squashfs: dict = None, fast_squashfs=False):
+        app_image = {"arch": "x86_64"}
+        if squashfs is not None:
+            app_image["squashfs"] = squashfs
+        recipe = Roamer({"version": 1, "AppImage": app_image})
+        context = Context(
+            recipe,
+            pathlib.Path("AppImageBuilder.yml"),
+            AppInfo(name="app", version="1.0"),
+            BundleInfo(),
+            pathlib.Path("/tmp/AppDir"),
+            pathlib.Path("/tmp/appimage-build"),
+        )
+        return AppImagePrimer(context, fast_squashfs)
+
+    def test_default_squashfs_options(self):
+        primer = self._create_primer()
+
+        self.assertEqual(primer.squashfs_options[:2], ["-comp", "xz"])
+        self.assertEqual(primer.squashfs_options[2], "-processors")
+
+    def test_squashfs_options(self):
+        primer = self._create_primer(
+            {
+                "compression": "zstd",
+                "compression_level": 19,
+                "block_size": "1M",
+                "processors": 2,
+            }
+        )
+
+        self.assertEqual(
+            primer.squashfs_options,
+            [
+                "-comp",
+                "zstd",
+                "-Xcompression-level",
+                "19",
+                "-b",
+                "1M",
+                "-processors",
+                "2",
+            ],
+        )
+
+    def test_fast_squashfs_options(self):
+        primer = self._create_primer({"compression": "xz"}, fast_squashfs=True)
+
+        self.assertEqual(
+            primer.squashfs_options[:4],
+            ["-comp", "zstd", "-Xcompression-level", "1"],
+        )
+
+    def test_unsupported_compression_level(self):
+        self.assertRaises(
+            RuntimeError,
+            self._create_primer,
+            {"compression": "xz", "compression_level": 9},
+        )
+        self.assertRaises(
+            RuntimeError,
+            self._create_primer,
+            {"compression": "gzip", "compression_level": 12},
+        )
+
+    @patch("appimagebuilder.utils.shell.run")
+    @patch("appimagebuilder.utils.shell.require_executable", return_value="mksquashfs")
+    def test_make_squashfs_writes_after_the_carrier(self, _, run_mock):
+        primer = self._create_primer()
+
+        primer.make_squashfs(
+            pathlib.Path("/tmp/AppDir"), pathlib.Path("/tmp/app.AppImage"), 1024
+        )
+
+        command = run_mock.call_args.args[0]
+        self.assertEqual(
+            command[:3], ["mksquashfs", "/tmp/AppDir", "/tmp/app.AppImage"]
+        )
+        self.assertEqual(command[command.index("-offset") + 1], "1024")
+
+    @patch("appimagebuilder.utils.shell.run")
+    @patch("appimagebuilder.utils.shell.require_executable", return_value="mksquashfs")
+    def test_make_squashfs_with_layout(self, _, run_mock):
+        primer = self._create_primer({"delta_friendly": True})
+        layout = MagicMock()
+
+        primer.make_squashfs(
+            pathlib.Path("/tmp/AppDir"), pathlib.Path("/tmp/app.AppImage"), 0, layout
+        )
+
+        sort_file = pathlib.Path("/tmp/appimage-build/prime/squashfs.sort")
+        layout.write_sort_file.assert_called_once_with(sort_file)
+        command = run_mock.call_args.args[0]
+        self.assertEqual(command[command.index("-sort") + 1], str(sort_file))
+        self.assertIn("-no-fragments", command)
+
+    @patch("appimagebuilder.modules.prime.zsync.has_fast_md4", return_value=False)
+    @patch("appimagebuilder.utils.shell.run")
+    @patch("appimagebuilder.utils.shell.require_executable", return_value="zsyncmake")
+    def test_generate_zsync_file_with_zsyncmake(self, _, run_mock, __):
+        primer = self._create_primer()
+        primer.config = Roamer({"update-information": "guess"})
+        primer.appimage_path = pathlib.Path("/tmp/app.AppImage")
+
+        generator = primer._create_zsync_generator()
+        primer._generate_zsync_file(generator)
+
+        self.assertIsNone(generator)
+
+        self.assertEqual(
+            run_mock.call_args.args[0],
+            [
+                "zsyncmake",
+                "-u",
+                "app.AppImage",
+                "-o",
+                "/tmp/app.AppImage.zsync",
+                "/tmp/app.AppImage",
+            ],
+        )
+
+    @patch("appimagebuilder.modules.prime.zsync.has_fast_md4", return_value=True)
+    @patch("appimagebuilder.utils.shell.run")
+    def test_generate_zsync_file_in_process(self, run_mock, _):
+        primer = self._create_primer()
+        primer.config = Roamer({"update-information": "guess"})
+        with tempfile.TemporaryDirectory() as tmp:
+            primer.appimage_path = pathlib.Path(tmp) / "app.AppImage"
+            primer.appimage_path.write_bytes(bytes(5000))
+
+            primer._generate_zsync_file(primer._create_zsync_generator())
+
+            zsync_path = pathlib.Path(tmp) / "app.AppImage.zsync"
+            self.assertTrue(zsync_path.read_bytes().startswith(b"zsync: 0.6.2\n"))
+        run_mock.assert_not_called()
+
+    @patch("gnupg.GPG")
+    @patch("appimagebuilder.modules.prime.zsync.has_fast_md4", return_value=True)
+    def test_generate_zsync_file_of_signed_bundle(self, _, gpg_mock):
+        gpg_mock.return_value.sign.return_value.data = b"signature"
+        gpg_mock.return_value.export_keys.return_value = "key"
+        primer = self._create_primer()
+        primer.config = Roamer({"update-information": "guess", "sign-key": "KEY"})
+        sections = {".sha256_sig": (3000, 100), ".sig_key": (9990, 10)}
+        with tempfile.TemporaryDirectory() as tmp:
+            primer.appimage_path = pathlib.Path(tmp) / "app.AppImage"
+            primer.appimage_path.write_bytes(bytes(range(250)) * 40)
+
+            with patch.object(
+                primer, "_read_bundle", wraps=primer._read_bundle
+            ) as read_bundle_mock:
+                generator = primer._create_zsync_generator()
+                ranges = primer._sign_bundle_sha256_digest(sections, generator)
+                primer._generate_zsync_file(generator, ranges)
+
+            # the block checksums are computed while signing
+            self.assertEqual(read_bundle_mock.call_count, 2)
+            signed = primer.appimage_path.read_bytes()
+            self.assertEqual(signed[3000:3009], b"signature")
+            expected = zsync.ZsyncGenerator(len(signed))
+            expected.update(signed)
+            expected_path = pathlib.Path(tmp) / "expected.zsync"
+            expected.write(
+                expected_path,
+                "app.AppImage",
+                "app.AppImage",
+                primer.appimage_path.stat().st_mtime,
+            )
+            self.assertEqual(
+                (pathlib.Path(tmp) / "app.AppImage.zsync").read_bytes(),
+                expected_path.read_bytes(),
+            )
+
+    def test_generate_sha256_digest_zeroes_the_signature_sections(self):
+        primer = self._create_primer()
+        # make the sections span several reads
+        primer.READ_BUFFER_SIZE = 16
+        data = bytes(range(256)) * 4
+        with tempfile.TemporaryDirectory() as tmp:
+            primer.appimage_path = pathlib.Path(tmp) / "app.AppImage"
+            primer.appimage_path.write_bytes(data)
+
+            digest = primer._generate_sha256_digest([(10, 30), (500, 8)])
+
+        expected = bytearray(data)
+        expected[10:40] = bytes(30)
+        expected[500:508] = bytes(8)
+        self.assertEqual(digest, hashlib.sha256(expected).digest())
+
+    @patch("appimagebuilder.utils.elf.read_sections")
+    def test_read_carrier_sections_is_cached(self, read_sections_mock):
+        read_sections_mock.return_value = {
+            ".text": (64, 100),
+            ".upd_info": (200, 1024),
+            ".sha256_sig": (1224, 1024),
+            ".sig_key": (2248, 8192),
+        }
+        primer = self._create_primer()
+        with tempfile.TemporaryDirectory() as tmp:
+            primer.carrier_path = pathlib.Path(tmp) / "runtime-x86_64"
+            primer.carrier_path.write_bytes(b"runtime")
+
+            sections = primer._read_carrier_sections()
+            self.assertEqual(primer._read_carrier_sections(), sections)
+            self.assertEqual(read_sections_mock.call_count, 1)
+
+            # a new runtime invalidates the cache
+            primer.carrier_path.write_bytes(b"new runtime")
+            primer._read_carrier_sections()
+            self.assertEqual(read_sections_mock.call_count, 2)
+
+        self.assertEqual(
+            sections,
+            {
+                ".upd_info": (200, 1024),
+                ".sha256_sig": (1224, 1024),
+                ".sig_key": (2248, 8192),
+            },
+        )
+
+    @patch("appimagebuilder.utils.elf.read_sections", return_value={})
+    def test_read_carrier_sections_of_invalid_runtime(self, _):
+        primer = self._create_primer()
+        with tempfile.TemporaryDirectory() as tmp:
+            primer.carrier_path = pathlib.Path(tmp) / "runtime-x86_64"
+            primer.carrier_path.write_bytes(b"runtime")
+
+            self.assertRaises(PrimerError, primer._read_carrier_sections)
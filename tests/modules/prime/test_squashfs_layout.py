@@ -0,0 +1,132 @@
+#  Copyright  2021 Alexis Lopez Zubieta
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a
+#  copy of this software and associated documentation files (the "Software"),
+#  to deal in the Software without restriction, including without limitation the
+#  rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+#  sell copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+import json
+import os
+import pathlib
+import tempfile
+from unittest import TestCase
+
+from appimagebuilder.modules.deploy.manifest import DeployManifest
+from appimagebuilder.modules.deploy.pacman.deploy import Deploy
+from appimagebuilder.modules.prime.squashfs_layout import SquashfsLayout
+
+
+class FakePacmanVenv:
+    """Packages whose archive holds a single file named after the package"""
+
+    def read_packages_data(self, files):
+        return [tuple(pathlib.Path(file).name.split("-")[:2]) for file in files]
+
+    def extract(self, file, target):
+        name = pathlib.Path(file).name.split("-")[0]
+        path = pathlib.Path(target) / "usr" / "lib" / f"lib{name}.so"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b"data")
+
+    def list_package_files(self, file):
+        return [f"usr/lib/lib{pathlib.Path(file).name.split('-')[0]}.so"]
+
+
+class TestSquashfsLayout(TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.app_dir = pathlib.Path(self.tmp.name) / "AppDir"
+        self.build_dir = pathlib.Path(self.tmp.name) / "build"
+        for file in ["usr/lib/liba.so", "usr/lib/libb.so", "usr/bin/app"]:
+            self._write(file, b"data")
+
+        manifest = DeployManifest(
+            self.build_dir / "apt" / "manifest.json", self.app_dir
+        )
+        manifest.add("a_1.0", ["usr/lib/liba.so"])
+        manifest.add("b_1.0", ["usr/lib/libb.so"])
+        manifest.add("b_2.0", ["usr/lib/libb.so"])
+        manifest.write()
+
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def _write(self, file, data):
+        path = self.app_dir / file
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data)
+
+    def _layout(self, packages):
+        record = {"apt": {"sources": [], "packages": packages}}
+        return SquashfsLayout(self.app_dir, self.build_dir, record)
+
+    def _read_sort_file(self, layout):
+        sort_file = self.build_dir / "prime" / "squashfs.sort"
+        layout.write_sort_file(sort_file)
+        return sort_file.read_text().splitlines()
+
+    def test_write_sort_file_without_previous_build(self):
+        lines = self._read_sort_file(self._layout(["a_1.0", "b_1.0"]))
+
+        self.assertEqual(lines, ["usr/lib/liba.so 1", "usr/lib/libb.so 1"])
+
+    def test_write_sort_file_puts_unchanged_packages_first(self):
+        self._layout(["a_1.0", "b_1.0"]).report(100)
+
+        lines = self._read_sort_file(self._layout(["a_1.0", "b_2.0"]))
+
+        self.assertEqual(lines, ["usr/lib/liba.so 2", "usr/lib/libb.so 1"])
+
+    def test_write_sort_file_uses_the_compat_runtime_path(self):
+        os.makedirs(self.app_dir / "runtime" / "compat" / "usr" / "lib")
+        os.rename(
+            self.app_dir / "usr" / "lib" / "liba.so",
+            self.app_dir / "runtime" / "compat" / "usr" / "lib" / "liba.so",
+        )
+
+        lines = self._read_sort_file(self._layout(["a_1.0"]))
+
+        self.assertEqual(lines, ["runtime/compat/usr/lib/liba.so 1"])
+
+    def test_report_stores_the_state(self):
+        self._layout(["a_1.0"]).report(100)
+
+        with open(self.build_dir / "prime" / "layout.json") as f:
+            state = json.load(f)
+        self.assertEqual(state["packages"], ["a_1.0"])
+        self.assertEqual(
+            sorted(state["files"]),
+            ["usr/bin/app", "usr/lib/liba.so", "usr/lib/libb.so"],
+        )
+
+    def test_report_estimates_the_update_size(self):
+        self._layout(["a_1.0"]).report(3 * 2 ** 20)
+        self._write("usr/bin/app", b"new data")
+
+        with self.assertLogs("SquashfsLayout", level="INFO") as logs:
+            self._layout(["a_1.0"]).report(3 * 2 ** 20)
+
+        self.assertIn("1 of 3 files changed", logs.output[0])
+        # 8 of the 16 bytes changed
+        self.assertIn("estimated zsync update size: 1.5MiB", logs.output[0])
+
+    def test_write_sort_file_of_pacman_packages(self):
+        # the compat runtime links are made by the deploy
+        (self.app_dir / "runtime" / "compat" / "usr").mkdir(parents=True)
+        manifest = DeployManifest(
+            self.build_dir / "pacman" / "manifest.json", self.app_dir
+        )
+        deployed_packages = Deploy(FakePacmanVenv()).extract(
+            ["c-1.0-1-x86_64.pkg.tar.zst"], self.app_dir, manifest
+        )
+        record = {"pacman": {"packages": deployed_packages}}
+
+        lines = self._read_sort_file(
+            SquashfsLayout(self.app_dir, self.build_dir, record)
+        )
+
+        self.assertEqual(lines, ["usr/lib/libc.so 1"])
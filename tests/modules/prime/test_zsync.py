@@ -0,0 +1,187 @@
+#  Copyright  2021 Alexis Lopez Zubieta
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a
+#  copy of this software and associated documentation files (the "Software"),
+#  to deal in the Software without restriction, including without limitation the
+#  rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+#  sell copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+import hashlib
+import os
+import pathlib
+import random
+import shutil
+import subprocess
+import tempfile
+from unittest import TestCase, skipUnless
+
+from appimagebuilder.modules.prime.zsync import ZsyncGenerator, _md4
+
+DATA_DIR = pathlib.Path(__file__).parent / "data"
+
+
+def _fixture_data(length) -> bytes:
+    # not random.randbytes, its output may change between python versions
+    data = b"".join(
+        hashlib.sha256(idx.to_bytes(4, "big")).digest()
+        for idx in range(length // 32 + 1)
+    )
+    return data[:length]
+
+
+def _rsum(block):
+    # zsync's rcksum_calc_rsum_block
+    a = b = 0
+    for idx, byte in enumerate(block):
+        a = (a + byte) & 0xFFFF
+        b = (b + (len(block) - idx) * byte) & 0xFFFF
+    return a.to_bytes(2, "big") + b.to_bytes(2, "big")
+
+
+class TestZsyncGenerator(TestCase):
+    def setUp(self) -> None:
+        self.data = random.Random(0).randbytes(10000)
+
+    def _generate(self, chunk_size) -> bytes:
+        generator = ZsyncGenerator(len(self.data))
+        for start in range(0, len(self.data), chunk_size):
+            generator.update(self.data[start : start + chunk_size])
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = pathlib.Path(tmp) / "app.AppImage.zsync"
+            generator.write(path, "app.AppImage", "app.AppImage", 0)
+            return path.read_bytes()
+
+    def test_write(self):
+        output = self._generate(4096)
+
+        header, block_sums = output.split(b"\n\n", 1)
+        self.assertEqual(
+            header.decode().splitlines(),
+            [
+                "zsync: 0.6.2",
+                "Filename: app.AppImage",
+                "MTime: Thu, 01 Jan 1970 00:00:00 +0000",
+                "Blocksize: 2048",
+                "Length: 10000",
+                "Hash-Lengths: 2,2,3",
+                "URL: app.AppImage",
+                f"SHA-1: {hashlib.sha1(self.data).hexdigest()}",
+            ],
+        )
+
+        # 5 blocks, the last one padded with zeros
+        self.assertEqual(len(block_sums), 5 * (2 + 3))
+        last_block = self.data[4 * 2048 :] + bytes(5 * 2048 - len(self.data))
+        self.assertEqual(block_sums[20:22], _rsum(last_block)[2:])
+        self.assertEqual(block_sums[22:25], _md4(last_block)[:3])
+
+    def test_output_does_not_depend_on_chunk_size(self):
+        self.assertEqual(self._generate(1), self._generate(4096))
+        self.assertEqual(self._generate(1000), self._generate(4096))
+
+    def test_hash_lengths(self):
+        self.assertEqual(ZsyncGenerator(1000)._hash_lengths(), (1, 2, 4))
+        self.assertEqual(ZsyncGenerator(2 ** 30).block_size, 4096)
+        self.assertEqual(ZsyncGenerator(2 ** 30)._hash_lengths(), (2, 3, 5))
+
+    def test_output_matches_fixtures(self):
+        # regression fixtures written by ZsyncGenerator itself, not by zsyncmake.
+        # test_fixtures_match_the_reference_checksums checks their content and
+        # test_output_matches_zsyncmake the compatibility, where zsyncmake is installed
+        for length in (1000, 6144, 10000, 70000):
+            data = _fixture_data(length)
+            generator = ZsyncGenerator(length)
+            generator.update(data)
+            with tempfile.TemporaryDirectory() as tmp:
+                path = pathlib.Path(tmp) / "app.AppImage.zsync"
+                generator.write(path, "app.AppImage", "app.AppImage", 1600000000)
+
+                self.assertEqual(
+                    path.read_bytes(), (DATA_DIR / f"{length}.zsync").read_bytes()
+                )
+
+    def test_fixtures_match_the_reference_checksums(self):
+        for length in (1000, 6144, 10000, 70000):
+            data = _fixture_data(length)
+            header, block_sums = (DATA_DIR / f"{length}.zsync").read_bytes().split(
+                b"\n\n", 1
+            )
+            fields = dict(line.split(": ", 1) for line in header.decode().splitlines())
+            _, rsum_bytes, checksum_bytes = map(int, fields["Hash-Lengths"].split(","))
+            block_size = int(fields["Blocksize"])
+
+            padded = data + bytes(-len(data) % block_size)
+            expected = b""
+            for start in range(0, len(padded), block_size):
+                block = padded[start : start + block_size]
+                expected += _rsum(block)[4 - rsum_bytes :]
+                expected += _md4(block)[:checksum_bytes]
+            self.assertEqual(block_sums, expected)
+            self.assertEqual(fields["SHA-1"], hashlib.sha1(data).hexdigest())
+
+    def test_rehash_blocks(self):
+        data = _fixture_data(10000)
+        patched = bytearray(data)
+        patched[3000:3010] = b"signature!"
+        patched[9990:] = b"key" * 3 + b"!"
+
+        generator = ZsyncGenerator(len(data))
+        # the blocks are read before the file is patched
+        generator.update_blocks(data)
+        generator.update_sha1(patched)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = pathlib.Path(tmp) / "app.AppImage"
+            path.write_bytes(patched)
+            generator.rehash_blocks(path, [(3000, 10), (9990, 10)])
+            generator.write(path.with_name("actual.zsync"), "a", "a", 0)
+
+            expected = ZsyncGenerator(len(data))
+            expected.update(patched)
+            expected.write(path.with_name("expected.zsync"), "a", "a", 0)
+
+            self.assertEqual(
+                path.with_name("actual.zsync").read_bytes(),
+                path.with_name("expected.zsync").read_bytes(),
+            )
+
+    @skipUnless(shutil.which("zsyncmake"), "requires zsyncmake")
+    def test_output_matches_zsyncmake(self):
+        for length in (1000, 6144, 10000, 70000):
+            data = _fixture_data(length)
+            with tempfile.TemporaryDirectory() as tmp:
+                path = pathlib.Path(tmp) / "app.AppImage"
+                path.write_bytes(data)
+                os.utime(path, (1600000000, 1600000000))
+                subprocess.run(
+                    ["zsyncmake", "-u", "app.AppImage", "-o", "expected.zsync", path],
+                    cwd=tmp,
+                    check=True,
+                )
+
+                generator = ZsyncGenerator(length)
+                generator.update(data)
+                generator.write(
+                    path.with_name("actual.zsync"),
+                    "app.AppImage",
+                    "app.AppImage",
+                    path.stat().st_mtime,
+                )
+
+                self.assertEqual(
+                    path.with_name("actual.zsync").read_bytes(),
+                    path.with_name("expected.zsync").read_bytes(),
+                )
+
+
+class TestMd4(TestCase):
+    def test_md4(self):
+        # RFC 1320 test suite
+        self.assertEqual(_md4(b"").hex(), "31d6cfe0d16ae931b73c59d7e0c089c0")
+        self.assertEqual(_md4(b"abc").hex(), "a448017aaf21d8525fc10ae87aa6729d")
+        self.assertEqual(
+            _md4(b"1234567890" * 8).hex(), "e33b4ddc9c38f2199c3e7b164fcc0536"
+        )
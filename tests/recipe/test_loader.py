@@ -0,0 +1,65 @@
+#  Copyright  2021 Alexis Lopez Zubieta
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a
+#  copy of this software and associated documentation files (the "Software"),
+#  to deal in the Software without restriction, including without limitation the
+#  rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+#  sell copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+import os
+import pathlib
+import tempfile
+from unittest import TestCase, mock
+
+import yaml
+
+from appimagebuilder import recipe
+from appimagebuilder.recipe.errors import RecipeError
+
+
+class TestLoader(TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.recipe_path = pathlib.Path(self.temp_dir.name) / "AppImageBuilder.yml"
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+
+    def _load(self, content: str):
+        self.recipe_path.write_text(content)
+        return recipe.Loader().load(self.recipe_path)
+
+    @mock.patch.dict(os.environ, {"APP_VERSION": "1.0", "ARCH": "x86_64"})
+    def test_load_env_variables(self):
+        data = self._load(
+            "version: !ENV ${APP_VERSION}\n"
+            "name: !ENV 'app-${APP_VERSION}-${ARCH}'\n"
+            "exec: lib/${ARCH}/app\n"
+            "arch: '{{ARCH}}'\n"
+        )
+
+        self.assertEqual(
+            data,
+            {
+                "version": "1.0",
+                "name": "app-1.0-x86_64",
+                "exec": "lib/x86_64/app",
+                "arch": "{{ARCH}}",
+            },
+        )
+
+    @mock.patch.dict(os.environ, clear=True)
+    def test_load_missing_env_variable(self):
+        with self.assertRaises(RecipeError):
+            self._load("version: !ENV ${APP_VERSION}\n")
+
+    def test_global_yaml_loader_is_not_modified(self):
+        recipe.Loader()
+        recipe.Loader()
+
+        self.assertEqual(
+            yaml.safe_load("version: ${APP_VERSION}"), {"version": "${APP_VERSION}"}
+        )
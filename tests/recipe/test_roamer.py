@@ -0,0 +1,64 @@
+#  Copyright  2021 Alexis Lopez Zubieta
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a
+#  copy of this software and associated documentation files (the "Software"),
+#  to deal in the Software without restriction, including without limitation the
+#  rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+#  sell copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+import os
+from unittest import TestCase, mock
+
+from appimagebuilder.recipe import Roamer
+
+
+class TestRoamer(TestCase):
+    def setUp(self) -> None:
+        self.roamer = Roamer(
+            {
+                "AppDir": {
+                    "app_info": {"id": "org.example", "version": "{{ VERSION }}"},
+                    "files": {"include": ["/{{ARCH}}/lib", "/usr/{{ARCH}}-{{ARCH}}"]},
+                    "items": "value",
+                },
+            }
+        )
+
+    @mock.patch.dict(os.environ, {"VERSION": "1.0", "ARCH": "x86_64"})
+    def test_resolve_variables(self):
+        self.assertEqual(self.roamer.AppDir.app_info.version(), "1.0")
+        self.assertEqual(
+            self.roamer.AppDir.files(),
+            {"include": ["/x86_64/lib", "/usr/x86_64-x86_64"]},
+        )
+        self.assertEqual(
+            self.roamer.AppDir.app_info.version(resolve_variables=False),
+            "{{ VERSION }}",
+        )
+
+    def test_resolve_variables_on_access(self):
+        version = self.roamer.AppDir.app_info.version
+        with mock.patch.dict(os.environ, {"VERSION": "1.0"}):
+            self.assertEqual(version(), "1.0")
+        with mock.patch.dict(os.environ, {"VERSION": "2.0"}):
+            self.assertEqual(version(), "2.0")
+
+    @mock.patch.dict(os.environ, clear=True)
+    def test_missing_variable(self):
+        with self.assertRaises(RuntimeError) as context:
+            self.roamer.AppDir.app_info()
+
+        self.assertIn("'VERSION'", str(context.exception))
+        self.assertIn(".AppDir.app_info", str(context.exception))
+
+    def test_missing_keys(self):
+        self.assertFalse(self.roamer.AppDir.missing.key())
+        self.assertIsInstance(self.roamer.AppDir.missing, Roamer)
+
+    def test_dict_attributes(self):
+        # like roam, the dict methods are preferred over the keys
+        self.assertEqual(list(self.roamer.AppDir.items())[0][0], "app_info")
+        self.assertEqual(self.roamer.AppDir["items"](), "value")
@@ -101,6 +101,20 @@ class TestRecipeSchema(TestCase):
         }
         self.schema.v1_apt.validate(recipe)
 
+    def test_validate_appimage(self):
+        recipe = {
+            "arch": "x86_64",
+            "update-information": "guess",
+            "squashfs": {
+                "compression": "zstd",
+                "compression_level": 19,
+                "block_size": "1M",
+                "processors": 4,
+                "delta_friendly": True,
+            },
+        }
+        self.schema.v1_appimage.validate(recipe)
+
     def test_validate_examples(self):
         os.environ["APP_VERSION"] = "latest"
         os.environ["TARGET_ARCH"] = "auto"
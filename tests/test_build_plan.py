@@ -0,0 +1,77 @@
+#  Copyright  2021 Alexis Lopez Zubieta
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a
+#  copy of this software and associated documentation files (the "Software"),
+#  to deal in the Software without restriction, including without limitation the
+#  rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+#  sell copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+import pathlib
+import tempfile
+from unittest import TestCase
+
+from appimagebuilder.build_plan import BuildPlan
+from appimagebuilder.commands.command import Command
+from appimagebuilder.invoker import Invoker
+from appimagebuilder.step_cache import StepCache
+from tests.test_step_cache import FakeStep
+
+
+class FakeDownload(Command):
+    def __init__(self):
+        super().__init__(None, "download")
+
+    def inputs(self) -> {str}:
+        return set()
+
+    def outputs(self) -> {str}:
+        return {"build_dir/download"}
+
+    def estimate(self) -> str:
+        return "3 files"
+
+
+class TestBuildPlan(TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.cache_dir = pathlib.Path(self.temp_dir.name) / "cache"
+        self.app_dir = pathlib.Path(self.temp_dir.name) / "AppDir"
+        self.app_dir.mkdir()
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+
+    def _steps(self, *fingerprints):
+        return [
+            FakeStep(f"step-{idx}", self.app_dir, fingerprint)
+            for idx, fingerprint in enumerate(fingerprints)
+        ]
+
+    def test_format(self):
+        Invoker(cache=StepCache(self.cache_dir, self.app_dir)).execute(
+            self._steps("a", "b")
+        )
+        commands = self._steps("a", "b") + [FakeDownload()] + self._steps(None)
+        cache = StepCache(self.cache_dir, self.app_dir)
+
+        lines = BuildPlan(commands, cache).format().splitlines()
+
+        self.assertEqual(
+            lines,
+            [
+                "Build plan, 2 of 4 steps are up to date:",
+                "  1. step-0 [cached]",
+                "  2. step-1 [cached] after 1",
+                "  3. download [run, not cacheable] after 2",
+                "     3 files",
+                "  4. step-0 [run, not cacheable] after 3",
+            ],
+        )
+
+    def test_format_without_cache(self):
+        plan = BuildPlan(self._steps("a"))
+
+        self.assertEqual(plan.format().splitlines()[1], "  1. step-0 [run]")
@@ -0,0 +1,88 @@
+#  Copyright  2021 Alexis Lopez Zubieta
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a
+#  copy of this software and associated documentation files (the "Software"),
+#  to deal in the Software without restriction, including without limitation the
+#  rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+#  sell copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+import json
+import pathlib
+import subprocess
+import sys
+import tempfile
+from unittest import TestCase
+
+from appimagebuilder.build_profile import BuildProfile
+from appimagebuilder.invoker import Invoker
+from appimagebuilder.utils import shell
+from tests.test_invoker import FakeCommand
+
+
+class TestBuildProfile(TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = pathlib.Path(self.temp_dir.name)
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+
+    def _spawn(self):
+        shell.run([sys.executable, "-c", "pass"], check=True)
+        # processes not started through utils.shell are only counted
+        subprocess.run([sys.executable, "-c", "pass"], check=True)
+
+    def test_measure_commands(self):
+        profile = BuildProfile()
+        Invoker(profile=profile).execute(
+            [FakeCommand("spawn", action=self._spawn), FakeCommand("idle")]
+        )
+
+        spawn, idle = profile.commands
+        self.assertEqual(spawn.subprocesses, 2)
+        self.assertEqual(len(spawn.spawns), 1)
+        self.assertGreater(spawn.subprocesses_time, 0)
+        self.assertGreater(spawn.wall_time, 0)
+        self.assertGreater(spawn.children_cpu_time, 0)
+        self.assertGreater(spawn.peak_rss, 0)
+        self.assertEqual(idle.subprocesses, 0)
+        self.assertLessEqual(spawn.start, idle.start)
+
+    def test_write_reports(self):
+        profile = BuildProfile()
+        Invoker(profile=profile).execute([FakeCommand("spawn", action=self._spawn)])
+
+        profile.write_json(self.path / "profile.json")
+        profile.write_chrome_trace(self.path / "profile.trace.json")
+
+        data = json.loads((self.path / "profile.json").read_text())
+        self.assertEqual(data["commands"][0]["description"], "spawn")
+
+        trace = json.loads((self.path / "profile.trace.json").read_text())
+        event = trace["traceEvents"][0]
+        self.assertEqual((event["name"], event["ph"]), ("spawn", "X"))
+
+    def test_overlapped_commands(self):
+        profile = BuildProfile()
+        with profile.measure(FakeCommand("first")):
+            with profile.measure(FakeCommand("second")):
+                self._spawn()
+        with profile.measure(FakeCommand("alone")):
+            pass
+
+        second, first, alone = profile.commands
+        for command in (first, second):
+            self.assertTrue(command.overlapped)
+            self.assertIsNone(command.peak_rss)
+            self.assertIsNone(command.read_bytes)
+            self.assertIsNone(command.cpu_time)
+        self.assertEqual(second.subprocesses, 2)
+        self.assertFalse(alone.overlapped)
+        self.assertGreater(alone.peak_rss, 0)
+
+        with self.assertLogs("BuildProfile") as logs:
+            profile.log_summary()
+        self.assertIn("ran alongside other steps", logs.output[0])
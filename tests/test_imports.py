@@ -0,0 +1,67 @@
+#  Copyright  2021 Alexis Lopez Zubieta
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a
+#  copy of this software and associated documentation files (the "Software"),
+#  to deal in the Software without restriction, including without limitation the
+#  rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+#  sell copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+import json
+import subprocess
+import sys
+from unittest import TestCase
+
+HEAVY_MODULES = [
+    "docker",
+    "gnupg",
+    "lief",
+    "numpy",
+    "pydpkg",
+    "ruamel.yaml",
+    "urllib3",
+]
+
+# microseconds, about 10 times the usual import time so machine load doesn't matter
+IMPORT_TIME_BUDGET = 700000
+
+
+class TestImports(TestCase):
+    @staticmethod
+    def _run_python(code: str, *options: str) -> subprocess.CompletedProcess:
+        return subprocess.run(
+            [sys.executable, *options, "-c", code],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            check=True,
+        )
+
+    def test_heavy_modules_are_not_imported_on_startup(self):
+        code = (
+            "import json, sys\n"
+            "import appimagebuilder.__main__, appimagebuilder.orchestrator\n"
+            f"heavy_modules = {HEAVY_MODULES!r}\n"
+            "print(json.dumps([name for name in heavy_modules if name in sys.modules]))"
+        )
+
+        result = self._run_python(code)
+
+        self.assertEqual(json.loads(result.stdout), [])
+
+    def test_import_time_budget(self):
+        cumulative_times = []
+        # the best of several runs, a single one may be slowed down by the machine load
+        for _ in range(3):
+            result = self._run_python(
+                "import appimagebuilder.__main__", "-X", "importtime"
+            )
+            # import time: self [us] | cumulative | imported package
+            for line in result.stderr.decode().splitlines():
+                fields = line.split("|")
+                if len(fields) == 3 and fields[2].strip() == "appimagebuilder.__main__":
+                    cumulative_times.append(int(fields[1]))
+
+        self.assertEqual(len(cumulative_times), 3)
+        self.assertLess(min(cumulative_times), IMPORT_TIME_BUDGET)
@@ -0,0 +1,94 @@
+#  Copyright  2021 Alexis Lopez Zubieta
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a
+#  copy of this software and associated documentation files (the "Software"),
+#  to deal in the Software without restriction, including without limitation the
+#  rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+#  sell copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+import threading
+from unittest import TestCase
+
+from appimagebuilder.commands.command import Command
+from appimagebuilder.invoker import Invoker
+
+
+class FakeCommand(Command):
+    def __init__(self, name, inputs=None, outputs=None, action=None):
+        super().__init__(None, name)
+        self._inputs = {Command.ALL_RESOURCES} if inputs is None else inputs
+        self._outputs = {Command.ALL_RESOURCES} if outputs is None else outputs
+        self._action = action
+
+    def inputs(self) -> {str}:
+        return self._inputs
+
+    def outputs(self) -> {str}:
+        return self._outputs
+
+    def __call__(self, *args, **kwargs):
+        if self._action:
+            self._action()
+
+
+class TestInvoker(TestCase):
+    def test_build_dependencies(self):
+        commands = [
+            FakeCommand("script"),
+            FakeCommand("apt download", set(), {"build_dir/apt"}),
+            FakeCommand("pacman download", set(), {"build_dir/pacman"}),
+            FakeCommand("apt extract", {"build_dir/apt"}, {"app_dir"}),
+            FakeCommand("pacman extract", {"build_dir/pacman"}, {"app_dir"}),
+            FakeCommand("setup"),
+        ]
+
+        dependencies = Invoker.build_dependencies(commands)
+        self.assertEqual(
+            dependencies, [set(), {0}, {0}, {0, 1}, {0, 2, 3}, {0, 1, 2, 3, 4}]
+        )
+
+    def test_independent_commands_run_concurrently(self):
+        first_started = threading.Event()
+        second_started = threading.Event()
+
+        def first():
+            first_started.set()
+            self.assertTrue(second_started.wait(5))
+
+        def second():
+            second_started.set()
+            self.assertTrue(first_started.wait(5))
+
+        Invoker().execute(
+            [
+                FakeCommand("first", set(), {"a"}, first),
+                FakeCommand("second", set(), {"b"}, second),
+            ]
+        )
+
+    def test_conflicting_commands_keep_order(self):
+        executed = []
+        commands = [
+            FakeCommand(str(i), set(), {"app_dir"}, lambda i=i: executed.append(i))
+            for i in range(10)
+        ]
+
+        Invoker().execute(commands)
+        self.assertEqual(executed, list(range(10)))
+
+    def test_failure_stops_dependent_commands(self):
+        executed = []
+
+        def fail():
+            raise RuntimeError("failed")
+
+        commands = [
+            FakeCommand("fail", set(), {"app_dir"}, fail),
+            FakeCommand("next", set(), {"app_dir"}, lambda: executed.append(1)),
+        ]
+
+        self.assertRaises(RuntimeError, Invoker().execute, commands)
+        self.assertEqual(executed, [])
@@ -0,0 +1,134 @@
+#  Copyright  2021 Alexis Lopez Zubieta
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a
+#  copy of this software and associated documentation files (the "Software"),
+#  to deal in the Software without restriction, including without limitation the
+#  rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+#  sell copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+import os
+import pathlib
+import sys
+import tempfile
+from unittest import TestCase
+
+from appimagebuilder.cli.argparse import ArgumentsParser
+from appimagebuilder.commands.create_appimage import CreateAppImageCommand
+from appimagebuilder.commands.run_script import RunScriptCommand
+from appimagebuilder.multi_arch_build import MultiArchBuild
+
+RECIPE = """
+version: 1
+script:
+  - echo $TARGET_ARCH
+AppDir:
+  app_info:
+    id: org.example.app
+    name: app
+    icon: app
+    version: "1.0"
+    exec: usr/bin/app
+AppImage:
+  arch: !ENV ${TARGET_ARCH}
+  file_name: %s
+"""
+
+
+class TestMultiArchBuild(TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = pathlib.Path(self.temp_dir.name)
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+
+    def _parse_args(self, file_name):
+        recipe_path = self.path / "AppImageBuilder.yml"
+        recipe_path.write_text(RECIPE % file_name)
+        parser = ArgumentsParser()
+        return parser.parser.parse_args(
+            [
+                "--recipe",
+                str(recipe_path),
+                "--appdir",
+                str(self.path / "AppDir"),
+                "--build-dir",
+                str(self.path / "build"),
+                "--arch",
+                "x86_64",
+                "--arch",
+                "aarch64",
+            ]
+        )
+
+    def test_prepare(self):
+        args = self._parse_args("!ENV 'app-${TARGET_ARCH}.AppImage'")
+        target_arch = os.getenv("TARGET_ARCH")
+
+        builds = MultiArchBuild(args).prepare()
+
+        self.assertEqual([build.arch for build in builds], ["x86_64", "aarch64"])
+        for build in builds:
+            self.assertEqual(build.args.appdir, f"{self.path / 'AppDir'}-{build.arch}")
+            self.assertEqual(
+                build.args.build_dir, str(self.path / "build" / build.arch)
+            )
+
+            self.assertIsInstance(build.commands[0], RunScriptCommand)
+
+            appimage = build.commands[-1]
+            self.assertIsInstance(appimage, CreateAppImageCommand)
+            self.assertEqual(appimage.primer.bundle_main_arch, build.arch)
+            self.assertEqual(
+                appimage.primer.appimage_path.name, f"app-{build.arch}.AppImage"
+            )
+
+        # the environment is restored once the recipes are loaded
+        self.assertEqual(os.getenv("TARGET_ARCH"), target_arch)
+
+    def test_arch_argv(self):
+        args = self._parse_args("!ENV 'app-${TARGET_ARCH}.AppImage'")
+        args.skip_tests = True
+        args.max_processes = 4
+        multi_arch_build = MultiArchBuild(args)
+        build = multi_arch_build.prepare()[1]
+
+        argv = multi_arch_build._arch_argv(build, 2)
+
+        self.assertEqual(argv[1:3], ["-m", "appimagebuilder"])
+        self.assertEqual(argv[argv.index("--appdir") + 1], build.args.appdir)
+        self.assertEqual(argv[argv.index("--build-dir") + 1], build.args.build_dir)
+        self.assertIn("--skip-tests", argv)
+        self.assertNotIn("--skip-script", argv)
+        self.assertEqual(argv[argv.index("--max-processes") + 1], "2")
+
+    def test_execute_in_separate_processes(self):
+        args = self._parse_args("!ENV 'app-${TARGET_ARCH}.AppImage'")
+        multi_arch_build = MultiArchBuild(args)
+        builds = multi_arch_build.prepare()
+        output_path = self.path / "output"
+
+        # each build sees its own TARGET_ARCH, the aarch64 one fails
+        multi_arch_build._arch_argv = lambda build, count: [
+            sys.executable,
+            "-c",
+            "import os, sys\n"
+            f"open('{output_path}-' + os.environ['TARGET_ARCH'], 'w').close()\n"
+            "sys.exit(os.environ['TARGET_ARCH'] == 'aarch64')",
+        ]
+
+        self.assertRaisesRegex(
+            RuntimeError, "Failed to build: aarch64$", multi_arch_build.execute, builds
+        )
+        self.assertTrue(pathlib.Path(f"{output_path}-x86_64").exists())
+        self.assertTrue(pathlib.Path(f"{output_path}-aarch64").exists())
+
+    def test_prepare_with_same_appimage_file_name(self):
+        args = self._parse_args("app.AppImage")
+
+        self.assertRaisesRegex(
+            RuntimeError, "same AppImage", MultiArchBuild(args).prepare
+        )
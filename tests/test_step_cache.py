@@ -0,0 +1,164 @@
+#  Copyright  2021 Alexis Lopez Zubieta
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a
+#  copy of this software and associated documentation files (the "Software"),
+#  to deal in the Software without restriction, including without limitation the
+#  rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+#  sell copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+import os
+import pathlib
+import tempfile
+from unittest import TestCase, mock
+
+from appimagebuilder.commands.command import Command
+from appimagebuilder.commands.run_script import RunScriptCommand
+from appimagebuilder.context import Context
+from appimagebuilder.invoker import Invoker
+from appimagebuilder.recipe.roamer import Roamer
+from appimagebuilder.step_cache import StepCache
+
+
+class FakeStep(Command):
+    def __init__(self, name, app_dir, fingerprint="", state=None):
+        super().__init__(None, name)
+        self.app_dir = app_dir
+        self._fingerprint = fingerprint
+        self.state = state
+        self.executions = 0
+        self.restored_state = None
+
+    def id(self):
+        return self.description
+
+    def outputs(self) -> {str}:
+        return {"app_dir"}
+
+    def fingerprint(self) -> str:
+        return self._fingerprint
+
+    def cached_state(self):
+        return self.state
+
+    def restore_state(self, state):
+        self.restored_state = state
+
+    def __call__(self, *args, **kwargs):
+        self.executions += 1
+        # like the AppImage creation, the last step doesn't modify the AppDir
+        if self.description != "last":
+            (self.app_dir / self.description).write_text(self._fingerprint or "")
+
+
+class TestStepCache(TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.cache_dir = pathlib.Path(self.temp_dir.name) / "cache"
+        self.app_dir = pathlib.Path(self.temp_dir.name) / "AppDir"
+        self.app_dir.mkdir()
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+
+    def _build(self, *fingerprints):
+        steps = [
+            FakeStep(f"step-{idx}", self.app_dir, fingerprint, {"idx": idx})
+            for idx, fingerprint in enumerate(fingerprints[:-1])
+        ]
+        steps.append(FakeStep("last", self.app_dir, fingerprints[-1]))
+        Invoker(cache=StepCache(self.cache_dir, self.app_dir)).execute(steps)
+        return [step.executions for step in steps], steps
+
+    def test_skip_up_to_date_steps(self):
+        self._build("a", "b", None)
+        executions, steps = self._build("a", "b", None)
+
+        self.assertEqual(executions, [0, 0, 1])
+        self.assertEqual(steps[1].restored_state, {"idx": 1})
+
+    def test_changed_step_invalidates_the_following(self):
+        self._build("a", "b", "c")
+        executions, _ = self._build("a", "B", "c")
+
+        # step-1 modified the AppDir after step-0 ran, its state is lost
+        self.assertEqual(executions, [1, 1, 1])
+
+    def test_last_step_changed(self):
+        self._build("a", "b", "c")
+        executions, _ = self._build("a", "b", "C")
+
+        self.assertEqual(executions, [0, 0, 1])
+
+    def test_modified_app_dir(self):
+        self._build("a", "b", "c")
+        (self.app_dir / "extra-file").touch()
+
+        executions, _ = self._build("a", "b", "c")
+        self.assertEqual(executions, [1, 1, 1])
+
+    def test_predict_does_not_restore_the_state(self):
+        self._build("a", "b", None)
+        _, steps = self._build("a", "b", None)
+        steps = [
+            FakeStep(step.description, self.app_dir, step._fingerprint)
+            for step in steps
+        ]
+
+        skipped = StepCache(self.cache_dir, self.app_dir).predict(steps)
+
+        self.assertEqual(skipped, 2)
+        self.assertIsNone(steps[1].restored_state)
+
+    @mock.patch.dict(os.environ)
+    def test_script_using_variables_exported_by_a_previous_script(self):
+        os.environ.pop("APP_VERSION", None)
+        build_dir = pathlib.Path(self.temp_dir.name) / "build"
+        recipe = Roamer(
+            {
+                "before": ["echo APP_VERSION=1.0 >> $BUILDER_ENV"],
+                "after": ["echo {{APP_VERSION}} > $TARGET_APPDIR/version"],
+            }
+        )
+        context = Context(
+            recipe,
+            pathlib.Path(self.temp_dir.name) / "AppImageBuilder.yml",
+            None,
+            None,
+            self.app_dir,
+            build_dir,
+        )
+        steps = [
+            RunScriptCommand(context, recipe.before, "before"),
+            RunScriptCommand(context, recipe.after, "after"),
+        ]
+
+        Invoker(cache=StepCache(self.cache_dir, self.app_dir)).execute(steps)
+
+        self.assertEqual((self.app_dir / "version").read_text(), "1.0\n")
+
+    def test_script_fingerprint_skips_the_build_and_vcs_dirs(self):
+        source_dir = pathlib.Path(self.temp_dir.name)
+        (source_dir / "main.c").write_text("int main() {}")
+        (source_dir / ".git").mkdir()
+        context = Context(
+            None,
+            source_dir / "AppImageBuilder.yml",
+            None,
+            None,
+            self.app_dir,
+            source_dir / "appimage-build",
+        )
+        command = RunScriptCommand(context, "make", "script")
+        fingerprint = command.fingerprint()
+
+        (source_dir / ".git" / "index").write_text("changed")
+        (source_dir / "appimage-build").mkdir()
+        (source_dir / "app-1.0-x86_64.AppImage").write_text("bundle")
+        (self.app_dir / "app").write_text("app")
+        self.assertEqual(command.fingerprint(), fingerprint)
+
+        (source_dir / "main.c").write_text("int main() { return 1; }")
+        self.assertNotEqual(command.fingerprint(), fingerprint)
@@ -0,0 +1,210 @@
+#  Copyright  2021 Alexis Lopez Zubieta
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a
+#  copy of this software and associated documentation files (the "Software"),
+#  to deal in the Software without restriction, including without limitation the
+#  rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+#  sell copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+import hashlib
+import io
+import pathlib
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from unittest import TestCase
+from unittest.mock import patch
+from urllib import error, request
+
+from appimagebuilder.utils.asset_cache import AssetCache, AssetCacheError
+
+
+def _response(data: bytes, status=200, headers=None):
+    response = io.BytesIO(data)
+    response.status = status
+    response.headers = headers or {}
+    return response
+
+
+class TestAssetCache(TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.tmp_dir = pathlib.Path(self.tmp.name)
+        self.source = self.tmp_dir / "runtime-x86_64"
+        self.source.write_bytes(b"runtime" * 1000)
+        self.url = self.source.as_uri()
+        self.cache = AssetCache(self.tmp_dir / "cache")
+
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def test_fetch(self):
+        target = self.cache.fetch(self.url, self.tmp_dir / "build" / "runtime")
+
+        self.assertEqual(target.read_bytes(), self.source.read_bytes())
+        digest = hashlib.sha256(self.source.read_bytes()).hexdigest()
+        self.assertTrue((self.tmp_dir / "cache" / "blobs" / digest).exists())
+
+    def test_fetch_cached(self):
+        self.cache.fetch(self.url, self.tmp_dir / "first")
+        expected = self.source.read_bytes()
+        self.source.unlink()
+
+        target = self.cache.fetch(self.url, self.tmp_dir / "second")
+
+        self.assertEqual(target.read_bytes(), expected)
+
+    def test_fetch_with_checksum_mismatch(self):
+        self.assertRaises(
+            AssetCacheError,
+            self.cache.fetch,
+            self.url,
+            self.tmp_dir / "runtime",
+            "0" * 64,
+        )
+        self.assertFalse((self.tmp_dir / "runtime").exists())
+
+    def test_fetch_updated_asset(self):
+        self.cache.fetch(self.url, self.tmp_dir / "runtime")
+        self.source.write_bytes(b"new runtime")
+        digest = hashlib.sha256(b"new runtime").hexdigest()
+
+        target = self.cache.fetch(self.url, self.tmp_dir / "runtime", digest)
+
+        self.assertEqual(target.read_bytes(), b"new runtime")
+
+    def test_fetch_from_mirror(self):
+        mirror_dir = self.tmp_dir / "mirror"
+        mirror_dir.mkdir()
+        (mirror_dir / "runtime-x86_64").write_bytes(b"mirrored runtime")
+        cache = AssetCache(self.tmp_dir / "cache", mirror_dir)
+
+        target = cache.fetch(
+            "https://example.invalid/runtime-x86_64", self.tmp_dir / "a"
+        )
+
+        self.assertEqual(target.read_bytes(), b"mirrored runtime")
+
+    def test_fetch_unreachable_url(self):
+        self.assertRaises(
+            AssetCacheError,
+            self.cache.fetch,
+            (self.tmp_dir / "missing").as_uri(),
+            self.tmp_dir / "runtime",
+        )
+
+    def test_concurrent_fetches_download_once(self):
+        with patch(
+            "appimagebuilder.utils.asset_cache.request.urlopen",
+            wraps=request.urlopen,
+        ) as urlopen_mock:
+            with ThreadPoolExecutor(max_workers=8) as executor:
+                targets = list(
+                    executor.map(
+                        lambda idx: self.cache.fetch(
+                            self.url, self.tmp_dir / f"runtime-{idx}"
+                        ),
+                        range(8),
+                    )
+                )
+
+        self.assertEqual(urlopen_mock.call_count, 1)
+        for target in targets:
+            self.assertEqual(target.read_bytes(), self.source.read_bytes())
+
+    def test_fetch_resumes_interrupted_download(self):
+        url = "https://example.invalid/runtime-x86_64"
+        url_key = hashlib.sha256(url.encode()).hexdigest()
+        partial_path = self.tmp_dir / "cache" / "partial" / url_key
+        partial_path.write_bytes(b"run")
+        partial_path.with_name(f"{url_key}.json").write_text('{"etag": "\\"v1\\""}')
+
+        with patch(
+            "appimagebuilder.utils.asset_cache.request.urlopen",
+            return_value=_response(b"time", 206),
+        ) as urlopen_mock:
+            target = self.cache.fetch(url, self.tmp_dir / "runtime")
+
+        headers = urlopen_mock.call_args.args[0]
+        self.assertEqual(headers.get_header("Range"), "bytes=3-")
+        self.assertEqual(headers.get_header("If-range"), '"v1"')
+        self.assertEqual(target.read_bytes(), b"runtime")
+        self.assertFalse(partial_path.with_name(f"{url_key}.json").exists())
+
+    def test_fetch_restarts_download_without_validators(self):
+        url = "https://example.invalid/runtime-x86_64"
+        url_key = hashlib.sha256(url.encode()).hexdigest()
+        (self.tmp_dir / "cache" / "partial" / url_key).write_bytes(b"old")
+
+        with patch(
+            "appimagebuilder.utils.asset_cache.request.urlopen",
+            return_value=_response(b"runtime"),
+        ) as urlopen_mock:
+            target = self.cache.fetch(url, self.tmp_dir / "runtime")
+
+        self.assertIsNone(urlopen_mock.call_args.args[0].get_header("Range"))
+        self.assertEqual(target.read_bytes(), b"runtime")
+
+    def _fetch_outdated(self, revalidation):
+        url = "https://example.invalid/runtime-x86_64"
+        cache = AssetCache(self.tmp_dir / "cache", max_age=0)
+        with patch(
+            "appimagebuilder.utils.asset_cache.request.urlopen",
+            return_value=_response(b"runtime", headers={"ETag": '"v1"'}),
+        ):
+            cache.fetch(url, self.tmp_dir / "runtime")
+
+        with patch(
+            "appimagebuilder.utils.asset_cache.request.urlopen",
+            side_effect=revalidation,
+        ) as urlopen_mock:
+            target = cache.fetch(url, self.tmp_dir / "runtime")
+
+        return target.read_bytes(), urlopen_mock.call_args_list
+
+    def test_fetch_revalidates_unchanged_asset(self):
+        not_modified = error.HTTPError("url", 304, "Not Modified", {}, None)
+
+        data, calls = self._fetch_outdated([not_modified])
+
+        self.assertEqual(data, b"runtime")
+        self.assertEqual(calls[0].args[0].get_header("If-none-match"), '"v1"')
+
+    def test_fetch_revalidates_changed_asset(self):
+        data, calls = self._fetch_outdated(
+            [_response(b""), _response(b"new runtime", headers={"ETag": '"v2"'})]
+        )
+
+        self.assertEqual(data, b"new runtime")
+        self.assertEqual(len(calls), 2)
+
+    def test_fetch_revalidates_asset_ignoring_conditional_headers(self):
+        data, calls = self._fetch_outdated([_response(b"", headers={"ETag": '"v1"'})])
+
+        self.assertEqual(data, b"runtime")
+        self.assertEqual(len(calls), 1)
+
+    def test_fetch_outdated_asset_on_server_error(self):
+        unavailable = error.HTTPError("url", 503, "Service Unavailable", {}, None)
+
+        data, calls = self._fetch_outdated([unavailable])
+
+        self.assertEqual(data, b"runtime")
+        self.assertEqual(len(calls), 1)
+
+    def test_fetch_outdated_asset_offline(self):
+        data, _ = self._fetch_outdated(error.URLError("offline"))
+
+        self.assertEqual(data, b"runtime")
+
+    def test_fetch_with_checksum_is_not_revalidated(self):
+        cache = AssetCache(self.tmp_dir / "cache", max_age=0)
+        digest = hashlib.sha256(self.source.read_bytes()).hexdigest()
+        cache.fetch(self.url, self.tmp_dir / "first", digest)
+
+        with patch("appimagebuilder.utils.asset_cache.request.urlopen") as urlopen_mock:
+            cache.fetch(self.url, self.tmp_dir / "second", digest)
+
+        urlopen_mock.assert_not_called()
@@ -1,7 +1,9 @@
 import os.path
+import tempfile
 from unittest import TestCase, skipIf
 
-from appimagebuilder.utils.elf import get_arch
+from appimagebuilder.bench import make_elf
+from appimagebuilder.utils.elf import get_arch, read_sections
 
 
 class Test(TestCase):
@@ -15,3 +17,23 @@ class Test(TestCase):
     )
     def test_read_elf_arch_x86_64(self):
         self.assertEqual("x86_64", get_arch("/lib64/ld-linux-x86-64.so.2"))
+
+    def test_read_sections(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "libtest.so")
+            with open(path, "wb") as f:
+                f.write(make_elf(soname="libtest.so"))
+
+            sections = read_sections(path)
+
+        self.assertEqual(
+            list(sections), [".dynsym", ".dynstr", ".hash", ".dynamic", ".shstrtab"]
+        )
+        self.assertEqual(sections[".dynsym"][1], 24)
+
+    def test_read_sections_of_invalid_file(self):
+        with tempfile.NamedTemporaryFile() as f:
+            f.write(b"#!/bin/sh\n")
+            f.flush()
+
+            self.assertRaises(RuntimeError, read_sections, f.name)
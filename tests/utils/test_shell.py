@@ -0,0 +1,57 @@
+import os
+import pathlib
+import subprocess
+import sys
+import tempfile
+from unittest import TestCase
+from unittest.mock import patch
+
+from appimagebuilder.utils import shell
+
+
+class TestShell(TestCase):
+    def setUp(self) -> None:
+        self.records = []
+        shell.spawn_listeners.append(self.records.append)
+
+    def tearDown(self) -> None:
+        shell.spawn_listeners.remove(self.records.append)
+
+    def test_run_is_traced(self):
+        shell.run(
+            [sys.executable, "-c", "print('hello'); exit(3)"], stdout=subprocess.PIPE
+        )
+
+        self.assertEqual(len(self.records), 1)
+        self.assertEqual(self.records[0].argv[0], sys.executable)
+        self.assertEqual(self.records[0].returncode, 3)
+        self.assertEqual(self.records[0].output_size, len("hello\n"))
+
+    def test_popen_is_traced_once(self):
+        proc = shell.popen([sys.executable, "-c", "pass"])
+        proc.wait()
+        proc.poll()
+
+        self.assertEqual(len(self.records), 1)
+        self.assertEqual(self.records[0].returncode, 0)
+
+    def test_require_executable(self):
+        path = shell.require_executable("sh")
+        self.assertEqual(path, shell.require_executable("sh"))
+        self.assertRaises(
+            shell.CommandNotFoundError, shell.require_executable, "not-a-real-tool"
+        )
+
+    def test_require_executable_installed_later(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = f"{temp_dir}:{os.environ['PATH']}"
+            with patch.dict(os.environ, {"PATH": path}):
+                self.assertRaises(
+                    shell.CommandNotFoundError, shell.require_executable, "late-tool"
+                )
+
+                tool_path = pathlib.Path(temp_dir) / "late-tool"
+                tool_path.write_text("#!/bin/sh\n")
+                tool_path.chmod(0o755)
+
+                self.assertEqual(shell.require_executable("late-tool"), str(tool_path))